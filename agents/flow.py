@@ -1,24 +1,124 @@
+"""
+Table-driven conversation FSM with memoized steps.
 
+TRANSITIONS maps (step, event) -> next step. A Flow pairs that table with Step definitions:
+each step names the state keys it reads, and run() recomputes a step only when one of those
+keys changed (per-key version counters) since its last run, reusing its outputs otherwise.
+A step's outputs are written back into the state, so a change ripples only to the steps
+downstream of it. States are slotted and snapshot() copies three small dicts, so thousands
+of conversations fit in one process.
+"""
 from dataclasses import dataclass, field
 
-@dataclass
+STEPS = ("greet", "collect_patient_info", "lookup_result", "choose_slot", "insurance", "confirm", "done")
+TRANSITIONS = {(a, "next"): b for a, b in zip(STEPS, STEPS[1:])}
+TRANSITIONS.update({
+    ("lookup_result", "retry"): "collect_patient_info",
+    ("insurance", "back"): "choose_slot",
+    ("confirm", "cancel"): "choose_slot",
+    ("done", "cancel"): "choose_slot",
+})
+
+def _same(a, b):
+    if a is b:
+        return True
+    try:
+        return bool(a == b)
+    except (TypeError, ValueError):  # e.g. DataFrames: treat as changed
+        return False
+
+@dataclass(slots=True, frozen=True)
+class Snapshot:
+    step: str
+    collected: dict
+    errors: tuple
+    versions: dict
+    memo: dict
+
+@dataclass(slots=True)
 class ConversationState:
     step: str = "greet"
     collected: dict = field(default_factory=dict)
     errors: list = field(default_factory=list)
+    versions: dict = field(default_factory=dict)   # key -> number of times its value changed
+    memo: dict = field(default_factory=dict)       # step name -> input versions it last ran with
+
+    def __getitem__(self, key):
+        return self.collected[key]
+
+    def __setitem__(self, key, value):
+        self.set(**{key: value})
+
+    def get(self, key, default=None):
+        return self.collected.get(key, default)
+
+    def set(self, **values):
+        """Stores values; only keys whose value actually changed get a new version."""
+        for k, v in values.items():
+            if k not in self.collected or not _same(self.collected[k], v):
+                self.collected[k] = v
+                self.versions[k] = self.versions.get(k, 0) + 1
+
+    def snapshot(self):
+        return Snapshot(self.step, dict(self.collected), tuple(self.errors), dict(self.versions), dict(self.memo))
+
+    def restore(self, snap):
+        self.step = snap.step
+        self.collected = dict(snap.collected)
+        self.errors = list(snap.errors)
+        self.versions = dict(snap.versions)
+        self.memo = dict(snap.memo)
+        return self
+
+@dataclass(slots=True, frozen=True)
+class Step:
+    name: str
+    inputs: tuple
+    compute: object   # callable(**inputs) -> dict of outputs stored back into the state
+
+class Flow:
+
+    def __init__(self, steps=(), transitions=TRANSITIONS):
+        self.steps = list(steps)
+        self.transitions = transitions
+        self.stats = {"transitions": 0, "runs": 0, "reuses": 0}
+
+    def fire(self, state, event="next"):
+        """Applies one transition; an event with no entry for the current step is recorded in errors."""
+        nxt = self.transitions.get((state.step, event))
+        if nxt is None:
+            state.errors.append(f"no transition for {event!r} from {state.step!r}")
+        else:
+            state.step = nxt
+            self.stats["transitions"] += 1
+        return state
+
+    def reach(self, state, step):
+        """Fires 'next' until the state is at `step`; no-op when it is already there or past it."""
+        while STEPS.index(state.step) < STEPS.index(step):
+            self.fire(state)
+        return state
+
+    def run(self, state):
+        """Runs every step whose inputs are all present and changed since its last run. Returns their names."""
+        ran = []
+        for step in self.steps:
+            if any(k not in state.collected for k in step.inputs):
+                continue
+            key = tuple(state.versions.get(k, 0) for k in step.inputs)
+            if state.memo.get(step.name) == key:
+                self.stats["reuses"] += 1
+                continue
+            state.set(**step.compute(**{k: state.collected[k] for k in step.inputs}))
+            state.memo[step.name] = key
+            self.stats["runs"] += 1
+            ran.append(step.name)
+        return ran
+
+_DEFAULT_FLOW = Flow()
 
 def next_step(state: ConversationState, user_input: str):
     # Extremely simple controller for demo; UI handles most branching explicitly.
-    if state.step == "greet":
-        state.step = "collect_patient_info"
-    elif state.step == "collect_patient_info":
-        state.step = "lookup_result"
-    elif state.step == "lookup_result":
-        state.step = "choose_slot"
-    elif state.step == "choose_slot":
-        state.step = "insurance"
-    elif state.step == "insurance":
-        state.step = "confirm"
-    elif state.step == "confirm":
-        state.step = "done"
+    if state.step != "done":
+        _DEFAULT_FLOW.fire(state, "next")
     return state
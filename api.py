@@ -0,0 +1,305 @@
+"""
+Headless scheduling API next to the Streamlit UI (asyncio + stdlib HTTP/1.1, JSON in and out).
+
+Run: python api.py [--host 127.0.0.1] [--port 8000] [--workers N] [--data DIR]
+
+  GET  /health
+  GET  /patients/lookup?first_name=&last_name=&dob=
+  GET  /slots?start_date=&end_date=&minutes=&doctor=&location=&specialty=&n=
+  GET  /capacity?start_date=&end_date=&doctor=&location=
+  POST /appointments                    {doctor, location, date, start_time, end_time[, patient_id]}
+  POST /appointments/<id>/confirm       {email, phone, name}
+  POST /appointments/<id>/reminders     {email, phone}
+  POST /appointments/<id>/cancel
+
+Each worker process keeps one DataService (the shared in-memory store for all its connections).
+Workers share the port through SO_REUSEPORT and stay consistent through the booking journal and
+file lock, exactly like concurrent Streamlit processes. Every handler that touches the DataService
+runs in a thread pool: reads take the same lock the ledger holds across the file lock and journal
+fsync (and a reload holds while re-parsing), so only request parsing and I/O stay on the event loop.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing as mp
+import os
+import signal
+import sys
+import time
+import uuid
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+from utils import data_io
+from utils.data_service import get_service
+from utils.reminders import ReminderScheduler, send_reminders
+from utils.slot_search import search_slots
+
+MAX_HEADER = 64 * 1024
+REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           409: "Conflict", 413: "Payload Too Large", 431: "Request Header Fields Too Large",
+           500: "Internal Server Error"}
+
+class HTTPError(Exception):
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+def _required(body, *keys):
+    missing = [k for k in keys if not body.get(k)]
+    if missing:
+        raise HTTPError(400, f"missing fields: {', '.join(missing)}")
+    return [body[k] for k in keys]
+
+class SchedulingAPI:
+
+    def __init__(self, worker=0, workers=1):
+        self.data = get_service()
+        self.worker, self.workers = worker, workers
+        self.appointments = {}  # appointment id -> dict, for bookings made through this worker
+        self._reminders = None
+        self.routes = [
+            ("GET", "/health", self.health),
+            ("GET", "/patients/lookup", self.lookup),
+            ("GET", "/slots", self.slots),
+            ("GET", "/capacity", self.capacity),
+            ("POST", "/appointments", self.reserve),
+            ("POST", "/appointments/{id}/confirm", self.confirm),
+            ("POST", "/appointments/{id}/reminders", self.schedule_reminders),
+            ("POST", "/appointments/{id}/cancel", self.cancel),
+        ]
+
+    # -- routing / HTTP ----------------------------------------------------------------------
+
+    def _route(self, method, path):
+        parts = path.rstrip("/").split("/")
+        allowed = False
+        for m, pattern, handler in self.routes:
+            pat = pattern.split("/")
+            if len(pat) != len(parts):
+                continue
+            params = {}
+            for p, v in zip(pat, parts):
+                if p.startswith("{"):
+                    params[p[1:-1]] = v
+                elif p != v:
+                    break
+            else:
+                if m == method:
+                    return handler, params
+                allowed = True
+        raise HTTPError(405 if allowed else 404, f"{method} {path}")
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+                except asyncio.LimitOverrunError:
+                    await self._respond(writer, 431, {"error": "headers too large"}, False)
+                    return
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                except ValueError:
+                    await self._respond(writer, 400, {"error": "bad request line"}, False)
+                    return
+                headers = {k.strip().lower(): v.strip() for k, v in (l.split(":", 1) for l in lines[1:] if ":" in l)}
+                length = int(headers.get("content-length") or 0)
+                if length > MAX_HEADER:
+                    await self._respond(writer, 413, {"error": "body too large"}, False)
+                    return
+                body = await reader.readexactly(length) if length else b""
+                keep = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                status, payload = await self.dispatch(method, target, body)
+                await self._respond(writer, status, payload, keep)
+                if not keep:
+                    return
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status, payload, keep):
+        data = json.dumps(payload, default=str).encode()
+        writer.write(
+            f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\nConnection: {'keep-alive' if keep else 'close'}\r\n\r\n".encode() + data
+        )
+        await writer.drain()
+
+    async def dispatch(self, method, target, body):
+        url = urlsplit(target)
+        try:
+            handler, params = self._route(method, url.path)
+            query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            try:
+                payload = json.loads(body) if body else {}
+            except ValueError:
+                raise HTTPError(400, "body is not JSON")
+            return await handler(query=query, body=payload, **params)
+        except HTTPError as e:
+            return e.status, {"error": str(e)}
+        except ValueError as e:  # malformed numbers / dates in the request
+            return 400, {"error": str(e)}
+        except Exception as e:
+            print(f"❌ {method} {target} failed: {e!r}", file=sys.stderr)
+            return 500, {"error": "internal error"}
+
+    # -- endpoints ---------------------------------------------------------------------------
+
+    async def health(self, query, body):
+        metrics = await asyncio.to_thread(self.data.metrics)
+        return 200, {"ok": True, "worker": self.worker, "pid": os.getpid(), "data": metrics}
+
+    def _lookup(self, first, last, dob):
+        return self.data.patient_index().lookup(first, last, dob)
+
+    async def lookup(self, query, body):
+        first, last, dob = _required(query, "first_name", "last_name", "dob")
+        record, tier = await asyncio.to_thread(self._lookup, first, last, dob)
+        if record is None:
+            raise HTTPError(404, "patient not found")
+        return 200, {"patient": record, "match": tier}
+
+    async def slots(self, query, body):
+        start_date, = _required(query, "start_date")
+
+        def split(k):
+            return query[k].split(",") if query.get(k) else None
+
+        def search():
+            _, index = self.data.schedule()
+            return search_slots(
+                index, start_date, query.get("end_date"), minutes_needed=int(query.get("minutes", 30)),
+                n=min(int(query.get("n", 10)), 100), doctors=split("doctor"), locations=split("location"),
+                specialty=query.get("specialty"), specialties=self.data.specialties(), prefer_doctor=query.get("prefer_doctor"), prefer_location=query.get("prefer_location"),
+                earliest=query.get("earliest"), latest=query.get("latest"),
+            )
+
+        found = await asyncio.to_thread(search)
+        return 200, {"slots": found}
+
+    def _capacity(self, start_date, end_date, doctors, locations):
+        _, index = self.data.schedule()
+        return index.capacity_rows(start_date, end_date, doctors, locations)
+
+    async def capacity(self, query, body):
+        start_date, = _required(query, "start_date")
+        split = lambda k: query[k].split(",") if query.get(k) else None
+        days = await asyncio.to_thread(self._capacity, start_date, query.get("end_date") or start_date,
+                                       split("doctor"), split("location"))
+        return 200, {"days": days}
+
+    async def reserve(self, query, body):
+        doctor, location, date_str, start, end = _required(body, "doctor", "location", "date", "start_time", "end_time")
+        appt_id = body.get("appointment_id") or f"A{int(time.time())}-{uuid.uuid4().hex[:6]}"
+        # the ledger takes the inter-process file lock and fsyncs the journal: off the loop
+        ok = await asyncio.to_thread(self.data.book, doctor, location, date_str, start, end, appt_id)
+        if not ok:
+            raise HTTPError(409, "slot no longer available")
+        appt = {"appointment_id": appt_id, "patient_id": body.get("patient_id", ""), "doctor": doctor,
+                "location": location, "date": date_str, "start_time": start, "end_time": end}
+        self.appointments[appt_id] = appt
+        return 201, {"appointment": appt}
+
+    def _appointment(self, appt_id):
+        appt = self.appointments.get(appt_id)
+        if appt is not None:
+            return appt
+        # booked through another worker or the UI: find it in the shared schedule
+        found = self.data.appointment(appt_id)
+        if found is None:
+            raise HTTPError(404, f"appointment {appt_id} not found")
+        return {"appointment_id": appt_id, "patient_id": "", **found}
+
+    async def confirm(self, query, body, id):
+        from utils.comms import send_email, send_sms
+        appt = await asyncio.to_thread(self._appointment, id)
+        subject = f"Appointment Confirmation — {id}"
+        text = (f"Dear {body.get('name', 'patient')},\n\nYour appointment is confirmed with {appt['doctor']} at "
+                f"{appt['location']} on {appt['date']} from {appt['start_time']} to {appt['end_time']}.\n\nThank you.")
+        email_log = await asyncio.to_thread(send_email, body.get("email") or "test@example.com", subject, text)
+        sms_log = None
+        if body.get("phone"):
+            sms_log = await asyncio.to_thread(send_sms, body["phone"], f"Appt {id} on {appt['date']} {appt['start_time']} confirmed.")
+        return 200, {"appointment": appt, "email_log": email_log, "sms_log": sms_log}
+
+    def reminders(self):
+        if self._reminders is None:
+            # one log per worker, never the app's reminders.jsonl: each process owns (and dispatches)
+            # the reminders it scheduled
+            name = data_io.DATA / f"reminders.api.w{self.worker}.jsonl"
+            self._reminders = ReminderScheduler(log_path=name, dispatch=self._send_reminders).start()
+        return self._reminders
+
+    def _send_reminders(self, batch):
+        # a cancellation handled by another worker only reaches the shared schedule, so check it here
+        booked = self.data.booked(r.appointment_id for r in batch)
+        send_reminders([r for r in batch if r.appointment_id in booked])
+
+    async def schedule_reminders(self, query, body, id):
+        appt = await asyncio.to_thread(self._appointment, id)
+        rs = await asyncio.to_thread(self.reminders().schedule_for_appointment, appt,
+                                     body.get("email") or "test@example.com", body.get("phone"))
+        return 201, {"reminders": [r.as_row() for r in rs]}
+
+    async def cancel(self, query, body, id):
+        appt = await asyncio.to_thread(self._appointment, id)
+        await asyncio.to_thread(self.data.cancel, appt["doctor"], appt["location"], appt["date"], id)
+        dropped = await asyncio.to_thread(self.reminders().cancel_appointment, id)
+        self.appointments.pop(id, None)
+        return 200, {"cancelled": id, "reminders_dropped": dropped}
+
+async def serve(host, port, worker=0, workers=1):
+    api = SchedulingAPI(worker, workers)
+    api.data.schedule()  # warm the shared store before taking traffic
+    api.data.patient_index()
+    server = await asyncio.start_server(api.handle, host, port, limit=MAX_HEADER, backlog=1024,
+                                        reuse_port=workers > 1)
+    print(f"worker {worker} (pid {os.getpid()}) listening on http://{host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+def _worker(host, port, worker, workers, data_dir):
+    if data_dir:
+        data_io.DATA = Path(data_dir)
+    try:
+        asyncio.run(serve(host, port, worker, workers))
+    except KeyboardInterrupt:
+        pass
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Headless scheduling API")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8000)
+    ap.add_argument("--workers", type=int, default=1)
+    ap.add_argument("--data", help="data directory (default: ./data)")
+    args = ap.parse_args(argv)
+    if args.workers == 1:
+        return _worker(args.host, args.port, 0, 1, args.data)
+    if not hasattr(__import__("socket"), "SO_REUSEPORT"):
+        ap.error("--workers > 1 needs SO_REUSEPORT (Linux/macOS)")
+    ctx = mp.get_context("spawn")
+    procs = [ctx.Process(target=_worker, args=(args.host, args.port, i, args.workers, args.data), daemon=True)
+             for i in range(args.workers)]
+    # SIGTERM on the supervisor must not orphan workers still bound to the port
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    for p in procs:
+        p.start()
+    try:
+        for p in procs:
+            p.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for p in procs:
+            p.terminate()
+        for p in procs:
+            p.join()
+
+if __name__ == "__main__":
+    main()
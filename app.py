@@ -2,118 +2,164 @@
 import streamlit as st
 from datetime import date, datetime, timedelta
 import pandas as pd
+import uuid
 
-from utils.data_io import load_patients, load_schedule, save_schedule, export_admin_report
-from utils.scheduling import find_contiguous_slots, reserve_slots
-from utils.comms import send_email, send_sms, send_forms
+from utils.data_io import export_schedule_excel, export_admin_report
+from utils.admin_report import export_bookings_report
+from utils.data_service import get_service
+from utils.slot_search import search_slots
+from utils.comms import send_email, send_sms, send_forms, delivery_status
+from utils.reminders import get_reminder_scheduler
+from agents.flow import ConversationState, Flow, Step
+from utils.telemetry import TELEMETRY
 
 st.set_page_config(page_title="RagaAI - Medical Scheduling Agent (Demo)", layout="centered")
 
+# Per-rerun timing: each numbered section below is a span of this run (cProfile when requested)
+run = TELEMETRY.begin_run("rerun", profile=st.session_state.pop("profile_next_run", False))
+run.section("0) Load data")
+
 st.title("🩺 AI Scheduling Agent — Demo")
 
 st.markdown("This demo walks through greeting → patient lookup → smart scheduling → insurance collection → confirmation → forms → reminders.")
 
-# Load data
-patients = load_patients()
-if isinstance(patients, list):
-    import pandas as _pd
-    patients_df = _pd.DataFrame(patients)
-else:
-    patients_df = patients
-
-schedule = load_schedule()
-if isinstance(schedule, list):
-    import pandas as _pd
-    sched_df = _pd.DataFrame(schedule)
-else:
-    sched_df = schedule
+# Load data: one shared copy per process, reloaded only when the files change
+data = get_service()
+sched_df, slot_index = data.schedule()
+
+def lookup_patient(lookup_name, lookup_dob, lookup_doctor, lookup_location):
+    # Lookup: normalized name + dob via the hashed index (phonetic/fuzzy fallback for typos)
+    fn = lookup_name.split()[0].strip().lower() if lookup_name else ""
+    ln = lookup_name.split()[-1].strip().lower() if lookup_name else ""
+    record, tier = data.patient_index().lookup(fn, ln, lookup_dob)
+    if record is not None:
+        return {"patient_found": True, "patient_record": record, "lookup_tier": tier}
+    # create a lightweight new record in-memory; will finalize on confirmation
+    return {"patient_found": False, "lookup_tier": None, "patient_record": {
+        "patient_id": f"TMP-{int(datetime.now().timestamp())}",
+        "first_name": fn.title(),
+        "last_name": ln.title(),
+        "dob": lookup_dob,
+        "email": "",
+        "phone": "",
+        "preferred_doctor": lookup_doctor,
+        "location": lookup_location,
+        "insurance_carrier": "",
+        "insurance_member_id": "",
+        "insurance_group_id": "",
+        "last_visit_date": "",
+        "is_returning": "N"
+    }}
+
+def find_slots(patient_record, slot_search, schedule_generation):
+    minutes_needed = 30 if patient_record.get("is_returning","N") == "Y" else 60
+    specialties = data.specialties()
+    candidates = search_slots(slot_index, minutes_needed=minutes_needed, specialties=specialties, **dict(slot_search))
+    if not candidates and minutes_needed == 60:
+        return {"candidates": search_slots(slot_index, minutes_needed=30, specialties=specialties, **dict(slot_search)),
+                "slot_fallback": True}
+    return {"candidates": candidates, "slot_fallback": False}
+
+# Each step reruns only when its inputs change: a widget rerun reuses the last lookup and search
+flow = Flow([
+    Step("lookup", ("lookup_name", "lookup_dob", "lookup_doctor", "lookup_location"), lookup_patient),
+    Step("slots", ("patient_record", "slot_search", "schedule_generation"), find_slots),
+])
 
 # Session state
 if "state" not in st.session_state:
-    st.session_state.state = {
+    st.session_state.state = ConversationState(collected={
         "patient_found": False,
         "patient_record": None,
         "appointment": {},
         "reminders": []
-    }
+    })
+state = st.session_state.state
+flow.reach(state, "collect_patient_info")
 
+run.section("1) Patient Greeting & Intake")
 with st.form("patient_form"):
     st.subheader("1) Patient Greeting & Intake")
     name = st.text_input("Patient Full Name")
     dob = st.date_input("Date of Birth", value=date(1995,1,1))
-    preferred_doctor = st.selectbox("Doctor", sorted(sched_df["doctor"].unique().tolist()))
-    location = st.selectbox("Location", sorted(sched_df["location"].unique().tolist()))
+    providers = slot_index.days_by_provider()
+    preferred_doctor = st.selectbox("Doctor", sorted({d for d, _ in providers}))
+    location = st.selectbox("Location", sorted({loc for _, loc in providers}))
     submitted = st.form_submit_button("Lookup Patient")
     if submitted:
-        # Simple lookup: name + dob match
-        fn = name.split()[0].strip().lower() if name else ""
-        ln = name.split()[-1].strip().lower() if name else ""
-        dob_str = dob.isoformat()
-        mask = (
-            (patients_df["first_name"].str.lower()==fn) &
-            (patients_df["last_name"].str.lower()==ln) &
-            (patients_df["dob"]==dob_str)
-        )
-        if mask.any():
-            st.session_state.state["patient_found"] = True
-            st.session_state.state["patient_record"] = patients_df[mask].iloc[0].to_dict()
-            st.success("Returning patient detected.")
+        state.set(lookup_name=name, lookup_dob=dob.isoformat(), lookup_doctor=preferred_doctor, lookup_location=location)
+        flow.run(state)
+        flow.reach(state, "lookup_result")
+        record = state["patient_record"]
+        if state["patient_found"]:
+            if state["lookup_tier"] == "exact":
+                st.success("Returning patient detected.")
+            else:
+                st.success(f"Returning patient detected: {record['first_name']} {record['last_name']} (close {state['lookup_tier']} match).")
         else:
-            # create a lightweight new record in-memory; will finalize on confirmation
-            st.session_state.state["patient_found"] = False
-            st.session_state.state["patient_record"] = {
-                "patient_id": f"TMP-{int(datetime.now().timestamp())}",
-                "first_name": fn.title(),
-                "last_name": ln.title(),
-                "dob": dob_str,
-                "email": "",
-                "phone": "",
-                "preferred_doctor": preferred_doctor,
-                "location": location,
-                "insurance_carrier": "",
-                "insurance_member_id": "",
-                "insurance_group_id": "",
-                "last_visit_date": "",
-                "is_returning": "N"
-            }
             st.info("New patient. We'll collect additional details below.")
 
-if st.session_state.state["patient_record"]:
-    pr = st.session_state.state["patient_record"]
+if state["patient_record"]:
+    pr = state["patient_record"]
+    run.section("2) Smart Scheduling")
     st.subheader("2) Smart Scheduling")
     is_returning = pr.get("is_returning","N") == "Y"
     minutes_needed = 30 if is_returning else 60
     st.caption(f"Appointment length based on patient type: **{minutes_needed} minutes**.")
-    date_choice = st.date_input("Desired Date", value=date.today())
-    candidates = find_contiguous_slots(sched_df, preferred_doctor, location, date_choice.isoformat(), minutes_needed=minutes_needed)
+    c1, c2, c3 = st.columns(3)
+    with c1:
+        date_choice = st.date_input("Earliest Date", value=date.today())
+    with c2:
+        horizon = st.slider("Search next N days", 1, 90, 14)
+    with c3:
+        any_doctor = st.checkbox("Any doctor", value=False)
+        any_location = st.checkbox("Any location", value=False)
+        specialty = st.selectbox("Specialty", ["Any"] + sorted(set(data.specialties().values())), disabled=not any_doctor)
+    state.set(
+        slot_search=(
+            ("start_date", date_choice.isoformat()),
+            ("end_date", (date_choice + timedelta(days=horizon - 1)).isoformat()),
+            ("doctors", None if any_doctor else (preferred_doctor,)),
+            ("specialty", specialty if any_doctor and specialty != "Any" else None),
+            ("locations", None if any_location else (location,)),
+            ("prefer_doctor", preferred_doctor),
+            ("prefer_location", location),
+        ),
+        schedule_generation=data.schedule_generation(),
+    )
+    flow.run(state)
+    flow.reach(state, "choose_slot")
+    candidates = state["candidates"]
+    if state["slot_fallback"]:
+        st.warning("No 60-min slots available. Showing 30-min options instead.")
+        minutes_needed = 30
     if candidates:
-        label_options = [f"{c[0]}–{c[1]}" for c in candidates]
-        pick = st.selectbox("Available Slots", label_options, index=0)
+        label_options = [f"{c['date']} {c['start_time']}–{c['end_time']} · {c['doctor']} · {c['location']}" for c in candidates]
+        pick = st.selectbox("Available Slots (best first)", range(len(candidates)), format_func=label_options.__getitem__)
         if st.button("Reserve Selected Slot"):
-            start_time, end_time = pick.split("–")
-            appt_id = f"A{int(datetime.now().timestamp())}"
-            sched_df = reserve_slots(sched_df, preferred_doctor, location, date_choice.isoformat(), start_time, end_time, appt_id)
-            save_schedule(sched_df)
-            st.session_state.state["appointment"] = {
-                "appointment_id": appt_id,
-                "patient_id": pr["patient_id"],
-                "name": f"{pr['first_name']} {pr['last_name']}",
-                "doctor": preferred_doctor,
-                "location": location,
-                "date": date_choice.isoformat(),
-                "start_time": start_time,
-                "end_time": end_time,
-                "duration_min": minutes_needed,
-            }
-            st.success(f"Reserved {start_time}–{end_time} on {date_choice.isoformat()} with {preferred_doctor}.")
-
-    if not candidates and minutes_needed == 60:
-        st.warning("No 60-min slots available. Showing 30-min options instead.")
-        candidates = find_contiguous_slots(
-            sched_df, preferred_doctor, location, date_choice.isoformat(),
-            minutes_needed=30
-        )
+            slot = candidates[pick]
+            start_time, end_time = slot["start_time"], slot["end_time"]
+            appt_id = f"A{int(datetime.now().timestamp())}-{uuid.uuid4().hex[:6]}"
+            if not data.book(slot["doctor"], slot["location"], slot["date"], start_time, end_time, appt_id):
+                st.error("That slot was just taken by another booking. Please pick another.")
+            else:
+                state["appointment"] = {
+                    "appointment_id": appt_id,
+                    "patient_id": pr["patient_id"],
+                    "name": f"{pr['first_name']} {pr['last_name']}",
+                    "doctor": slot["doctor"],
+                    "location": slot["location"],
+                    "date": slot["date"],
+                    "start_time": start_time,
+                    "end_time": end_time,
+                    "duration_min": minutes_needed,
+                }
+                flow.reach(state, "insurance")
+                st.success(f"Reserved {start_time}–{end_time} on {slot['date']} with {slot['doctor']}.")
+    else:
+        st.info("No open slots in this range. Try more days, any doctor or any location.")
 
+    run.section("3) Insurance Collection")
     st.subheader("3) Insurance Collection")
     col1, col2, col3 = st.columns(3)
     with col1:
@@ -123,11 +169,12 @@ if st.session_state.state["patient_record"]:
     with col3:
         group_id = st.text_input("Group ID", value=pr.get("insurance_group_id",""))
 
+    run.section("4) Confirmation & Messaging")
     st.subheader("4) Confirmation & Messaging")
     email = st.text_input("Email", value=pr.get("email",""))
     phone = st.text_input("Phone", value=pr.get("phone",""))
     if st.button("Confirm Appointment + Send Email/SMS"):
-        appt = st.session_state.state["appointment"]
+        appt = state["appointment"]
         if not appt:
             st.error("Please reserve a slot first.")
         else:
@@ -141,6 +188,7 @@ if st.session_state.state["patient_record"]:
             )
             email_log = send_email(email or "test@example.com", subject, body)
             sms_log = send_sms(phone or "9999999999", f"Appt {appt['appointment_id']} on {appt['date']} {appt['start_time']} confirmed.")
+            flow.reach(state, "done")
             st.success("Confirmation sent (logged to outbox).")
             st.code(email_log)
             st.code(sms_log)
@@ -150,45 +198,106 @@ if st.session_state.state["patient_record"]:
                 st.success("Forms dispatched (logged).")
                 st.code(forms_log)
 
-    st.subheader("5) Reminder System (Simulated)")
-    st.caption("Creates 3 reminders: T-72h (plain), T-48h (with actions), T-24h (with actions).")
+    run.section("5) Reminder System")
+    st.subheader("5) Reminder System")
+    st.caption("Queues 3 reminders: T-72h (plain), T-48h (with actions), T-24h (with actions). They are sent when due, even after a restart.")
+    reminder_engine = get_reminder_scheduler()
     if st.button("Schedule Reminders"):
-        appt = st.session_state.state["appointment"]
+        appt = state["appointment"]
         if not appt:
             st.error("No appointment reserved yet.")
         else:
-            appt_dt = datetime.strptime(appt["date"] + " " + appt["start_time"], "%Y-%m-%d %H:%M")
-            reminder_offsets = [timedelta(hours=72), timedelta(hours=48), timedelta(hours=24)]
-            reminders = []
-            for i, off in enumerate(reminder_offsets, start=1):
-                when = appt_dt - off
-                msg = "Reminder: Upcoming visit."
-                if i in (2,3):
-                    msg += " Reply with (1) Filled forms? (2) Confirm visit? If cancel, share reason."
-                reminders.append({
-                    "appointment_id": appt["appointment_id"],
-                    "send_at": when.isoformat(timespec="minutes"),
-                    "channel": "email+sms",
-                    "message": msg
-                })
-            st.session_state.state["reminders"] = reminders
-            st.dataframe(pd.DataFrame(reminders))
-            for r in reminders:
-                send_email(
-                    to=email or "test@example.com",
-                    subject=f"Reminder — {r['appointment_id']}",
-                    body=r["message"]
-                )
+            reminders = reminder_engine.schedule_for_appointment(appt, email or "test@example.com", phone or None)
+            state["reminders"] = [r.as_row() for r in reminders]
+            st.dataframe(pd.DataFrame(state["reminders"]))
+    if st.button("Cancel Appointment"):
+        appt = state["appointment"]
+        if not appt:
+            st.error("No appointment reserved yet.")
+        else:
+            data.cancel(appt["doctor"], appt["location"], appt["date"], appt["appointment_id"])
+            dropped = reminder_engine.cancel_appointment(appt["appointment_id"])
+            state["appointment"] = {}
+            state["reminders"] = []
+            if state.step in ("confirm", "done"):
+                flow.fire(state, "cancel")
+            elif state.step == "insurance":
+                flow.fire(state, "back")
+            st.success(f"Appointment {appt['appointment_id']} released; {dropped} pending reminders cancelled.")
 
+    run.section("6) Export Admin Report")
     st.subheader("6) Export Admin Report")
     if st.button("Export Excel Report"):
         import pandas as _pd
-        appt = st.session_state.state["appointment"]
+        appt = state["appointment"]
         appt_df = _pd.DataFrame([appt]) if appt else _pd.DataFrame(columns=["appointment_id"])
-        rem_df = _pd.DataFrame(st.session_state.state["reminders"])
+        rem_df = _pd.DataFrame(state["reminders"])
         path = export_admin_report(appt_df, rem_df)
         st.success("Report generated.")
         st.code(path)
+    if st.button("Export Calendar (Excel)"):
+        st.success("Calendar exported.")
+        st.code(export_schedule_excel())
+    st.caption("Bookings report: every appointment in a date range plus utilization and no-show summaries, streamed in chunks.")
+    r1, r2, r3 = st.columns(3)
+    with r1:
+        report_start = st.date_input("From", value=date.today().replace(day=1))
+    with r2:
+        report_end = st.date_input("To", value=date.today())
+    with r3:
+        report_fmt = st.selectbox("Format", ["xlsx", "csv", "parquet"])
+    if st.button("Export Bookings Report"):
+        try:
+            path = export_bookings_report(report_start.isoformat(), report_end.isoformat(), fmt=report_fmt)
+        except ImportError:
+            st.error("Parquet export needs pyarrow installed.")
+        else:
+            st.success("Bookings report generated.")
+            st.code(path)
+
+run.section("Capacity dashboard")
+with st.expander("Capacity"):
+    st.caption("Free minutes and longest free run per doctor/location/day, maintained as bookings and cancellations happen.")
+    k1, k2 = st.columns(2)
+    with k1:
+        cap_start = st.date_input("Capacity from", value=date.today())
+    with k2:
+        cap_days = st.slider("Days", 1, 90, 14)
+    cap = pd.DataFrame(slot_index.capacity_rows(cap_start.isoformat(), (cap_start + timedelta(days=cap_days - 1)).isoformat()))
+    if len(cap):
+        by_provider = cap.groupby(["doctor", "location"]).agg(
+            free_hours=("free_minutes", lambda m: round(m.sum() / 60, 1)),
+            utilization=("utilization", "mean"),
+            days_fitting_60min=("longest_free_minutes", lambda m: int((m >= 60).sum())),
+            longest_free_minutes=("longest_free_minutes", "max"),
+        ).round(3).reset_index().sort_values("free_hours", ascending=False)
+        st.dataframe(by_provider)
+        st.dataframe(cap)
+    else:
+        st.info("Nothing scheduled in this range.")
+
+run.section("Admin panels")
+with st.expander("Data cache"):
+    st.json(data.metrics())
+
+with st.expander("Email delivery"):
+    st.json(delivery_status())
+
+TELEMETRY.end_run(run)
+with st.expander("Performance"):
+    last = run.breakdown()
+    st.caption(f"This rerun: {last['ms']} ms. Spans are inclusive (a function's time includes the ones it calls).")
+    st.dataframe(pd.DataFrame(last["sections"]))
+    if last["spans"]:
+        st.dataframe(pd.DataFrame(last["spans"]))
+    if last["profile"]:
+        st.success(f"cProfile of this rerun: {last['profile']} (text summary next to it)")
+    st.markdown("**Rolling p50 / p95 per span** (last 1024 calls, this process)")
+    st.dataframe(pd.DataFrame(TELEMETRY.summary()))
+    st.json(TELEMETRY.counters)
+    if st.button("Profile next rerun"):
+        st.session_state.profile_next_run = True
+        st.info("The next interaction is profiled; its .prof/.txt will be written to outbox/.")
 
 st.divider()
-st.markdown("**Notes:** This is a local demo using CSV/Excel to simulate EMR and calendar. Email/SMS are logged to the `outbox/` folder.")
+st.markdown("**Notes:** This is a local demo using CSV/Excel to simulate EMR and calendar. Email/SMS are logged to `outbox/messages-*.jsonl` (query/replay with `scripts/outbox.py`).")
@@ -0,0 +1,77 @@
+# Benchmarks 1,000 intake-form sends: re-read + base64 per email (old send_forms) vs the shared
+# pre-encoded attachment cache. Each send = list forms, build the message, serialize it for SMTP,
+# write the outbox log.
+# Run: python scripts/bench_attachments.py [n_sends]
+import email, shutil, sys, tempfile, time, tracemalloc
+from email import encoders
+from email.mime.base import MIMEBase
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from pathlib import Path
+
+BASE = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE))
+
+from utils import comms
+from utils.attachments import CRLF, AttachmentCache
+from utils.outbox import iter_messages
+
+SUBJECT, BODY = "Patient Intake Forms", "Please fill the attached forms."
+
+def _old_send(i):
+    # previous send_forms/send_email: glob, log the paths, read + base64 per message, generate on send
+    forms = list(comms.FORMS_DIR.glob("*"))
+    comms._log_message("email", f"p{i}@example.com", SUBJECT, BODY)
+    msg = MIMEMultipart()
+    msg["From"], msg["To"], msg["Subject"] = "scheduler@localhost", f"p{i}@example.com", SUBJECT
+    msg.attach(MIMEText(BODY, "plain"))
+    for path in forms:
+        with open(path, "rb") as f:
+            part = MIMEBase("application", "octet-stream")
+            part.set_payload(f.read())
+        encoders.encode_base64(part)
+        part.add_header("Content-Disposition", f'attachment; filename="{path.name}"')
+        msg.attach(part)
+    return msg.as_bytes(policy=CRLF)  # what smtplib.send_message generates
+
+def _send(i, cache):
+    atts = comms.resolve_attachments(cache.listdir(comms.FORMS_DIR), cache)
+    comms._log_message("email", f"p{i}@example.com", SUBJECT, BODY, atts)
+    return comms.build_email(f"p{i}@example.com", SUBJECT, BODY, atts, cache).wire_bytes()
+
+def _attachment_payloads(raw):
+    return [p.get_payload(decode=True) for p in email.message_from_bytes(raw).walk() if p.get_filename()]
+
+def _run(n, send):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    sizes = [len(send(i)) for i in range(n)]
+    elapsed = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, sizes
+
+def main(n=1000):
+    forms = list(comms.FORMS_DIR.glob("*"))
+    print(f"forms: {', '.join(f'{p.name} ({p.stat().st_size/1024:.0f} KB)' for p in forms)}")
+    tmp = Path(tempfile.mkdtemp())
+    old_base = comms.BASE
+    comms.BASE = tmp  # outbox logs go to a scratch dir
+    try:
+        base_s, base_peak, _ = _run(n, _old_send)
+        cache = AttachmentCache()
+        cached_s, cached_peak, _ = _run(n, lambda i: _send(i, cache))
+        assert _attachment_payloads(_old_send(0)) == _attachment_payloads(_send(0, cache))
+        print(f"no cache: {base_s*1000/n:7.2f} ms/send  {n/base_s:8.0f} sends/s  peak {base_peak/2**20:5.1f} MB")
+        print(f"cached:   {cached_s*1000/n:7.2f} ms/send  {n/cached_s:8.0f} sends/s  peak {cached_peak/2**20:5.1f} MB  "
+              f"({base_s/cached_s:.1f}x)  {cache.info()}")
+        comms.get_outbox().flush()
+        last = list(iter_messages(tmp / "outbox"))[-1]
+        print("outbox log:", last["id"], last.get("attachments"))
+    finally:
+        comms.get_outbox().close()
+        comms.BASE = old_base
+        shutil.rmtree(tmp, ignore_errors=True)
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:2]))
@@ -0,0 +1,165 @@
+# Capacity rollup (AvailabilityIndex.capacity: scheduled / free / longest free run per doctor-location-day)
+# at 1k doctors x 365 days: maintained incrementally on every booking vs recomputed from scratch, either
+# with find_contiguous_slots-style per-day frame scans (extrapolated from a sample) or one vectorized pass
+# over the whole frame. Also the per-booking maintenance cost and search_slots with vs without the O(1)
+# skip of days whose longest free run is too short. Checks the rollup against the recompute.
+# Run: python scripts/bench_capacity.py [n_doctors] [n_days] [booked_fraction]
+import random, shutil, sys, tempfile, time
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+
+BASE = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE))
+
+from generate_data import generate
+from utils import slot_search
+from utils.schedule_store import read_store
+from utils.scheduling import build_index
+from utils.slot_index import SLOT_MINUTES, run_starts, to_minutes
+from utils.slot_search import search_slots
+
+START = date(2025, 1, 1)
+
+def recompute(df):
+    """Whole rollup in one vectorized pass over the frame: {key: (scheduled, free, longest)} in slots."""
+    keys = df.groupby(["doctor", "location", "date"], observed=True, sort=False).ngroup().to_numpy()
+    free = (df["slot_status"] == "available").to_numpy()
+    starts = df["start_time"].map(to_minutes).to_numpy(dtype="int32")
+    ends = df["end_time"].map(to_minutes).to_numpy(dtype="int32")
+    # a free run breaks at a booked slot, a new day or a gap (lunch)
+    brk = np.ones(len(df), dtype=bool)
+    brk[1:] = (keys[1:] != keys[:-1]) | (starts[1:] != ends[:-1]) | ~free[:-1]
+    run = np.cumsum(brk)
+    run_len = np.bincount(run[free], minlength=run[-1] + 1)
+    longest = np.zeros(keys.max() + 1, dtype="int64")
+    np.maximum.at(longest, keys[brk], run_len[run[brk]])
+    names = df.groupby(["doctor", "location", "date"], observed=True, sort=False).size()
+    scheduled = np.bincount(keys)
+    n_free = np.bincount(keys, weights=free).astype("int64")
+    return {k: (int(s), int(f), int(l)) for k, s, f, l in zip(names.index, scheduled, n_free, longest)}
+
+def scan_day(df, doctor, location, date_str):
+    """The pre-rollup way: find_contiguous_slots-style frame scan for one day."""
+    day = df[(df["doctor"] == doctor) & (df["location"] == location) & (df["date"] == date_str)]
+    free = day[day["slot_status"] == "available"].sort_values("start_time")
+    s, e = free["start_time"].map(to_minutes).tolist(), free["end_time"].map(to_minutes).tolist()
+    longest = run = 0
+    for i in range(len(s)):
+        run = run + 1 if i and s[i] == e[i - 1] else 1
+        longest = max(longest, run)
+    return len(day), len(free), longest
+
+def _stream_scan(index, doctor, location, days, block, band, origin):
+    # slot_search._stream before the rollup: every day's bitmap is shifted/ANDed
+    for date_str in days:
+        key = (doctor, location, date_str)
+        free = index.free.get(key, 0)
+        runs = run_starts(free & band, block)
+        if not runs:
+            continue
+        load = 1 - bin(free).count("1") / bin(index.slots[key]).count("1")
+        base = (slot_search._ordinal(date_str) - origin) * slot_search.DAY_MINUTES
+        while runs:
+            low = runs & -runs
+            i = low.bit_length() - 1
+            yield base + i * SLOT_MINUTES, doctor, location, date_str, i, load
+            runs ^= low
+
+def timed(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+def main(n_doctors=1000, n_days=365, booked=0.8):
+    random.seed(2)
+    tmp = Path(tempfile.mkdtemp())
+    try:
+        counts = generate(tmp, n_patients=0, n_doctors=n_doctors, n_days=n_days, start=START, occupancy=booked, fmt="store")
+        df = read_store(tmp / "doctor_schedules.bin")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    print(f"{n_doctors} doctors x {n_days} days: {counts['slots']:,} slots, {counts['appointments']:,} appointments")
+
+    t0 = time.perf_counter()
+    index = build_index(df)
+    build_s = time.perf_counter() - t0
+    days = list(index.capacity)
+    rebuild_s, _ = timed(index.rebuild_capacity, 1)
+    print(f"index build {build_s:.1f}s, of which materializing the rollup for {len(days):,} days {rebuild_s:.2f}s")
+
+    vec_s, scratch = timed(lambda: recompute(df), 1)
+    assert scratch == index.capacity, "rollup differs from the recompute"
+    sample = random.sample(days, 10)
+    t0 = time.perf_counter()
+    for key in sample:
+        assert scan_day(df, *key) == index.capacity[key], key
+    scan_s = (time.perf_counter() - t0) / len(sample)
+
+    # range query: 14 days, every provider
+    lo = START.isoformat()
+    hi = (START + timedelta(days=13)).isoformat()
+    query_s, rows = timed(lambda: index.capacity_rows(lo, hi))
+    wanted = [(START + timedelta(days=i)).isoformat() for i in range(14)]
+    range_s, _ = timed(lambda: recompute(df[df["date"].isin(wanted)]), 1)
+
+    # maintenance: book + cancel random free 30-minute windows through the index
+    windows = []
+    for key in random.sample(days, min(20000, len(days))):
+        w = index.windows(*key, 30, limit=1)
+        if w:
+            windows.append((*key, *w[0]))
+    plain = type(index)._rollup
+    t0 = time.perf_counter()
+    for w in windows:
+        index.mark_booked(*w)
+    for w in windows:
+        index.mark_available(*w)
+    with_s = (time.perf_counter() - t0) / (2 * len(windows))
+    type(index)._rollup = lambda self, key: None
+    try:
+        t0 = time.perf_counter()
+        for w in windows:
+            index.mark_booked(*w)
+        for w in windows:
+            index.mark_available(*w)
+        without_s = (time.perf_counter() - t0) / (2 * len(windows))
+    finally:
+        type(index)._rollup = plain
+    for w in windows[:5000]:
+        index.mark_booked(*w)
+    maintained = dict(index.capacity)
+    index.rebuild_capacity()
+    assert maintained == index.capacity, "incremental rollup drifted"
+
+    print(f"{'rollup for every day':<46} {'seconds':>10}")
+    print(f"{'  per-day frame scans (extrapolated)':<46} {scan_s * len(days):10.1f}")
+    print(f"{'  vectorized recompute':<46} {vec_s:10.2f}")
+    print(f"{'14-day range, all providers':<46} {'ms':>10}")
+    print(f"{'  vectorized recompute of the range':<46} {range_s * 1e3:10.1f}")
+    print(f"{'  capacity_rows from the table':<46} {query_s * 1e3:10.1f}   ({len(rows):,} rows)")
+    print(f"{'per booking/cancel (index update)':<46} {'us':>10}")
+    print(f"{'  bitmaps only':<46} {without_s * 1e6:10.2f}")
+    print(f"{'  bitmaps + rollup':<46} {with_s * 1e6:10.2f}")
+
+    print("search_slots, 90 days, all providers")
+    end = (START + timedelta(days=89)).isoformat()
+    for minutes in (60, 90, 120):
+        fast_s, fast = timed(lambda: search_slots(index, START.isoformat(), end, minutes, n=10))
+        slot_search._stream, original = _stream_scan, slot_search._stream
+        try:
+            slow_s, slow = timed(lambda: search_slots(index, START.isoformat(), end, minutes, n=10))
+        finally:
+            slot_search._stream = original
+        assert fast == slow
+        skipped = sum(1 for k, c in index.capacity.items() if k[2] <= end and c[2] * SLOT_MINUTES < minutes)
+        print(f"  {minutes}-min, bitmap per day {slow_s * 1e3:8.1f} ms, rollup skip {fast_s * 1e3:8.1f} ms   "
+              f"({skipped:,} full days)")
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(*(int(a) for a in args[:2]), *(float(a) for a in args[2:3]))
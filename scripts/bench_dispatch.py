@@ -0,0 +1,55 @@
+# Benchmarks email sending: connection-per-message (old send_email) vs the pooled background Dispatcher,
+# against a local SMTP sink that charges a fixed handshake cost per connection.
+# Run: python scripts/bench_dispatch.py [n_messages] [handshake_ms]
+import shutil, smtplib, sys, tempfile, time
+from pathlib import Path
+
+BASE = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE))
+
+from smtp_sink import SMTPSink
+from utils import comms
+from utils.dispatch import Dispatcher, SMTPPool
+
+def main(n=200, handshake_ms=20):
+    with SMTPSink(connect_delay=handshake_ms / 1000) as sink:
+        msgs = [comms.build_email(f"p{i}@example.com", f"Reminder {i}", "Reminder: Upcoming visit.") for i in range(n)]
+
+        t0 = time.perf_counter()
+        for m in msgs:
+            with smtplib.SMTP("127.0.0.1", sink.port) as server:
+                server.send_message(m)
+        serial = time.perf_counter() - t0
+
+        for size in (1, 4):
+            pool = SMTPPool("127.0.0.1", sink.port, size=size)
+            disp = Dispatcher(pool, workers=size)
+            t0 = time.perf_counter()
+            ids = [disp.submit(m) for m in msgs]
+            enqueue = time.perf_counter() - t0
+            disp.flush()
+            total = time.perf_counter() - t0
+            states = {disp.status(i)["state"] for i in ids}
+            disp.stop()
+            assert states == {"sent"}, states
+            print(f"pool={size}: {n/total:8.1f} msg/s  enqueue {enqueue/n*1e6:6.1f} us/msg  "
+                  f"connects {pool.stats['connects']}  reuses {pool.stats['reuses']}")
+        print(f"serial:  {n/serial:8.1f} msg/s  (one connection per message)")
+
+        # send_email from the UI's point of view: returns as soon as the message is queued
+        tmp = Path(tempfile.mkdtemp())
+        try:
+            comms.BASE, comms.SMTP_SERVER, comms.SMTP_PORT = tmp, "127.0.0.1", sink.port
+            comms.SMTP_ENABLED = True
+            t0 = time.perf_counter()
+            paths = [comms.send_email("test@example.com", f"Reminder — A{i}", "Reminder") for i in range(3)]
+            ui = time.perf_counter() - t0
+            comms.get_dispatcher().flush()
+            print(f"'Schedule Reminders' (3 emails) blocks the UI for {ui*1000:.1f} ms; "
+                  f"delivered: {[comms.delivery_status(p)['state'] for p in paths]}")
+        finally:
+            comms.get_outbox().close()
+            shutil.rmtree(tmp, ignore_errors=True)
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:3]))
@@ -0,0 +1,89 @@
+# Benchmarks the conversation FSM (agents/flow.py): transitions/s, memory per in-memory session at
+# 10k sessions, and an app-style rerun (patient lookup + slot search) recomputed every time vs memoized.
+# Run: python scripts/bench_flow.py [n_sessions]
+import gc, random, sys, time, tracemalloc
+from pathlib import Path
+
+BASE = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE))
+
+from agents.flow import STEPS, ConversationState, Flow, Step
+from bench_patients import synthetic_patients
+from generate_data import make_schedule
+from utils.patient_index import PatientIndex
+from utils.scheduling import build_index
+from utils.slot_search import search_slots
+
+def main(n_sessions=10_000, n_reruns=2_000):
+    random.seed(3)
+    patients = synthetic_patients(10_000)
+    pindex = PatientIndex(patients)
+    docs, df = make_schedule(50, 30)
+    index = build_index(df)
+    day0 = min(d for days in index.days_by_provider().values() for d in days)
+
+    def lookup(name, dob):
+        first, last = name.split()
+        rec, _ = pindex.lookup(first, last, dob)
+        return {"patient_record": rec}
+
+    def slots(patient_record, doctor, generation):
+        return {"candidates": search_slots(index, day0, None, 60, n=10, prefer_doctor=doctor)}
+
+    flow = Flow([Step("lookup", ("name", "dob"), lookup), Step("slots", ("patient_record", "doctor", "generation"), slots)])
+    rows = patients.sample(n_sessions, replace=True, random_state=1)
+    inputs = [(f"{r.first_name} {r.last_name}", r.dob, random.choice(docs)["doctor"]) for r in rows.itertuples()]
+
+    # memory: sessions holding a patient record, 10 candidate slots and an appointment
+    gc.collect()
+    tracemalloc.start()
+    sessions = []
+    for name, dob, doctor in inputs:
+        s = ConversationState()
+        s.set(name=name, dob=dob, doctor=doctor, generation=0, appointment={}, reminders=[])
+        flow.run(s)
+        sessions.append(s)
+    gc.collect()
+    mem = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"{n_sessions:,} sessions: {mem / 2**20:.1f} MB ({mem / n_sessions / 1024:.1f} KB/session incl. record + 10 candidates)")
+
+    t0 = time.perf_counter()
+    n = 0
+    for s in sessions:
+        s.step = "greet"
+        for _ in range(len(STEPS) - 1):
+            flow.fire(s)
+        n += len(STEPS) - 1
+    print(f"transitions: {n / (time.perf_counter() - t0):,.0f}/s")
+
+    t0 = time.perf_counter()
+    for s in sessions:
+        s.snapshot()
+    print(f"snapshot: {(time.perf_counter() - t0) / n_sessions * 1e6:.2f} us")
+
+    picks = random.choices(range(n_sessions), k=n_reruns)
+    t0 = time.perf_counter()
+    for i in picks:
+        name, dob, doctor = inputs[i]
+        lookup(name, dob)
+        slots(None, doctor, 0)
+    full = (time.perf_counter() - t0) / n_reruns
+
+    t0 = time.perf_counter()
+    for i in picks:
+        sessions[i].set(name=inputs[i][0], dob=inputs[i][1], doctor=inputs[i][2], generation=0)
+        flow.run(sessions[i])
+    memo = (time.perf_counter() - t0) / n_reruns
+
+    t0 = time.perf_counter()
+    for k, i in enumerate(picks):
+        sessions[i].set(generation=k + 1)  # a booking elsewhere: only the slot step reruns
+        flow.run(sessions[i])
+    changed = (time.perf_counter() - t0) / n_reruns
+    print(f"rerun, everything recomputed: {full * 1e6:8.1f} us")
+    print(f"rerun, memoized, no change:   {memo * 1e6:8.1f} us  ({full / memo:.0f}x)")
+    print(f"rerun, schedule changed:      {changed * 1e6:8.1f} us  (lookup reused)")
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:2]))
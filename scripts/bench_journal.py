@@ -0,0 +1,65 @@
+# Benchmarks bookings/second: full save_schedule rewrite (CSV + XLSX) vs the append-only journal.
+# Run: python scripts/bench_journal.py [n_doctors] [n_days]
+import random, shutil, sys, tempfile, time
+from pathlib import Path
+
+import pandas as pd
+
+BASE = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE))
+
+from generate_data import day_slots, make_schedule
+from utils import data_io
+from utils.scheduling import reserve_slots
+
+def _save_full(df, csvp, xlsx):
+    # the pre-journal save_schedule
+    df.to_csv(csvp, index=False)
+    with pd.ExcelWriter(xlsx) as writer:
+        df.to_excel(writer, sheet_name="schedules", index=False)
+
+def main(n_doctors=3, n_days=30, n_full=10, n_journal=2000):
+    random.seed(3)
+    docs, df = make_schedule(n_doctors, n_days)
+    slots = day_slots()
+    tmp = Path(tempfile.mkdtemp())
+    try:
+        data_io.DATA = tmp
+        dates = sorted(df["date"].unique())
+        df.to_csv(tmp / "doctor_schedules.csv", index=False)
+        print(f"schedule rows: {len(df):,}")
+
+        def booking(i):
+            d = random.choice(docs)
+            k = random.randrange(len(slots) - 1)
+            return d["doctor"], d["location"], random.choice(dates), slots[k][0], slots[k + 1][1], f"J{i:06d}"
+
+        t0 = time.perf_counter()
+        for i in range(n_full):
+            b = booking(i)
+            reserve_slots(df, *b)
+            _save_full(df, tmp / "doctor_schedules.csv", tmp / "doctor_schedules.xlsx")
+        full_s = time.perf_counter() - t0
+
+        data_io.COMPACT_EVERY = n_journal + 1  # measure appends alone, compaction below
+        t0 = time.perf_counter()
+        for i in range(n_journal):
+            data_io.record_booking(*booking(i))
+        journal_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        loaded = data_io.load_schedule()
+        replay_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        data_io.compact_journal()
+        compact_s = time.perf_counter() - t0
+        assert (data_io.load_schedule()["slot_status"].tolist() == loaded["slot_status"].tolist())
+
+        print(f"full rewrite: {n_full/full_s:10.1f} bookings/s")
+        print(f"journal:      {n_journal/journal_s:10.1f} bookings/s  ({(full_s/n_full)/(journal_s/n_journal):,.0f}x)")
+        print(f"load + replay {n_journal} events: {replay_s*1000:.1f} ms   compaction: {compact_s*1000:.1f} ms")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:3]))
@@ -0,0 +1,46 @@
+# Benchmarks schedule cold start: openpyxl XLSX parse vs CSV vs the columnar binary store.
+# Run: python scripts/bench_load.py [n_doctors] [n_days]
+import shutil, sys, tempfile, time
+from pathlib import Path
+
+import pandas as pd
+
+BASE = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE))
+
+from generate_data import make_schedule
+from utils.schedule_store import read_store, write_store
+
+def _best(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+def main(n_doctors=3, n_days=30):
+    _, df = make_schedule(n_doctors, n_days)
+    tmp = Path(tempfile.mkdtemp())
+    try:
+        csvp, xlsx, binp = tmp / "s.csv", tmp / "s.xlsx", tmp / "s.bin"
+        df.to_csv(csvp, index=False)
+        write_store(df, binp)
+        runs = {"csv": lambda: pd.read_csv(csvp), "columnar": lambda: read_store(binp)}
+        if len(df) <= 200_000:  # openpyxl gets unbearably slow beyond this
+            with pd.ExcelWriter(xlsx) as writer:
+                df.to_excel(writer, sheet_name="schedules", index=False)
+            runs = {"xlsx": lambda: pd.read_excel(xlsx, sheet_name="schedules"), **runs}
+        print(f"schedule rows: {len(df):,}")
+        for name, fn in runs.items():
+            t, out = _best(fn, repeat=1 if name == "xlsx" else 3)
+            size = {"xlsx": xlsx, "csv": csvp, "columnar": binp}[name].stat().st_size
+            mem = out.memory_usage(deep=True).sum()
+            print(f"{name:9s} {t*1000:9.1f} ms  file {size/1024:9.0f} KB  frame {mem/2**20:8.1f} MB")
+        back = read_store(binp).astype(object).fillna("")
+        assert back.values.tolist() == df.values.tolist(), "columnar round-trip differs"
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:3]))
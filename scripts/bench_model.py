@@ -0,0 +1,91 @@
+# Memory of the schedule at 1k doctors x 365 days: DataFrame of strings (object and pandas string
+# dtype, measured on a slice of doctors and scaled per row) vs utils/schedule_model.ScheduleModel
+# (64-bit day words + appointment side table), plus adapter and index-build timings.
+# Run: python scripts/bench_model.py [n_doctors] [n_days] [booked_fraction]
+import gc, sys, time, tracemalloc
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BASE = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE))
+
+from generate_data import day_slots, make_doctors, make_locations
+from utils.schedule_model import ScheduleModel
+from utils.scheduling import build_index
+
+def schedule_frame(docs, n_days, booked, seed=0):
+    """The slot grid of generate_data for docs, one batch at a time; ~booked of them in 2-slot appointments."""
+    slots = day_slots()
+    days = [(date(2025, 1, 1) + timedelta(days=i)).isoformat() for i in range(n_days)]
+    per_doc = n_days * len(slots)
+    rng = np.random.default_rng(seed)
+    n = len(docs) * per_doc
+    pair_booked = np.repeat(rng.random((n + 1) // 2) < booked, 2)[:n]
+    appt = np.where(pair_booked, np.char.add("A", (np.arange(n) // 2 + seed * n).astype(str)), "")
+    return pd.DataFrame({
+        "doctor_id": np.repeat([d["doctor_id"] for d in docs], per_doc).astype(object),
+        "doctor": np.repeat([d["doctor"] for d in docs], per_doc).astype(object),
+        "location": np.repeat([d["location"] for d in docs], per_doc).astype(object),
+        "date": np.tile(np.repeat(days, len(slots)), len(docs)).astype(object),
+        "start_time": np.tile([s for s, _ in slots], len(docs) * n_days).astype(object),
+        "end_time": np.tile([e for _, e in slots], len(docs) * n_days).astype(object),
+        "slot_status": np.where(pair_booked, "booked", "available").astype(object),
+        "appointment_id": appt.astype(object),
+    })
+
+def main(n_doctors=1000, n_days=365, booked=0.3, batch=50):
+    docs = make_doctors(n_doctors, make_locations(3), np.random.default_rng([42, 0]))
+    rows = n_doctors * n_days * len(day_slots())
+    print(f"{n_doctors} doctors x {n_days} days = {rows:,} slot rows, {booked:.0%} booked")
+
+    sample = schedule_frame(docs[:batch], n_days, booked)
+    # CSV text read back the way load_schedule does it, so strings are not shared between rows
+    obj = pd.read_csv(pd.io.common.StringIO(sample.to_csv(index=False)), dtype=object, keep_default_na=False)
+    per_row_obj = obj.memory_usage(deep=True).sum() / len(obj)
+    per_row_str = obj.astype("str").memory_usage(deep=True).sum() / len(obj)
+    del obj
+    print(f"DataFrame (object strings):  {per_row_obj * rows / 2**20:9.1f} MB  ({per_row_obj:.0f} B/row, from {batch} doctors)")
+    print(f"DataFrame (pandas str dtype): {per_row_str * rows / 2**20:9.1f} MB  ({per_row_str:.0f} B/row)")
+
+    # tracemalloc is too slow for the full build: check nbytes() against it on one slice
+    gc.collect()
+    tracemalloc.start()
+    part = ScheduleModel.from_frame(sample)
+    gc.collect()
+    traced = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"  check on {batch} doctors: nbytes() {part.nbytes() / 2**20:.1f} MB vs traced {traced / 2**20:.1f} MB")
+
+    model, build_s = ScheduleModel(), 0.0
+    for i in range(0, n_doctors, batch):
+        frame = schedule_frame(docs[i:i + batch], n_days, booked, seed=i)
+        t0 = time.perf_counter()
+        model.add_frame(frame)
+        build_s += time.perf_counter() - t0
+    del frame
+    words = sum(len(p.scheduled) * 16 for p in model.providers)
+    runs = sum(len(p.appointments) for p in model.providers)
+    total = model.nbytes()
+    print(f"ScheduleModel:               {total / 2**20:9.1f} MB  (day words {words / 2**20:.1f} MB, {runs:,} appointment entries)"
+          f"  {per_row_obj * rows / total:.0f}x smaller than object strings")
+    print(f"from_frame: {build_s:.1f} s ({build_s / rows * 1e9:.0f} ns/row)")
+
+    t0 = time.perf_counter()
+    back = part.to_frame()
+    to_s = time.perf_counter() - t0
+    assert back.values.tolist() == sample.values.tolist()
+    t0 = time.perf_counter()
+    build_index(back)
+    idx_frame = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    part.availability_index()
+    idx_model = time.perf_counter() - t0
+    print(f"{batch} doctors: to_frame {to_s * 1000:.0f} ms (round trip exact); AvailabilityIndex from frame "
+          f"{idx_frame * 1000:.0f} ms vs from model {idx_model * 1000:.0f} ms")
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(*(int(a) for a in args[:2]), *(float(a) for a in args[2:3]))
@@ -0,0 +1,78 @@
+# Benchmarks patient lookup: full-column scan (old intake form) vs PatientIndex, at 10k/100k/1M patients.
+# Run: python scripts/bench_patients.py [sizes...]
+import random, sys, time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BASE = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE))
+
+from generate_data import first_names, last_names
+from utils.patient_index import PatientIndex
+
+def synthetic_patients(n, seed=0):
+    rng = np.random.default_rng(seed)
+    # suffix a number onto names so keys are mostly unique like a real extract
+    suffix = rng.integers(0, 1000, n).astype(str)
+    dob = pd.Timestamp("1940-01-01") + pd.to_timedelta(rng.integers(0, 70 * 365, n), unit="D")
+    return pd.DataFrame({
+        "patient_id": [f"P{i:07d}" for i in range(n)],
+        "first_name": np.char.add(rng.choice(first_names, n).astype(str), np.char.add("a", suffix)),
+        "last_name": rng.choice(last_names, n),
+        "dob": dob.strftime("%Y-%m-%d"),
+    })
+
+def _scan(df, fn, ln, dob):
+    mask = (
+        (df["first_name"].str.lower()==fn) &
+        (df["last_name"].str.lower()==ln) &
+        (df["dob"]==dob)
+    )
+    return df[mask].iloc[0].to_dict() if mask.any() else None
+
+def main(sizes=(10_000, 100_000, 1_000_000), n_queries=200):
+    random.seed(5)
+    print(f"{'patients':>10} {'build s':>8} {'scan ms':>9} {'exact us':>9} {'phon. 1st ms':>12} {'phon. us':>9} {'incr. s':>8}")
+    for n in sizes:
+        df = synthetic_patients(n)
+        picks = df.sample(n_queries, random_state=1)
+        queries = list(zip(picks["first_name"], picks["last_name"], picks["dob"]))
+
+        t0 = time.perf_counter()
+        idx = PatientIndex(df)
+        build = time.perf_counter() - t0
+
+        scan_q = queries[:max(5, n_queries * 10_000 // n)]
+        t0 = time.perf_counter()
+        for fn, ln, dob in scan_q:
+            _scan(df, fn.lower(), ln.lower(), dob)
+        scan = (time.perf_counter() - t0) / len(scan_q)
+
+        t0 = time.perf_counter()
+        for fn, ln, dob in queries:
+            rec, tier = idx.lookup(fn.upper() + " ", " " + ln, dob)
+            assert tier == "exact" and rec["first_name"] == fn
+        exact = (time.perf_counter() - t0) / len(queries)
+
+        # typo in the last name: misses the exact tier, caught by Soundex
+        t0 = time.perf_counter()
+        idx.lookup(queries[0][0], queries[0][1] + "h", queries[0][2])
+        phon_first = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        for fn, ln, dob in queries:
+            rec, tier = idx.lookup(fn, ln + "h", dob)
+            assert rec is not None
+        phon = (time.perf_counter() - t0) / len(queries)
+
+        # incremental refresh after appending 1% new patients
+        grown = pd.concat([df, synthetic_patients(n // 100, seed=9)], ignore_index=True)
+        t0 = time.perf_counter()
+        idx.update(grown)
+        incr = time.perf_counter() - t0
+
+        print(f"{n:>10,} {build:8.2f} {scan*1000:9.2f} {exact*1e6:9.1f} {phon_first*1000:12.1f} {phon*1e6:9.1f} {incr:8.2f}")
+
+if __name__ == "__main__":
+    main(tuple(int(a) for a in sys.argv[1:]) or (10_000, 100_000, 1_000_000))
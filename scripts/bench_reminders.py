@@ -0,0 +1,104 @@
+# Benchmarks the reminder engine at 1M pending reminders: memory, per-tick latency, restart recovery.
+# Then the claim-expiry check: a process stalls mid-dispatch past CLAIM_SECONDS, a second process
+# re-dispatches the batch through send_reminders, and the outbox must still hold one email per reminder.
+# Run: python scripts/bench_reminders.py [n_pending]
+import collections, gc, multiprocessing, os, random, shutil, sys, tempfile, time, tracemalloc
+from pathlib import Path
+
+BASE = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE))
+
+from utils import comms
+from utils.outbox import iter_messages
+from utils.reminders import ACTIONS, CLAIM_SECONDS, Reminder, ReminderScheduler, send_reminders
+
+def _dispatcher(tmp, log, now, ready, dispatched, release, resent):
+    """One scheduler process; the "stall" one blocks after dispatching until released, the other re-sends."""
+    sys.stdout = open(os.devnull, "w")  # send_email prints a line per email without SMTP
+    comms.BASE, comms.SMTP_ENABLED = tmp, False
+    if resent is None:
+        def stall(batch):
+            send_reminders(batch)
+            comms.get_outbox().flush()
+            dispatched.set()
+            release.wait()
+        ready.wait()
+        ReminderScheduler(log_path=log, dispatch=stall).tick(now)
+    else:
+        comms.send_email("earlier@example.com", "Reminder", "an earlier run", dedup_key="earlier")  # keys loaded
+        ready.set()
+        dispatched.wait()
+        resent.value = len(ReminderScheduler(log_path=log, dispatch=send_reminders).tick(now + CLAIM_SECONDS + 1))
+    comms.get_outbox().close()
+
+def claim_expiry_check(tmp, n=200):
+    log, now = tmp / "claims.jsonl", 1_800_000_000.0
+    ReminderScheduler(log_path=log).add([Reminder(f"c{i:04d}", f"C{i:04d}", now, "email", f"p{i}@example.com", None,
+                                                  f"Reminder — C{i:04d}", "Reminder: Upcoming visit.")
+                                         for i in range(n)])
+    ready, dispatched, release = multiprocessing.Event(), multiprocessing.Event(), multiprocessing.Event()
+    resent = multiprocessing.Value("i", -1)
+    procs = [multiprocessing.Process(target=_dispatcher, args=(tmp, log, now, ready, dispatched, release, r))
+             for r in (None, resent)]
+    for p in procs:
+        p.start()
+    procs[1].join()
+    release.set()
+    procs[0].join()
+    assert all(p.exitcode == 0 for p in procs)
+    per_key = collections.Counter(r["key"] for r in iter_messages(tmp / "outbox") if r["key"].startswith("reminder-"))
+    twice = sum(c > 1 for c in per_key.values())
+    assert resent.value == n and len(per_key) == n and not twice, f"{resent.value} re-sent, {twice} emailed twice"
+    print(f"claim expiry: {n} reminders re-dispatched by a second process after CLAIM_SECONDS, "
+          f"one outbox email each")
+
+def main(n=1_000_000, batch=10_000):
+    random.seed(1)
+    tmp = Path(tempfile.mkdtemp())
+    try:
+        log = tmp / "reminders.jsonl"
+        now = 1_800_000_000.0
+        sent = []
+        gc.collect()
+        tracemalloc.start()
+        sched = ReminderScheduler(log_path=log, dispatch=sent.extend, clock=lambda: now)
+        t0 = time.perf_counter()
+        for start in range(0, n, batch):
+            sched.add([Reminder(f"r{i:08d}", f"A{i // 3:07d}", now + random.uniform(0, 90 * 86400),
+                                "email+sms", "patient@example.com", None, f"Reminder — A{i // 3:07d}",
+                                "Reminder: Upcoming visit." + ACTIONS)
+                       for i in range(start, min(start + batch, n))])
+        add_s = time.perf_counter() - t0
+        mem = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print(f"pending: {len(sched.pending):,}  add: {n/add_s:,.0f}/s  memory: {mem/2**20:.0f} MB ({mem/n:.0f} B/reminder)")
+
+        t0 = time.perf_counter()
+        sched.tick(now - 1)
+        idle = time.perf_counter() - t0
+        print(f"idle tick (nothing due): {idle*1e6:.1f} us")
+
+        for horizon in (60, 3600, 86400):
+            t0 = time.perf_counter()
+            got = sched.tick(now + horizon)
+            print(f"tick with {len(got):>6,} due: {(time.perf_counter()-t0)*1000:8.2f} ms")
+            now += horizon
+
+        cancelled = sum(sched.cancel_appointment(f"A{k:07d}") for k in random.sample(range(n // 3), min(1000, n // 3)))
+        print(f"cancelled {cancelled} reminders of 1000 appointments")
+
+        pending = len(sched.pending)
+        del sched
+        gc.collect()
+        t0 = time.perf_counter()
+        recovered = ReminderScheduler(log_path=log, clock=lambda: now)
+        print(f"restart recovery: {len(recovered.pending):,} pending in {time.perf_counter()-t0:.2f}s "
+              f"(log {log.stat().st_size/2**20:.0f} MB)")
+        assert len(recovered.pending) == pending
+
+        claim_expiry_check(tmp)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:2]))
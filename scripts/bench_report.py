@@ -0,0 +1,60 @@
+# Admin report over ~5M booked slots (1k doctors x 365 days, 57% booked in 30-min appointments):
+# peak RSS and wall time of the in-memory path (load_schedule + one DataFrame written out, which is
+# where export_admin_report ends up past Excel's row limit) vs the streaming exporter in
+# utils/admin_report.py (csv / parquet / xlsx). Each run is a fresh process on a columnar store.
+# Run: python scripts/bench_report.py [n_doctors] [n_days] [booked_fraction] [formats, e.g. csv,parquet,xlsx]
+import json, os, resource, shutil, subprocess, sys, tempfile, time
+from datetime import date
+from pathlib import Path
+
+BASE = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE))
+
+from generate_data import generate
+
+def child(mode, data_dir, out_dir):
+    os.environ["SCHEDULE_BACKEND"] = "columnar"
+    from utils import data_io
+    data_io.DATA = Path(data_dir)
+    t0 = time.perf_counter()
+    if mode == "in-memory":
+        df = data_io.load_schedule()
+        booked = df[df["slot_status"] == "booked"]
+        booked.to_csv(Path(out_dir) / "appointments.csv", index=False)
+    else:
+        from utils.admin_report import export_bookings_report
+        export_bookings_report(fmt=mode, as_of="2025-07-01", out_dir=out_dir)
+    elapsed = time.perf_counter() - t0
+    print(json.dumps({"seconds": elapsed, "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}))
+
+def main(n_doctors=1000, n_days=365, booked=0.57, formats="csv,parquet,xlsx"):
+    tmp = Path(tempfile.mkdtemp())
+    try:
+        t0 = time.perf_counter()
+        counts = generate(tmp, n_patients=0, n_doctors=n_doctors, n_days=n_days, start=date(2025, 1, 1),
+                          occupancy=booked, fmt="store")
+        print(f"{n_doctors} doctors x {n_days} days: {counts['slots']:,} slots, {counts['appointments']:,} appointments "
+              f"(store generated in {time.perf_counter() - t0:.1f}s)")
+        print(f"{'exporter':<22} {'wall s':>8} {'peak RSS MB':>12} {'output MB':>10}")
+        for mode in ["in-memory"] + formats.split(","):
+            out = tmp / f"out-{mode}"
+            out.mkdir()
+            r = subprocess.run([sys.executable, __file__, "--child", mode, str(tmp), str(out)],
+                               capture_output=True, text=True, cwd=BASE)
+            if r.returncode:
+                print(f"{mode:<22} failed: {r.stderr.strip().splitlines()[-1]}")
+                continue
+            res = json.loads(r.stdout.strip().splitlines()[-1])
+            size = sum(p.stat().st_size for p in out.rglob("*") if p.is_file()) / 2**20
+            label = mode if mode == "in-memory" else f"streaming {mode}"
+            print(f"{label:<22} {res['seconds']:8.1f} {res['rss_mb']:12.0f} {size:10.0f}")
+            shutil.rmtree(out)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--child"]:
+        child(*sys.argv[2:5])
+    else:
+        args = sys.argv[1:]
+        main(*(int(a) for a in args[:2]), *(float(a) for a in args[2:3]), *args[3:4])
@@ -0,0 +1,77 @@
+# Benchmarks the ranked multi-day / multi-doctor slot search (utils/slot_search.py) at 30/90/365-day
+# horizons against one-date-at-a-time guessing (DataFrame scan per guess) and an exhaustive
+# per-day loop over the same bitmaps, which also checks the ranking.
+# Run: python scripts/bench_search.py [n_doctors] [booked_fraction]
+import random, sys, time
+from pathlib import Path
+
+import numpy as np
+
+BASE = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE))
+
+from generate_data import make_schedule
+from utils.scheduling import build_index, find_contiguous_slots
+from utils.slot_search import LOAD_PENALTY, PREFERENCE_PENALTY, _ordinal, search_slots
+from utils.slot_index import to_minutes
+
+def exhaustive(index, start, end, minutes, n, prefer_doctor=None, earliest=None, specialty=None, specialties=None):
+    scored = []
+    for (doctor, location), days in index.days_by_provider().items():
+        if specialty is not None and specialties.get(doctor) != specialty:
+            continue
+        for d in days:
+            if not start <= d <= end:
+                continue
+            key = (doctor, location, d)
+            load = 1 - bin(index.free[key]).count("1") / bin(index.slots[key]).count("1")
+            for s, _ in index.windows(doctor, location, d, minutes, limit=None):
+                if earliest and to_minutes(s) < to_minutes(earliest):
+                    continue
+                t = (_ordinal(d) - _ordinal(start)) * 1440 + to_minutes(s)
+                score = t + LOAD_PENALTY * load + (PREFERENCE_PENALTY if prefer_doctor and doctor != prefer_doctor else 0)
+                scored.append(round(score, 1))
+    return sorted(scored)[:n]
+
+def main(n_doctors=100, booked=0.6, n_queries=50):
+    random.seed(11)
+    docs, df = make_schedule(n_doctors, 365)
+    specialties = {d["doctor"]: d["specialty"] for d in docs}
+    rng = np.random.default_rng(11)
+    df.loc[rng.random(len(df)) < booked, "slot_status"] = "booked"
+    dates = sorted(df["date"].unique())
+    print(f"schedule rows: {len(df):,}  doctors: {n_doctors}  booked: {booked:.0%}")
+
+    t0 = time.perf_counter()
+    idx = build_index(df)
+    idx.days_by_provider()
+    print(f"index build: {(time.perf_counter()-t0)*1000:.0f} ms (once)")
+
+    t0 = time.perf_counter()
+    for d in random.choices(docs, k=10):
+        find_contiguous_slots(df, d["doctor"], d["location"], random.choice(dates), 60)
+    guess = (time.perf_counter() - t0) / 10
+    print(f"one date guess (scan, one doctor): {guess*1000:.1f} ms")
+
+    print(f"{'horizon':>8} {'query':<28} {'exhaustive ms':>14} {'search ms':>10} {'speedup':>8}")
+    for horizon in (30, 90, 365):
+        end = dates[horizon - 1]
+        cases = {
+            "any doctor, 60 min":      dict(minutes_needed=60),
+            "preferred doctor, 30 min": dict(minutes_needed=30, prefer_doctor=docs[0]["doctor"]),
+            "specialty, after 16:00":  dict(minutes_needed=60, specialty="Cardiology", specialties=specialties, earliest="16:00"),
+        }
+        for label, kw in cases.items():
+            t0 = time.perf_counter()
+            want = exhaustive(idx, dates[0], end, kw["minutes_needed"], 10, kw.get("prefer_doctor"), kw.get("earliest"),
+                              kw.get("specialty"), kw.get("specialties"))
+            ex = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            for _ in range(n_queries):
+                got = search_slots(idx, dates[0], end, n=10, **kw)
+            fast = (time.perf_counter() - t0) / n_queries
+            assert [g["score"] for g in got] == want, (label, got, want)
+            print(f"{horizon:>8} {label:<28} {ex*1000:14.1f} {fast*1000:10.3f} {ex/fast:7.0f}x")
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:2]), *(float(a) for a in sys.argv[2:3]))
@@ -0,0 +1,40 @@
+# Benchmarks find_contiguous_slots: DataFrame scan vs AvailabilityIndex.
+# Run: python scripts/bench_slots.py [n_doctors] [n_days]
+import random, sys, time
+from pathlib import Path
+
+BASE = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE))
+
+from generate_data import make_schedule
+from utils.scheduling import build_index, find_contiguous_slots
+
+def main(n_doctors=300, n_days=90, n_queries=200):
+    random.seed(7)
+    docs, df = make_schedule(n_doctors, n_days)
+    # book ~30% of rows so the windows are not trivially contiguous
+    df.loc[df.sample(frac=0.3, random_state=7).index, "slot_status"] = "booked"
+    dates = sorted(df["date"].unique())
+    queries = [(d["doctor"], d["location"], random.choice(dates), random.choice((30, 60)))
+               for d in random.choices(docs, k=n_queries)]
+    print(f"schedule rows: {len(df):,}  queries: {n_queries}")
+
+    t0 = time.perf_counter()
+    idx = build_index(df)
+    build_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    scan = [find_contiguous_slots(df, *q[:3], minutes_needed=q[3]) for q in queries]
+    scan_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    fast = [find_contiguous_slots(df, *q[:3], minutes_needed=q[3], index=idx) for q in queries]
+    idx_s = time.perf_counter() - t0
+
+    assert scan == fast, "index results differ from scan"
+    print(f"index build:  {build_s*1000:9.1f} ms (once)")
+    print(f"scan:         {scan_s/n_queries*1000:9.3f} ms/query")
+    print(f"index:        {idx_s/n_queries*1000:9.3f} ms/query  ({scan_s/max(idx_s, 1e-9):,.0f}x)")
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:3]))
@@ -0,0 +1,102 @@
+# SQLite backend (utils/sqlite_store.py) vs the CSV files for search, booking and patient lookup.
+# Search: full CSV load + frame scan (a cold process), the frame scan alone (warm), and the
+# AvailabilityIndex, vs one primary-key range read per query. Booking: journal append (CSV
+# backend) vs the single guarded INSERT (both fsync every booking). Also the one-shot import.
+# Run: python scripts/bench_sqlite.py [n_doctors] [n_days] [n_patients]
+import random, shutil, sys, tempfile, time
+from datetime import date
+from pathlib import Path
+
+BASE = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE))
+
+from generate_data import generate
+from utils import data_io, sqlite_store
+from utils.scheduling import build_index, find_contiguous_slots
+
+START = date(2025, 1, 1)
+
+def per_op(fn, items, repeat=3):
+    """Best-of-repeat seconds per item."""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for it in items:
+            fn(*it)
+        best = min(best, (time.perf_counter() - t0) / len(items))
+    return best
+
+def main(n_doctors=200, n_days=90, n_patients=20_000):
+    random.seed(5)
+    tmp = Path(tempfile.mkdtemp())
+    try:
+        counts = generate(tmp, n_patients=n_patients, n_doctors=n_doctors, n_days=n_days, start=START, occupancy=0.3)
+        data_io.DATA = tmp
+        data_io.SCHEDULE_BACKEND = "csv"
+        t0 = time.perf_counter()
+        sqlite_store.import_files(tmp / data_io.DB_NAME, tmp / "doctor_schedules.csv", tmp / "patients.csv")
+        import_s = time.perf_counter() - t0
+        db_mb = (tmp / data_io.DB_NAME).stat().st_size / 2**20
+        csv_mb = (tmp / "doctor_schedules.csv").stat().st_size / 2**20
+        print(f"{counts['slots']:,} slots, {counts['patients']:,} patients; import {import_s:.1f}s, "
+              f"scheduling.db {db_mb:.0f} MB (schedule CSV {csv_mb:.0f} MB)")
+
+        df = data_io.load_schedule()
+        index = build_index(df)
+        days = df[["doctor", "location", "date"]].drop_duplicates().to_numpy().tolist()
+        queries = [tuple(d) + (30,) for d in random.sample(days, min(500, len(days)))]
+        conn = sqlite_store.connect(tmp / data_io.DB_NAME)
+        for q in queries[:50]:
+            assert find_contiguous_slots(df, *q) == sqlite_store.find_windows(conn, *q), q
+
+        rows = []
+        t0 = time.perf_counter()
+        cold = find_contiguous_slots(data_io.load_schedule(), *queries[0])
+        rows.append(("search, cold (load + scan)", time.perf_counter() - t0, "csv"))
+        data_io.SCHEDULE_BACKEND = "sqlite"
+        sqlite_store.close(tmp / data_io.DB_NAME)
+        t0 = time.perf_counter()
+        assert sqlite_store.find_windows(sqlite_store.connect(tmp / data_io.DB_NAME), *queries[0]) == cold
+        rows.append(("search, cold (connect + query)", time.perf_counter() - t0, "sqlite"))
+        conn = sqlite_store.connect(tmp / data_io.DB_NAME)
+        rows.append(("search, warm frame scan", per_op(lambda *q: find_contiguous_slots(df, *q), queries[:50]), "csv"))
+        rows.append(("search, warm AvailabilityIndex", per_op(lambda *q: find_contiguous_slots(df, *q, index=index), queries), "csv"))
+        rows.append(("search, indexed query", per_op(lambda *q: sqlite_store.find_windows(conn, *q), queries), "sqlite"))
+
+        t0 = time.perf_counter()
+        data_io.SCHEDULE_BACKEND = "csv"
+        data_io.load_patients()
+        rows.append(("patients, load", time.perf_counter() - t0, "csv"))
+        patients = data_io.load_patients()
+        keys = [tuple(r) for r in patients.sample(min(500, len(patients)), random_state=0)[["first_name", "last_name", "dob"]].to_numpy()]
+        scan = lambda f, l, d: patients[(patients["first_name"] == f) & (patients["last_name"] == l) & (patients["dob"] == d)]
+        rows.append(("patient lookup, frame scan", per_op(scan, keys[:100]), "csv"))
+        rows.append(("patient lookup, indexed query", per_op(lambda *k: sqlite_store.find_patients(conn, *k), keys), "sqlite"))
+
+        # bookings: a free 30-minute window on distinct days, same list for both backends
+        free = [(d, index.windows(*d, 30, limit=1)) for d in random.sample(days, min(1000, len(days)))]
+        bookings = [(*d, *w[0], f"Q{i}") for i, (d, w) in enumerate(free) if w]
+        data_io.COMPACT_EVERY = len(bookings) + 1  # appends alone
+        t0 = time.perf_counter()
+        for b in bookings:
+            data_io.record_booking(*b)
+        rows.append(("booking, journal append", (time.perf_counter() - t0) / len(bookings), "csv"))
+        data_io.SCHEDULE_BACKEND = "sqlite"
+        t0 = time.perf_counter()
+        ok = [data_io.record_booking(*b) for b in bookings]
+        rows.append(("booking, guarded INSERT", (time.perf_counter() - t0) / len(bookings), "sqlite"))
+        assert all(ok)
+        t0 = time.perf_counter()
+        again = [data_io.record_booking(*b[:5], b[5] + "x") for b in bookings[:100]]
+        rows.append(("booking, rejected double-book", (time.perf_counter() - t0) / len(again), "sqlite"))
+        assert not any(again)
+
+        print(f"{'operation':<34} {'backend':>8} {'ms':>10}")
+        for name, sec, backend in rows:
+            print(f"{name:<34} {backend:>8} {sec * 1000:10.3f}")
+    finally:
+        sqlite_store.close(tmp / data_io.DB_NAME)
+        shutil.rmtree(tmp, ignore_errors=True)
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:4]))
@@ -0,0 +1,231 @@
+# Benchmark suite and regression gate for the booking pipeline. Times each hot path at several
+# dataset sizes (doctors x 30 days, 100 patients per doctor) plus a headless
+# intake -> search -> reserve -> confirm -> remind scenario, fully offline: data is generated into a
+# temp dir and email goes to scripts/smtp_sink.py. Every metric is seconds per operation (best of
+# --repeat runs). Results are written as JSON with machine metadata; --check compares them to the
+# stored baseline and exits 1 when a metric got slower by more than --threshold.
+# Run: python scripts/bench_suite.py [--sizes 10,100,1000] [--out results.json] [--check | --update-baseline]
+#        [--baseline scripts/bench_baseline.json] [--threshold 0.3] [--repeat 3]
+import argparse, json, os, platform, shutil, statistics, subprocess, sys, tempfile, time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BASE = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE))
+
+from generate_data import generate
+from smtp_sink import SMTPSink
+from utils import comms, data_io
+from utils.data_service import DataService
+from utils.patient_index import PatientIndex
+from utils.reminders import ReminderScheduler
+from utils.scheduling import build_index, find_contiguous_slots, reserve_slots
+from utils.slot_search import search_slots
+
+BASELINE = Path(__file__).with_name("bench_baseline.json")
+START = date(2025, 1, 1)
+DAYS = 30
+
+def best(fn, ops, repeat):
+    """Seconds per op: fn() performs `ops` operations; best of `repeat` runs."""
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) / ops)
+    return min(times)
+
+def machine():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE, capture_output=True,
+                                text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"), "commit": commit,
+        "platform": platform.platform(), "machine": platform.machine(), "processor": platform.processor(),
+        "cpus": os.cpu_count(), "python": platform.python_version(),
+        "numpy": np.__version__, "pandas": pd.__version__,
+    }
+
+def _use(data_dir, backend="csv"):
+    data_io.DATA = data_dir
+    data_io.SCHEDULE_BACKEND = backend
+    data_io._journal_events = None  # per-directory journal line count
+
+def _queries(df, n, rng):
+    days = df[["doctor", "location", "date"]].drop_duplicates().to_numpy()
+    return [tuple(map(str, days[i])) for i in rng.integers(0, len(days), n)]
+
+def hot_paths(tmp, n_doctors, repeat):
+    """Metrics for one dataset size."""
+    out = {}
+    generate(tmp / "store", n_patients=0, n_doctors=n_doctors, n_days=DAYS, start=START, occupancy=0.3, fmt="store")
+    generate(tmp, n_patients=100 * n_doctors, n_doctors=n_doctors, n_days=DAYS, start=START, occupancy=0.3)
+    shutil.copy(tmp / "store" / "doctor_schedules.bin", tmp / "doctor_schedules.bin")
+    rng = np.random.default_rng(0)
+
+    _use(tmp, "columnar")
+    out["load_schedule.columnar"] = best(data_io.load_schedule, 1, repeat)
+    _use(tmp, "csv")
+    out["load_schedule.csv"] = best(data_io.load_schedule, 1, repeat)
+    df = data_io.load_schedule()
+    out["build_index"] = best(lambda: build_index(df), 1, repeat)
+    index = build_index(df)
+
+    qs = _queries(df, 20, rng)
+    out["find_contiguous_slots.scan"] = best(lambda: [find_contiguous_slots(df, *q, 30) for q in qs], len(qs), repeat)
+    qs = _queries(df, 2000, rng)
+    out["find_contiguous_slots.index"] = best(lambda: [find_contiguous_slots(df, *q, 30, index=index) for q in qs],
+                                              len(qs), repeat)
+    starts = [(START + timedelta(days=int(d))).isoformat() for d in rng.integers(0, DAYS - 14, 200)]
+    out["search_slots.14d"] = best(lambda: [search_slots(index, s, minutes_needed=60, n=10) for s in starts],
+                                   len(starts), repeat)
+
+    def reserve():
+        frame, idx = df.copy(), build_index(df)
+        wanted = []
+        for i, (doc, loc, day) in enumerate(_queries(df, 200, rng)):
+            w = idx.windows(doc, loc, day, 30, limit=1)
+            if w:
+                wanted.append((doc, loc, day, *w[0], f"B{i}"))
+        t0 = time.perf_counter()
+        for b in wanted:
+            reserve_slots(frame, *b, index=idx)
+        return (time.perf_counter() - t0) / max(1, len(wanted))
+    out["reserve_slots.index"] = min(reserve() for _ in range(repeat))
+
+    out["save_schedule"] = best(lambda: data_io.save_schedule(df), 1, repeat)
+    events = [("D001", "Koramangala", START.isoformat(), "10:00", "10:15", f"J{i}") for i in range(50)]
+    out["record_booking"] = best(lambda: [data_io.record_booking(*e) for e in events], len(events), repeat)
+    data_io.save_schedule(df)  # drop the journal again
+
+    patients = data_io.load_patients()
+    out["patient_index.build"] = best(lambda: PatientIndex(patients), 1, repeat)
+    pidx = PatientIndex(patients)
+    rows = patients.sample(1000, random_state=0)[["first_name", "last_name", "dob"]].to_numpy()
+    out["patient_lookup.exact"] = best(lambda: [pidx.lookup(f, l, d) for f, l, d in rows], len(rows), repeat)
+    return out
+
+def send_email_path(tmp, sink, n=200):
+    """send_email until delivery: queueing cost per call and end-to-end seconds per message."""
+    t0 = time.perf_counter()
+    paths = [comms.send_email(f"p{i}@example.com", f"Reminder — A{i}", "Reminder: upcoming visit.") for i in range(n)]
+    queued = (time.perf_counter() - t0) / n
+    comms.get_dispatcher().flush()
+    total = (time.perf_counter() - t0) / n
+    states = {comms.delivery_status(p)["state"] for p in paths}
+    assert states == {"sent"}, states
+    return {"send_email.enqueue": queued, "send_email.delivered": total}
+
+def scenario(tmp, n_patients=50):
+    """Headless intake -> search -> reserve -> confirm -> remind for n_patients; per-patient latencies."""
+    _use(tmp, "csv")
+    data = DataService()
+    reminders = ReminderScheduler(log_path=tmp / "reminders.jsonl", dispatch=lambda batch: None)
+    patients = data.patients().sample(n_patients, random_state=1).to_dict("records")
+    data.schedule()
+    lat = []
+    for i, p in enumerate(patients):
+        t0 = time.perf_counter()
+        record, _ = data.patient_index().lookup(p["first_name"], p["last_name"], p["dob"])
+        minutes = 30 if record["is_returning"] == "Y" else 60
+        _, index = data.schedule()
+        found = search_slots(index, START.isoformat(), (START + timedelta(days=13)).isoformat(), minutes, n=5,
+                             prefer_doctor=record["preferred_doctor"], prefer_location=record["location"])
+        slot = found[0]
+        appt_id = f"S{i}"
+        assert data.book(slot["doctor"], slot["location"], slot["date"], slot["start_time"], slot["end_time"], appt_id)
+        appt = {"appointment_id": appt_id, **{k: slot[k] for k in ("doctor", "location", "date", "start_time", "end_time")}}
+        comms.send_email(record["email"], f"Appointment Confirmation — {appt_id}", f"Confirmed: {slot}")
+        comms.send_sms(record["phone"], f"Appt {appt_id} confirmed.")
+        reminders.schedule_for_appointment(appt, record["email"], record["phone"])
+        lat.append(time.perf_counter() - t0)
+    comms.get_dispatcher().flush()
+    lat.sort()
+    return {"scenario.per_patient": statistics.mean(lat), "scenario.p95": lat[int(len(lat) * 0.95)]}
+
+def run(sizes, repeat):
+    results = {}
+    tmp = Path(tempfile.mkdtemp())
+    saved = (data_io.DATA, data_io.SCHEDULE_BACKEND, comms.BASE, comms.SMTP_SERVER, comms.SMTP_PORT, comms.SMTP_ENABLED,
+             comms.SMTP_STARTTLS)
+    try:
+        with SMTPSink() as sink:
+            comms.BASE, comms.SMTP_SERVER, comms.SMTP_PORT, comms.SMTP_ENABLED = tmp, "127.0.0.1", sink.port, True
+            comms.SMTP_STARTTLS = False
+            for n in sizes:
+                d = tmp / f"d{n}"
+                d.mkdir()
+                t0 = time.perf_counter()
+                for k, v in hot_paths(d, n, repeat).items():
+                    results[f"{k}@{n}"] = v
+                for k, v in scenario(d).items():
+                    results[f"{k}@{n}"] = v
+                print(f"  size {n} doctors done in {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+            results.update(send_email_path(tmp, sink))
+            if comms._dispatcher is not None:
+                comms._dispatcher.stop()
+                comms._dispatcher = None
+            comms.get_outbox().close()
+    finally:
+        (data_io.DATA, data_io.SCHEDULE_BACKEND, comms.BASE, comms.SMTP_SERVER, comms.SMTP_PORT, comms.SMTP_ENABLED,
+         comms.SMTP_STARTTLS) = saved
+        data_io._journal_events = None
+        shutil.rmtree(tmp, ignore_errors=True)
+    return results
+
+def compare(results, baseline, threshold):
+    """Prints the comparison; returns the metrics that regressed beyond threshold."""
+    regressed = []
+    print(f"{'metric':<40} {'baseline':>12} {'current':>12} {'change':>8}")
+    for k in sorted(results):
+        cur, base = results[k], baseline.get(k)
+        if base is None:
+            print(f"{k:<40} {'-':>12} {cur * 1e3:10.3f}ms {'new':>8}")
+            continue
+        change = cur / base - 1
+        flag = "  << REGRESSION" if change > threshold else ""
+        print(f"{k:<40} {base * 1e3:10.3f}ms {cur * 1e3:10.3f}ms {change:+7.0%}{flag}")
+        if flag:
+            regressed.append(k)
+    return regressed
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Booking pipeline benchmark suite")
+    ap.add_argument("--sizes", default="10,100,1000", help="comma-separated doctor counts")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--out", help="write results JSON here")
+    ap.add_argument("--baseline", default=str(BASELINE))
+    ap.add_argument("--threshold", type=float, default=0.3, help="allowed slowdown, 0.3 = 30%%")
+    ap.add_argument("--check", action="store_true", help="exit 1 on a regression against --baseline")
+    ap.add_argument("--update-baseline", action="store_true", help="store this run as the new baseline")
+    args = ap.parse_args(argv)
+
+    report = {"machine": machine(), "sizes": [int(s) for s in args.sizes.split(",")], "unit": "seconds/op"}
+    report["results"] = run(report["sizes"], args.repeat)
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, indent=2))
+    if args.update_baseline:
+        Path(args.baseline).write_text(json.dumps(report, indent=2) + "\n")
+        print(f"baseline written to {args.baseline}")
+
+    baseline = json.loads(Path(args.baseline).read_text()) if Path(args.baseline).exists() else None
+    if baseline is None or args.update_baseline:
+        compare(report["results"], {}, args.threshold)
+        return 0
+    ours, theirs = report["machine"], baseline["machine"]
+    if (ours["processor"], ours["cpus"], ours["python"]) != (theirs["processor"], theirs["cpus"], theirs["python"]):
+        print(f"⚠️ baseline was recorded on a different machine ({theirs['platform']}, {theirs['cpus']} cpus, "
+              f"Python {theirs['python']}); record one here with --update-baseline", file=sys.stderr)
+    regressed = compare(report["results"], baseline["results"], args.threshold)
+    if regressed and args.check:
+        print(f"❌ {len(regressed)} metric(s) regressed more than {args.threshold:.0%}: {', '.join(regressed)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
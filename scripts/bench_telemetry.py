@@ -0,0 +1,70 @@
+# Telemetry overhead (utils/telemetry.py): the bench_suite metrics with spans off (TELEMETRY=0) vs on,
+# each in a fresh process (median of rounds), next to an off-vs-off column for the run-to-run noise,
+# plus the cost of one wrapped call and the spans' total share of the enabled run (spans x per-call
+# cost / wall time), which is the noise-free bound. Overhead should stay below 1%.
+# Run: python scripts/bench_telemetry.py [n_doctors] [rounds]
+import json, os, statistics, subprocess, sys, time
+from pathlib import Path
+
+BASE = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE))
+
+def child(n_doctors):
+    from bench_suite import run
+    from utils.telemetry import TELEMETRY
+    t0 = time.perf_counter()
+    results = run([n_doctors], repeat=3)
+    wall = time.perf_counter() - t0
+    calls = sum(st.calls for st in TELEMETRY.stats.values())
+    print(json.dumps({"results": results, "spans": calls, "wall": wall}))
+
+def per_call_ns(n=200_000):
+    from utils.telemetry import Telemetry
+    t = Telemetry()
+    fn = lambda x: x
+    timed = t.wrap(fn, "noop")
+    out = []
+    for f in (fn, timed):
+        t0 = time.perf_counter()
+        for i in range(n):
+            f(i)
+        out.append((time.perf_counter() - t0) / n * 1e9)
+    run = t.begin_run()
+    t0 = time.perf_counter()
+    for i in range(n):
+        timed(i)
+    out.append((time.perf_counter() - t0) / n * 1e9)
+    t.end_run(run)
+    return out
+
+def main(n_doctors=100, rounds=5):
+    plain, wrapped, in_run = per_call_ns()
+    print(f"wrapped call: {wrapped - plain:.0f} ns overhead ({in_run - plain:.0f} ns inside a rerun)")
+    samples, spans, wall = {}, 0, []
+    for _ in range(rounds):
+        # "off2" is a second disabled process: off vs off2 is the noise floor of each metric
+        for variant, flag in (("off", "0"), ("on", "1"), ("off2", "0")):
+            r = subprocess.run([sys.executable, __file__, "--child", str(n_doctors)], capture_output=True, text=True,
+                               cwd=BASE, env={**os.environ, "TELEMETRY": flag})
+            if r.returncode:
+                sys.exit(r.stderr)
+            res = json.loads(r.stdout.strip().splitlines()[-1])
+            for k, v in res["results"].items():
+                samples.setdefault(variant, {}).setdefault(k, []).append(v)
+            if variant == "on":
+                spans = res["spans"]
+                wall.append(res["wall"])
+    off, on, off2 = ({k: statistics.median(v) for k, v in samples[n].items()} for n in ("off", "on", "off2"))
+    share = spans * (in_run - plain) * 1e-9 / statistics.median(wall)
+    print(f"{spans:,} spans recorded per enabled run ({n_doctors} doctors, median of {rounds} processes each): "
+          f"{share:.3%} of its wall time")
+    print(f"{'metric':<40} {'off ms':>10} {'on ms':>10} {'overhead':>9} {'noise':>8}")
+    for k in sorted(off):
+        print(f"{k:<40} {off[k] * 1e3:10.3f} {on[k] * 1e3:10.3f} {on[k] / off[k] - 1:+8.1%} "
+              f"{off2[k] / off[k] - 1:+7.1%}")
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--child"]:
+        child(int(sys.argv[2]))
+    else:
+        main(*(int(a) for a in sys.argv[1:3]))
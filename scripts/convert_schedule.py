@@ -0,0 +1,26 @@
+# One-shot conversion of doctor_schedules.csv (or .xlsx) into the columnar store data/doctor_schedules.bin.
+# Run: python scripts/convert_schedule.py [source.csv|source.xlsx]
+# then start the app with SCHEDULE_BACKEND=columnar.
+import sys, time
+from pathlib import Path
+
+BASE = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE))
+
+from utils import data_io
+from utils.schedule_store import convert
+
+def main(src=None):
+    if src is None:
+        # fold pending journal events into the CSV first so the store starts current
+        data_io.SCHEDULE_BACKEND = "csv"
+        if (data_io.DATA / data_io.JOURNAL_NAME).exists():
+            data_io.compact_journal()
+        src = data_io.DATA / "doctor_schedules.csv"
+    dest = data_io.DATA / "doctor_schedules.bin"
+    t0 = time.perf_counter()
+    rows = convert(src, dest)
+    print(f"{rows:,} rows: {src} -> {dest} ({dest.stat().st_size/1024:.0f} KB, {time.perf_counter()-t0:.2f}s)")
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
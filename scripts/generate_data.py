@@ -1,12 +1,16 @@
-
-# Re-generates patients.csv and doctor_schedules.{csv,xlsx}
-# Run: python scripts/generate_data.py
-import csv, random, string
+# Synthetic patients + doctor schedules, from the 3-doctor demo up to benchmark fixtures 100x that.
+# Columns are drawn with NumPy per chunk and streamed to CSV, Parquet (needs pyarrow) or the binary
+# schedule store. Output is fixed by the arguments and --seed (dates count from --start, default today).
+# Run: python scripts/generate_data.py [--patients 50] [--doctors 3] [--locations 3] [--days 30]
+#        [--start 2025-01-01] [--occupancy 0.3] [--seed 42] [--format csv|parquet|store] [--out data]
+import argparse, string, sys, time
 from pathlib import Path
 from datetime import date, datetime, timedelta
+import numpy as np
 import pandas as pd
 
 BASE = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE))
 
 first_names = ["Aarav","Vivaan","Aditya","Vihaan","Arjun","Sai","Reyansh","Muhammad","Ishaan","Kabir",
                "Anaya","Aadhya","Aarohi","Diya","Myra","Aanya","Anika","Navya","Sara","Pari"]
@@ -19,66 +23,6 @@ doctors = [
     {"doctor_id":"D003","doctor":"Dr. Priya Rao","specialty":"Dermatology","location":"Whitefield"},
 ]
 
-def rand_phone():
-    return "9" + "".join(random.choices(string.digits, k=9))
-
-def rand_email(first, last):
-    domains = ["example.com","mail.com","inbox.com"]
-    return f"{first.lower()}.{last.lower()}@{random.choice(domains)}"
-
-def rand_dob(start_year=1955, end_year=2010):
-    y = random.randint(start_year, end_year)
-    m = random.randint(1,12)
-    d = random.randint(1,28)
-    return date(y,m,d)
-
-def rand_member_id():
-    return "".join(random.choices(string.ascii_uppercase + string.digits, k=10))
-
-def rand_group_id():
-    return "".join(random.choices(string.ascii_uppercase + string.digits, k=6))
-
-random.seed(42)
-
-# Patients
-rows = []
-for i in range(1, 51):
-    fn = random.choice(first_names)
-    ln = random.choice(last_names)
-    dob = rand_dob()
-    email = rand_email(fn, ln)
-    phone = rand_phone()
-    pref_doc = random.choice(doctors)["doctor"]
-    loc = random.choice(locations)
-    insurer = random.choice(insurers)
-    last_visit = None
-    if random.random() < 0.65:
-        last_visit = date.today() - timedelta(days=random.randint(30, 730))
-    returning = bool(last_visit)
-    rows.append({
-        "patient_id": f"P{i:03d}",
-        "first_name": fn,
-        "last_name": ln,
-        "dob": dob.isoformat(),
-        "email": email,
-        "phone": phone,
-        "preferred_doctor": pref_doc,
-        "location": loc,
-        "insurance_carrier": insurer,
-        "insurance_member_id": rand_member_id(),
-        "insurance_group_id": rand_group_id(),
-        "last_visit_date": last_visit.isoformat() if last_visit else "",
-        "is_returning": "Y" if returning else "N"
-    })
-patients_csv = BASE / "data" / "patients.csv"
-with open(patients_csv, "w", newline="", encoding="utf-8") as f:
-    writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
-    writer.writeheader()
-    writer.writerows(rows)
-
-# Schedules
-start_date = date.today()
-days = [start_date + timedelta(days=i) for i in range(0, 30)]
 def day_slots():
     slots = []
     t = datetime.combine(date.today(), datetime.strptime("10:00","%H:%M").time())
@@ -93,32 +37,214 @@ def day_slots():
         t += timedelta(minutes=15)
     return slots
 
-sched_rows = []
-for d in doctors:
-    for dy in days:
-        for st, et in day_slots():
-            sched_rows.append({
-                "doctor_id": d["doctor_id"],
-                "doctor": d["doctor"],
-                "location": d["location"],
-                "date": dy.isoformat(),
-                "start_time": st,
-                "end_time": et,
-                "slot_status": "available",
-                "appointment_id": ""
-            })
-
-csvp = BASE / "data" / "doctor_schedules.csv"
-with open(csvp, "w", newline="", encoding="utf-8") as f:
-    writer = csv.DictWriter(f, fieldnames=list(sched_rows[0].keys()))
-    writer.writeheader()
-    writer.writerows(sched_rows)
-
-df = pd.DataFrame(sched_rows)
-try:
-    with pd.ExcelWriter(BASE / "data" / "doctor_schedules.xlsx") as writer:
-        df.to_excel(writer, sheet_name="schedules", index=False)
-except Exception:
-    pass
-
-print("Datasets regenerated.")
+CHUNK_ROWS = 1_000_000
+ALNUM = np.frombuffer((string.ascii_uppercase + string.digits).encode(), dtype="uint8")
+
+def make_locations(n):
+    return locations[:n] + [f"Branch {i}" for i in range(len(locations) + 1, n + 1)]
+
+def make_doctors(n, locs, rng):
+    """The demo doctors first, then synthetic ones spread round-robin over locs."""
+    out = [dict(d, location=d["location"] if d["location"] in locs else locs[i % len(locs)])
+           for i, d in enumerate(doctors[:n])]
+    specialties = sorted({d["specialty"] for d in doctors})
+    fn = rng.choice(first_names, n)
+    ln = rng.choice(last_names, n)
+    for i in range(len(out) + 1, n + 1):
+        out.append({
+            "doctor_id": f"D{i:03d}",
+            "doctor": f"Dr. {fn[i - 1]} {ln[i - 1]} {i}",
+            "specialty": specialties[i % len(specialties)],
+            "location": locs[i % len(locs)],
+        })
+    return out
+
+def _codes(rng, n, width):
+    """n random [A-Z0-9] strings of the given width."""
+    return ALNUM[rng.integers(0, len(ALNUM), (n, width))].view(f"S{width}").ravel().astype(str)
+
+def _iso(days):
+    return np.datetime_as_string(np.asarray(days, dtype="datetime64[D]"))
+
+def patient_chunks(n, docs, locs, seed, today=None, chunk_rows=CHUNK_ROWS):
+    """Patient frames of up to chunk_rows rows; chunk i is drawn from its own (seed, i) stream."""
+    today = np.datetime64(today or date.today(), "D")
+    dob_lo, dob_hi = np.datetime64("1955-01-01"), np.datetime64("2010-12-31")
+    domains = np.array(["example.com", "mail.com", "inbox.com"])
+    doc_names = np.array([d["doctor"] for d in docs], dtype=object)
+    for i, lo in enumerate(range(0, n, chunk_rows)):
+        m = min(chunk_rows, n - lo)
+        rng = np.random.default_rng([seed, 1, i])
+        fn = rng.choice(first_names, m)
+        ln = rng.choice(last_names, m)
+        visit = today - rng.integers(30, 731, m)
+        returning = rng.random(m) < 0.65
+        yield pd.DataFrame({
+            "patient_id": np.char.add("P", np.char.zfill(np.arange(lo + 1, lo + m + 1).astype(str), 3)),
+            "first_name": fn,
+            "last_name": ln,
+            "dob": _iso(dob_lo + rng.integers(0, (dob_hi - dob_lo).astype(int), m)),
+            "email": pd.Series(fn).str.lower() + "." + pd.Series(ln).str.lower() + "@" + rng.choice(domains, m),
+            "phone": np.char.add("9", np.char.zfill(rng.integers(0, 10**9, m).astype(str), 9)),
+            "preferred_doctor": doc_names[rng.integers(0, len(docs), m)],
+            "location": rng.choice(locs, m),
+            "insurance_carrier": rng.choice(insurers, m),
+            "insurance_member_id": _codes(rng, m, 10),
+            "insurance_group_id": _codes(rng, m, 6),
+            "last_visit_date": np.where(returning, _iso(visit), ""),
+            "is_returning": np.where(returning, "Y", "N"),
+        })
+
+def schedule_chunks(docs, locs, n_days, start, occupancy, seed, chunk_rows=CHUNK_ROWS):
+    """
+    (header, chunks) for the slot grid docs x days x day_slots(), with `occupancy` of it booked
+    in 30-min appointments A0, A1, ... Chunks hold whole doctors as code columns (store layout).
+    """
+    from utils.schedule_store import EPOCH
+    slots = day_slots()
+    per_doc = n_days * len(slots)
+    n = len(docs) * per_doc
+    pair = np.random.default_rng([seed, 2]).random((n + 1) // 2) < occupancy  # one draw per 30-min pair
+    loc_code = np.array([locs.index(d["location"]) for d in docs], dtype="int16")
+    first_day = (start - EPOCH).days
+    minute = lambda t: int(t[:2]) * 60 + int(t[3:])
+    header = {
+        "rows": n, "doctors": [d["doctor"] for d in docs], "doctor_ids": [d["doctor_id"] for d in docs],
+        "locations": list(locs), "first_day": first_day, "n_days": n_days,
+        "starts": [minute(s) for s, _ in slots], "ends": [minute(e) for _, e in slots],
+        "appointments": int(pair.sum()),
+    }
+
+    def chunks():
+        per_chunk = max(1, chunk_rows // per_doc)
+        appt_base = 0
+        day = np.repeat(np.arange(n_days, dtype="int32") + first_day, len(slots))
+        slot = np.tile(np.arange(len(slots), dtype="int16"), n_days)
+        for d0 in range(0, len(docs), per_chunk):
+            d1 = min(len(docs), d0 + per_chunk)
+            booked = np.repeat(pair[d0 * per_doc // 2:(d1 * per_doc + 1) // 2], 2)[:(d1 - d0) * per_doc]
+            appt = np.where(booked, appt_base + (np.cumsum(booked) - 1) // 2, -1)
+            appt_base += int(booked.sum()) // 2
+            yield {
+                "doctor": np.repeat(np.arange(d0, d1, dtype="int16"), per_doc),
+                "location": np.repeat(loc_code[d0:d1], per_doc),
+                "day": np.tile(day, d1 - d0),
+                "slot": np.tile(slot, d1 - d0),
+                "booked": booked,
+                "appt": appt,
+            }
+
+    return header, chunks()
+
+def _frame(header, c):
+    """Schedule DataFrame (CSV/Parquet columns) for one chunk of codes."""
+    days = header["first_day"] + np.arange(header["n_days"])
+    times = [f"{m // 60:02d}:{m % 60:02d}" for m in header["starts"] + header["ends"]]
+    appt = np.full(len(c["appt"]), "", dtype=object)
+    b = c["appt"] >= 0
+    appt[b] = np.char.add("A", c["appt"][b].astype(str))
+    n_slots = len(header["starts"])
+    return pd.DataFrame({
+        "doctor_id": pd.Categorical.from_codes(c["doctor"], header["doctor_ids"]),
+        "doctor": pd.Categorical.from_codes(c["doctor"], header["doctors"]),
+        "location": pd.Categorical.from_codes(c["location"], header["locations"]),
+        "date": pd.Categorical.from_codes(c["day"] - header["first_day"], _iso(days)),
+        "start_time": pd.Categorical.from_codes(c["slot"], times[:n_slots]),
+        "end_time": pd.Categorical.from_codes(c["slot"], times[n_slots:]),
+        "slot_status": pd.Categorical.from_codes(c["booked"].astype("int8"), ["available", "booked"]),
+        "appointment_id": appt,
+    })
+
+def _records(header, c):
+    from utils.schedule_store import RECORD
+    rec = np.empty(len(c["day"]), dtype=RECORD)
+    rec["doctor"], rec["location"], rec["day"] = c["doctor"], c["location"], c["day"]
+    rec["start"] = np.asarray(header["starts"], dtype="int16")[c["slot"]]
+    rec["end"] = np.asarray(header["ends"], dtype="int16")[c["slot"]]
+    rec["status"], rec["appt"] = c["booked"], c["appt"]
+    return rec
+
+class _TableWriter:
+    """Appends DataFrames to one CSV or Parquet file."""
+
+    def __init__(self, path, fmt):
+        self.path, self.fmt, self.writer, self.rows = path, fmt, None, 0
+
+    def write(self, df):
+        if self.fmt == "csv":
+            df.to_csv(self.path, mode="a" if self.rows else "w", header=not self.rows, index=False)
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self.writer is None:
+                self.writer = pq.ParquetWriter(self.path, table.schema)
+            self.writer.write_table(table)
+        self.rows += len(df)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        return self.rows
+
+def generate(out, n_patients=50, n_doctors=3, n_locations=3, n_days=30, start=None, occupancy=0.0,
+             seed=42, fmt="csv", chunk_rows=CHUNK_ROWS):
+    """Writes patients.<csv|parquet>, doctor_schedules.<csv|parquet|bin> and doctors.csv into out; returns row counts."""
+    out = Path(out)
+    out.mkdir(parents=True, exist_ok=True)
+    start = start or date.today()
+    locs = make_locations(n_locations)
+    docs = make_doctors(n_doctors, locs, np.random.default_rng([seed, 0]))
+    pd.DataFrame(docs, columns=["doctor_id", "doctor", "specialty", "location"]).to_csv(out / "doctors.csv", index=False)
+
+    patients = _TableWriter(out / f"patients.{'parquet' if fmt == 'parquet' else 'csv'}",
+                            "parquet" if fmt == "parquet" else "csv")
+    for df in patient_chunks(n_patients, docs, locs, seed, today=start, chunk_rows=chunk_rows):
+        patients.write(df)
+
+    header, chunks = schedule_chunks(docs, locs, n_days, start, occupancy, seed, chunk_rows)
+    if fmt == "store":
+        from utils.schedule_store import write_records
+        write_records(out / "doctor_schedules.bin", {
+            "rows": header["rows"], "doctors": header["doctors"], "doctor_ids": header["doctor_ids"],
+            "locations": header["locations"], "appointments": [f"A{i}" for i in range(header["appointments"])],
+        }, (_records(header, c) for c in chunks))
+        slots = header["rows"]
+    else:
+        sched = _TableWriter(out / f"doctor_schedules.{fmt}", fmt)
+        for c in chunks:
+            sched.write(_frame(header, c))
+        slots = sched.close()
+    return {"patients": patients.close(), "doctors": len(docs), "slots": slots, "appointments": header["appointments"]}
+
+def make_schedule(n_doctors=3, n_days=30, n_locations=3, start=None, occupancy=0.0, seed=42):
+    """
+    (doctor dicts, schedule DataFrame) in memory for benchmarks: the rows generate() writes, with
+    plain string columns as load_schedule reads them back from the CSV.
+    """
+    locs = make_locations(n_locations)
+    docs = make_doctors(n_doctors, locs, np.random.default_rng([seed, 0]))
+    header, chunks = schedule_chunks(docs, locs, n_days, start or date.today(), occupancy, seed)
+    df = pd.concat([_frame(header, c) for c in chunks], ignore_index=True)
+    return docs, df.astype({c: object for c in df.columns})
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Generate synthetic patients and doctor schedules")
+    ap.add_argument("--patients", type=int, default=50)
+    ap.add_argument("--doctors", type=int, default=3)
+    ap.add_argument("--locations", type=int, default=3)
+    ap.add_argument("--days", type=int, default=30)
+    ap.add_argument("--start", type=date.fromisoformat, help="first schedule day (default: today)")
+    ap.add_argument("--occupancy", type=float, default=0.0, help="fraction of slots pre-booked")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--format", choices=["csv", "parquet", "store"], default="csv")
+    ap.add_argument("--out", default=str(BASE / "data"))
+    args = ap.parse_args(argv)
+    t0 = time.perf_counter()
+    counts = generate(args.out, args.patients, args.doctors, args.locations, args.days, args.start,
+                      args.occupancy, args.seed, args.format)
+    print(f"{counts['patients']:,} patients, {counts['doctors']:,} doctors, {counts['slots']:,} slots "
+          f"({counts['appointments']:,} appointments booked) -> {args.out} [{args.format}] in {time.perf_counter() - t0:.1f}s")
+
+if __name__ == "__main__":
+    main()
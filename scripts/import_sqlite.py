@@ -0,0 +1,29 @@
+# One-shot import of doctor_schedules.csv (or .xlsx) and patients.csv (or .xlsx) into data/scheduling.db.
+# Run: python scripts/import_sqlite.py [schedule.csv|schedule.xlsx] [patients.csv|patients.xlsx]
+# then start the app with SCHEDULE_BACKEND=sqlite.
+import sys, time
+from pathlib import Path
+
+BASE = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE))
+
+from utils import data_io
+from utils.sqlite_store import import_files
+
+def main(schedule_src=None, patients_src=None):
+    if schedule_src is None:
+        # fold pending journal events into the CSV first so the database starts current
+        data_io.SCHEDULE_BACKEND = "csv"
+        if (data_io.DATA / data_io.JOURNAL_NAME).exists():
+            data_io.compact_journal()
+        schedule_src = data_io.DATA / "doctor_schedules.csv"
+    patients_src = patients_src or data_io.DATA / "patients.csv"
+    dest = data_io.DATA / data_io.DB_NAME
+    t0 = time.perf_counter()
+    counts = import_files(dest, schedule_src, patients_src)
+    print(f"{counts['slots']:,} slots ({counts['booked']:,} booked) from {schedule_src}, "
+          f"{counts['patients']:,} patients from {patients_src} -> {dest} "
+          f"({dest.stat().st_size / 1024:.0f} KB, {time.perf_counter() - t0:.2f}s)")
+
+if __name__ == "__main__":
+    main(*sys.argv[1:3])
@@ -0,0 +1,125 @@
+# Load generator for the headless API (api.py): keep-alive asyncio clients issuing a lookup /
+# slot search / reserve / cancel mix; reports requests/s and p50/p99 latency per endpoint.
+# By default it starts the API itself on a scratch copy of the data (50 doctors x 30 days).
+# Run: python scripts/load_api.py [--workers 2] [--clients 64] [--seconds 10] [--url http://host:port]
+import argparse, asyncio, random, shutil, socket, statistics, subprocess, sys, tempfile, time
+from pathlib import Path
+from urllib.parse import urlencode, urlsplit
+import json
+
+import pandas as pd
+
+BASE = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE))
+
+from generate_data import make_schedule
+
+async def request(reader, writer, method, path, body=None):
+    data = json.dumps(body).encode() if body is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: x\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data)
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    length = next(int(l.split(b":")[1]) for l in head.split(b"\r\n") if l.lower().startswith(b"content-length"))
+    return status, json.loads(await reader.readexactly(length))
+
+async def client(host, port, deadline, patients, doctors, days, lat, codes):
+    rng = random.Random()
+    reader, writer = await asyncio.open_connection(host, port)
+    mine, offers = [], []
+    try:
+        while time.perf_counter() < deadline:
+            r = rng.random()
+            if r < 0.4:
+                p = rng.choice(patients)
+                name, method, path, body = "lookup", "GET", "/patients/lookup?" + urlencode(
+                    {"first_name": p[0], "last_name": p[1], "dob": p[2]}), None
+            elif r < 0.85 or not offers:
+                d = rng.choice(days)
+                name, method, path, body = "slots", "GET", "/slots?" + urlencode(
+                    {"start_date": d, "end_date": days[min(days.index(d) + 6, len(days) - 1)], "minutes": 30,
+                     "doctor": rng.choice(doctors)}), None
+            elif r < 0.95 or not mine:
+                name, method, path, body = "reserve", "POST", "/appointments", offers.pop(rng.randrange(len(offers)))
+            else:
+                name, method, path, body = "cancel", "POST", f"/appointments/{mine.pop()}/cancel", {}
+            t0 = time.perf_counter()
+            status, payload = await request(reader, writer, method, path, body)
+            lat.setdefault(name, []).append(time.perf_counter() - t0)
+            codes[(name, status)] = codes.get((name, status), 0) + 1
+            if status >= 500:
+                print(f"{name} -> {status} {payload}")
+            if name == "slots" and status == 200:
+                offers = [{k: s[k] for k in ("doctor", "location", "date", "start_time", "end_time")}
+                          for s in payload["slots"]][:5]
+            elif name == "reserve" and status == 201:
+                mine.append(payload["appointment"]["appointment_id"])
+    finally:
+        writer.close()
+
+def _scratch_data(tmp, n_doctors, n_days):
+    make_schedule(n_doctors, n_days)[1].to_csv(tmp / "doctor_schedules.csv", index=False)
+    shutil.copy(BASE / "data" / "patients.csv", tmp / "patients.csv")
+
+async def run(host, port, clients, seconds, patients, doctors, days):
+    lat, codes = {}, {}
+    t0 = time.perf_counter()
+    await asyncio.gather(*(client(host, port, t0 + seconds, patients, doctors, days, lat, codes) for _ in range(clients)))
+    return time.perf_counter() - t0, lat, codes
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--url")
+    ap.add_argument("--workers", type=int, default=1)
+    ap.add_argument("--clients", type=int, default=32)
+    ap.add_argument("--seconds", type=float, default=10)
+    ap.add_argument("--port", type=int, help="port for the spawned API (default: a free one)")
+    args = ap.parse_args()
+
+    tmp, proc = None, None
+    if args.url:
+        host, port = urlsplit(args.url).hostname, urlsplit(args.url).port
+        data_dir = BASE / "data"
+    else:
+        tmp = Path(tempfile.mkdtemp())
+        _scratch_data(tmp, 50, 30)
+        host, port, data_dir = "127.0.0.1", args.port or _free_port(), tmp
+        proc = subprocess.Popen([sys.executable, str(BASE / "api.py"), "--port", str(port),
+                                 "--workers", str(args.workers), "--data", str(tmp)], cwd=BASE)
+    try:
+        pts = pd.read_csv(data_dir / "patients.csv", dtype=str)
+        patients = list(zip(pts["first_name"], pts["last_name"], pts["dob"]))
+        sched = pd.read_csv(data_dir / "doctor_schedules.csv", usecols=["doctor", "date"], dtype=str)
+        doctors, days = sorted(sched["doctor"].unique()), sorted(sched["date"].unique())
+        for _ in range(300):  # wait for the workers to bind
+            try:
+                socket.create_connection((host, port), timeout=1).close()
+                break
+            except OSError:
+                time.sleep(0.1)
+        time.sleep(0.5 if args.workers > 1 else 0)
+
+        elapsed, lat, codes = asyncio.run(run(host, port, args.clients, args.seconds, patients, doctors, days))
+        total = sum(len(v) for v in lat.values())
+        print(f"workers={args.workers} clients={args.clients}: {total:,} requests in {elapsed:.1f}s = {total / elapsed:,.0f} req/s")
+        print(f"{'endpoint':<10} {'count':>8} {'p50 ms':>8} {'p99 ms':>8}  status codes")
+        for name, xs in sorted(lat.items()):
+            xs.sort()
+            p99 = xs[min(len(xs) - 1, int(len(xs) * 0.99))]
+            st = ", ".join(f"{c}: {n}" for (e, c), n in sorted(codes.items()) if e == name)
+            print(f"{name:<10} {len(xs):>8,} {statistics.median(xs) * 1000:8.2f} {p99 * 1000:8.2f}  {st}")
+        assert not any(c >= 500 for _, c in codes), "server errors"
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+        if tmp is not None:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
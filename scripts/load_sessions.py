@@ -0,0 +1,76 @@
+# Load test: N concurrent "sessions" rerunning the app's data path, uncached vs the shared DataService.
+# Run: python scripts/load_sessions.py [n_sessions] [reruns_per_session]
+import random, shutil, sys, tempfile, threading, time
+from pathlib import Path
+
+BASE = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE))
+
+from utils import data_io
+from utils.data_service import DataService
+from utils.scheduling import build_index, find_contiguous_slots
+
+def _session(n_reruns, rerun, latencies, seed):
+    rng = random.Random(seed)
+    for i in range(n_reruns):
+        t0 = time.perf_counter()
+        rerun(rng, i)
+        latencies.append(time.perf_counter() - t0)
+
+def _run(n_sessions, n_reruns, rerun):
+    latencies = []
+    threads = [threading.Thread(target=_session, args=(n_reruns, rerun, latencies, s)) for s in range(n_sessions)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - t0
+    lat = sorted(latencies)
+    return wall, lat[len(lat) // 2], lat[int(len(lat) * 0.99) - 1]
+
+def main(n_sessions=20, n_reruns=25):
+    tmp = Path(tempfile.mkdtemp())
+    try:
+        for name in ("patients.csv", "doctor_schedules.csv"):
+            shutil.copy(BASE / "data" / name, tmp / name)
+        data_io.DATA = tmp
+        sched = data_io.load_schedule()
+        days = sched[["doctor", "location", "date"]].drop_duplicates().values.tolist()
+
+        def uncached(rng, i):
+            data_io.load_patients()
+            df = data_io.load_schedule()
+            find_contiguous_slots(df, *rng.choice(days), minutes_needed=30, index=build_index(df))
+
+        svc = DataService()
+        booked = []
+
+        def shared(rng, i):
+            svc.patients()
+            df, idx = svc.schedule()
+            doctor, location, date_str = rng.choice(days)
+            slots = find_contiguous_slots(df, doctor, location, date_str, minutes_needed=30, index=idx)
+            if slots and rng.random() < 0.1:
+                appt = f"L{threading.get_ident()}-{i}"
+                if svc.book(doctor, location, date_str, *slots[0], appt):
+                    booked.append(appt)
+
+        print(f"{n_sessions} sessions x {n_reruns} reruns")
+        for name, fn in (("uncached", uncached), ("shared", shared)):
+            wall, p50, p99 = _run(n_sessions, n_reruns, fn)
+            print(f"{name:9s} {n_sessions*n_reruns/wall:8.1f} reruns/s  p50 {p50*1000:7.2f} ms  p99 {p99*1000:7.2f} ms")
+        print("shared metrics:", svc.metrics())
+
+        # every session's bookings are visible in the shared frame and on disk, with no overlaps
+        df, _ = svc.schedule()
+        on_disk = data_io.load_schedule()
+        for frame in (df, on_disk):
+            ids = set(frame.loc[frame["slot_status"] == "booked", "appointment_id"])
+            assert ids == set(booked), "bookings lost or duplicated"
+        print(f"bookings: {len(booked)} (all visible, none lost)")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:3]))
@@ -0,0 +1,84 @@
+# Query and replay the outbox log (outbox/messages-*.jsonl, written by utils/outbox.py).
+# Run: python scripts/outbox.py query [--kind email|sms] [--to ADDR] [--since-id N] [--until-id N]
+#        [--since 2025-09-05] [--until 2025-09-06T12:00] [--text WORD] [--json] [--dir outbox]
+#      python scripts/outbox.py replay [same filters] [--send]
+# replay re-submits matching emails through the SMTP dispatcher (dry run unless --send); attachments are
+# re-read from data/forms and only attached when name, size and hash still match the logged ones.
+import argparse, json, sys
+from pathlib import Path
+
+BASE = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE))
+
+from utils import comms
+from utils.outbox import ID_WIDTH, iter_messages
+
+def _id(value):
+    return value.zfill(ID_WIDTH)
+
+def _attachments(record):
+    logged = record.get("attachments") or []
+    current = {a.describe(): a for a in comms.resolve_attachments(comms.ATTACHMENTS.listdir(comms.FORMS_DIR))}
+    found = [current[d] for d in logged if d in current]
+    missing = [d for d in logged if d not in current]
+    return found, missing
+
+def query(messages, as_json):
+    n = 0
+    for r in messages:
+        n += 1
+        if as_json:
+            print(json.dumps(r, ensure_ascii=False))
+        else:
+            att = f"  [{len(r['attachments'])} attachment(s)]" if r.get("attachments") else ""
+            print(f"{r['id']}  {r['ts'][:19]}  {r['kind']:<5} {r['to']:<32} {r['subject']}{att}")
+    if not as_json:
+        print(f"{n} message(s)", file=sys.stderr)
+
+def replay(messages, send):
+    if send and not comms.SMTP_ENABLED:
+        sys.exit("SMTP is not configured (SMTP_USER/SMTP_PASS or SMTP_NOAUTH=1); nothing can be sent.")
+    ids = []
+    for r in messages:
+        if r["kind"] != "email":
+            print(f"{r['id']}  skip {r['kind']} (no SMS gateway)")
+            continue
+        atts, missing = _attachments(r)
+        for d in missing:
+            print(f"{r['id']}  attachment changed or gone, not attached: {d}")
+        if send:
+            comms.get_dispatcher().submit(comms.build_email(r["to"], r["subject"], r["body"], atts), msg_id=r["id"])
+            ids.append(r["id"])
+        else:
+            print(f"{r['id']}  would send to {r['to']}: {r['subject']}")
+    if ids:
+        comms.get_dispatcher().flush()
+        for msg_id in ids:
+            s = comms.delivery_status(msg_id)
+            print(f"{msg_id}  {s['state']}" + (f" ({s['error']})" if s.get("error") else ""))
+    elif not send:
+        print("dry run; pass --send to deliver", file=sys.stderr)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Query and replay the outbox log.")
+    ap.add_argument("command", choices=["query", "replay"])
+    ap.add_argument("--dir", default=str(comms.BASE / "outbox"))
+    ap.add_argument("--kind", choices=["email", "sms"])
+    ap.add_argument("--to")
+    ap.add_argument("--since-id", type=_id)
+    ap.add_argument("--until-id", type=_id)
+    ap.add_argument("--since", help="ISO timestamp or date, inclusive")
+    ap.add_argument("--until", help="ISO timestamp or date, inclusive")
+    ap.add_argument("--text", help="substring of subject or body")
+    ap.add_argument("--json", action="store_true", help="query: one JSON record per line")
+    ap.add_argument("--send", action="store_true", help="replay: actually deliver")
+    args = ap.parse_args(argv)
+    messages = iter_messages(args.dir, since_id=args.since_id, until_id=args.until_id, kind=args.kind, to=args.to,
+                             since=args.since, until=args.until, text=args.text)
+    if args.command == "query":
+        query(messages, args.json)
+    else:
+        replay(messages, args.send)
+
+if __name__ == "__main__":
+    main()
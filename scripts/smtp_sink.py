@@ -0,0 +1,76 @@
+# Minimal local SMTP server that accepts and counts messages (stand-in for a real relay in
+# benchmarks and tests; `python -m aiosmtpd -n` works too if you have it installed).
+# Run standalone: python scripts/smtp_sink.py [port]
+import socketserver, sys, threading, time
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    def _reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        sink = self.server.sink
+        time.sleep(sink.connect_delay)  # emulate TCP + TLS handshake + AUTH round trips
+        self._reply("220 localhost sink ready")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            cmd = line.decode(errors="replace").strip().upper()
+            if cmd.startswith(("EHLO", "HELO")):
+                self._reply("250 localhost")
+            elif cmd.startswith("DATA"):
+                self._reply("354 end with .")
+                size = 0
+                while True:
+                    chunk = self.rfile.readline()
+                    if not chunk or chunk in (b".\r\n", b".\n"):
+                        break
+                    size += len(chunk)
+                sink.record(size)
+                self._reply("250 OK")
+            elif cmd.startswith("QUIT"):
+                self._reply("221 bye")
+                return
+            else:  # MAIL, RCPT, RSET, NOOP
+                self._reply("250 OK")
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+class SMTPSink:
+    """Threaded SMTP sink on localhost. `connect_delay` seconds are spent per new connection."""
+
+    def __init__(self, port=0, connect_delay=0.0):
+        self.connect_delay = connect_delay
+        self.messages = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+        self._server = _Server(("127.0.0.1", port), _Handler)
+        self._server.sink = self
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def record(self, size):
+        with self._lock:
+            self.messages += 1
+            self.bytes += size
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+if __name__ == "__main__":
+    with SMTPSink(int(sys.argv[1]) if len(sys.argv) > 1 else 8025) as sink:
+        print(f"SMTP sink on 127.0.0.1:{sink.port} (Ctrl+C to stop)")
+        try:
+            while True:
+                time.sleep(5)
+                print(f"{sink.messages} messages, {sink.bytes/1024:.0f} KB")
+        except KeyboardInterrupt:
+            pass
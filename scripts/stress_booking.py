@@ -0,0 +1,92 @@
+# Stress test: processes x threads firing reservations at the same hot slots; asserts zero overlaps.
+# Run: python scripts/stress_booking.py [processes] [threads] [attempts_per_thread]
+import multiprocessing as mp
+import random, shutil, sys, tempfile, threading, time
+from pathlib import Path
+
+BASE = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE))
+
+from utils import data_io
+from utils.data_service import DataService
+from utils.slot_index import from_minutes, to_minutes
+
+DOCTOR, LOCATION = "Dr. Meera Shah", "Koramangala"
+
+def _windows():
+    # every 30/60-minute window starting on the quarter hour in both blocks: heavy overlap
+    out = []
+    for lo, hi in (("10:00", "13:00"), ("14:00", "17:00")):
+        for start in range(to_minutes(lo), to_minutes(hi), 15):
+            for length in (30, 60):
+                if start + length <= to_minutes(hi):
+                    out.append((from_minutes(start), from_minutes(start + length)))
+    return out
+
+def _worker(data_dir, dates, n_threads, n_attempts, seed, out):
+    data_io.DATA = Path(data_dir)
+    data_io.COMPACT_EVERY = 40  # exercise compaction + reload in the middle of the storm
+    svc = DataService()
+    wins = _windows()
+    won = []
+
+    def fire(tid):
+        rng = random.Random(seed * 1000 + tid)
+        for i in range(n_attempts):
+            date_str = rng.choice(dates)
+            st, et = rng.choice(wins)
+            appt = f"S{seed}-{tid}-{i}"
+            if svc.book(DOCTOR, LOCATION, date_str, st, et, appt):
+                won.append((appt, date_str, st, et))
+
+    threads = [threading.Thread(target=fire, args=(t,)) for t in range(n_threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    out.put(won)
+
+def main(n_procs=4, n_threads=8, n_attempts=100):
+    tmp = Path(tempfile.mkdtemp())
+    try:
+        shutil.copy(BASE / "data" / "doctor_schedules.csv", tmp / "doctor_schedules.csv")
+        data_io.DATA = tmp
+        dates = sorted(data_io.load_schedule().query("doctor == @DOCTOR")["date"].unique())[:5]
+        ctx = mp.get_context("spawn")
+        out = ctx.Queue()
+        procs = [ctx.Process(target=_worker, args=(str(tmp), dates, n_threads, n_attempts, p, out))
+                 for p in range(n_procs)]
+        t0 = time.perf_counter()
+        for p in procs:
+            p.start()
+        won = [w for _ in procs for w in out.get()]
+        for p in procs:
+            p.join()
+        wall = time.perf_counter() - t0
+        attempts = n_procs * n_threads * n_attempts
+        print(f"{attempts:,} attempts from {n_procs} processes x {n_threads} threads in {wall:.1f}s "
+              f"({attempts/wall:,.0f}/s); {len(won)} booked")
+
+        # 1) no two successful bookings overlap
+        by_date = {}
+        for appt, date_str, st, et in won:
+            by_date.setdefault(date_str, []).append((to_minutes(st), to_minutes(et), appt))
+        overlaps = 0
+        for spans in by_date.values():
+            spans.sort()
+            overlaps += sum(a[1] > b[0] for a, b in zip(spans, spans[1:]))
+        # 2) every winner still owns all of its slots on disk (nothing silently overwritten)
+        df = data_io.load_schedule()
+        mine = df[(df["doctor"] == DOCTOR) & (df["location"] == LOCATION)]
+        owner = {(d, s): a for d, s, a in zip(mine["date"], mine["start_time"], mine["appointment_id"])}
+        lost = [appt for appt, date_str, st, et in won
+                if any(owner.get((date_str, from_minutes(m))) != appt for m in range(to_minutes(st), to_minutes(et), 15))]
+        booked_rows = int((df["slot_status"] == "booked").sum())
+        print(f"overlaps: {overlaps}  lost bookings: {len(lost)}  booked rows: {booked_rows}")
+        assert overlaps == 0 and not lost, "double booking detected"
+        print("OK")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:4]))
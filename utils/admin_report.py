@@ -0,0 +1,210 @@
+"""
+Streaming admin report over the booking history.
+
+The schedule is read chunk by chunk (fixed-size reads of the columnar store, read_csv chunks
+of the CSV snapshot, or a cursor over the sqlite store) with the booking journal applied to each chunk. Booked slots are collapsed
+into one row per appointment and streamed straight to the output; only the per doctor/day
+aggregates behind the summary sheets are kept until the end, so peak memory follows chunk_rows,
+not the length of the history.
+
+Formats: "xlsx" (openpyxl write-only; a sheet rolls over to "<name>_2", ... at Excel's row
+limit), "csv" and "parquet" (a folder with one file per table; parquet needs pyarrow).
+"""
+from datetime import date, datetime
+from itertools import islice
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from utils import data_io
+from utils.schedule_store import iter_store
+
+CHUNK_ROWS = 200_000
+EXCEL_MAX_ROWS = 1_048_576
+DAY_KEYS = ["doctor", "location", "date"]
+SUMMARIES = ["utilization", "no_show_candidates"]
+
+def _csv_chunks(path, chunk_rows, start, end):
+    for chunk in pd.read_csv(path, chunksize=chunk_rows, dtype=str):
+        if start:
+            chunk = chunk[chunk["date"] >= start]
+        if end:
+            chunk = chunk[chunk["date"] <= end]
+        if len(chunk):
+            yield chunk.reset_index(drop=True)
+
+def iter_schedule(start=None, end=None, chunk_rows=CHUNK_ROWS):
+    """Schedule rows dated in [start, end] (ISO strings) with the journal applied, chunk_rows at a time."""
+    path = data_io.schedule_sources()[0]
+    if data_io.SCHEDULE_BACKEND == "sqlite":
+        from utils.sqlite_store import iter_schedule as iter_db
+        yield from iter_db(path, chunk_rows, start, end)  # bookings are joined in by the query
+        return
+    events = data_io.read_journal()
+    if data_io.SCHEDULE_BACKEND == "columnar":
+        chunks = iter_store(path, chunk_rows, start, end)
+    else:
+        chunks = _csv_chunks(path, chunk_rows, start, end)
+    for chunk in chunks:
+        yield data_io._replay(chunk, events)
+
+def _collapse(booked, as_of):
+    """One row per run of consecutive booked slots sharing an appointment id."""
+    ids = booked["appointment_id"].to_numpy(dtype=object)
+    first = np.ones(len(ids), dtype=bool)
+    first[1:] = ids[1:] != ids[:-1]
+    starts = np.flatnonzero(first)
+    ends = np.append(starts[1:], len(ids)) - 1
+    col = lambda k, at=starts: np.asarray(booked[k], dtype=object)[at]
+    dates = col("date")
+    return pd.DataFrame({
+        "appointment_id": pd.Series(col("appointment_id")).fillna("").to_numpy(),
+        "doctor_id": col("doctor_id"),
+        "doctor": col("doctor"),
+        "location": col("location"),
+        "date": dates,
+        "start_time": col("start_time"),
+        "end_time": col("end_time", ends),
+        "slots": ends - starts + 1,
+        # still booked once its day has passed: nothing here records attendance, so it needs a check
+        "no_show_candidate": dates.astype(str) < as_of,
+    })
+
+def iter_appointments(chunks, as_of=None):
+    """Appointment frames from schedule chunks; an appointment cut by a chunk boundary is held for the next one."""
+    as_of = as_of or date.today().isoformat()
+    carry = None
+    for chunk in chunks:
+        booked = chunk[chunk["slot_status"] == "booked"]
+        if carry is not None:
+            booked = pd.concat([carry, booked], ignore_index=True)
+        if not len(booked):
+            carry = None
+            continue
+        ids = booked["appointment_id"].to_numpy(dtype=object)
+        tail = ids == ids[-1]
+        carry = booked[tail]
+        if not tail.all():
+            yield _collapse(booked[~tail], as_of)
+    if carry is not None:
+        yield _collapse(carry, as_of)
+
+class _ExcelSink:
+
+    def __init__(self, path):
+        from openpyxl import Workbook
+        self.path = path
+        self.wb = Workbook(write_only=True)
+        # summary sheets go first; they are filled once the stream is done
+        self.sheets = {name: [self.wb.create_sheet(name), 0, 1] for name in SUMMARIES}
+
+    def write(self, name, df):
+        state = self.sheets.setdefault(name, [None, EXCEL_MAX_ROWS, 0])
+        rows = df.itertuples(index=False, name=None)
+        left = len(df)
+        while left:
+            if state[0] is None or state[1] >= EXCEL_MAX_ROWS:
+                state[2] += 1
+                state[0] = self.wb.create_sheet(name if state[2] == 1 else f"{name}_{state[2]}")
+                state[1] = 0
+            if state[1] == 0:
+                state[0].append(list(df.columns))
+                state[1] = 1
+            take = min(left, EXCEL_MAX_ROWS - state[1])
+            for row in islice(rows, take):
+                state[0].append(row)
+            state[1] += take
+            left -= take
+
+    def close(self):
+        self.wb.save(self.path)
+        return str(self.path)
+
+class _FolderSink:
+
+    def __init__(self, path, fmt):
+        self.path, self.fmt = path, fmt
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.writers = {}
+        if fmt == "parquet":
+            import pyarrow  # noqa: F401  (fail before reading anything)
+
+    def write(self, name, df):
+        target = self.path / f"{name}.{self.fmt}"
+        if self.fmt == "csv":
+            df.to_csv(target, mode="a" if name in self.writers else "w", header=name not in self.writers, index=False)
+            self.writers[name] = None
+            return
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if name not in self.writers:
+            self.writers[name] = pq.ParquetWriter(target, table.schema)
+        self.writers[name].write_table(table)
+
+    def close(self):
+        for w in self.writers.values():
+            if w is not None:
+                w.close()
+        return str(self.path)
+
+def _utilization(day_parts, appt_parts):
+    slots = pd.concat(day_parts).groupby(level=[0, 1, 2], sort=True).sum()
+    appts = pd.concat(appt_parts).groupby(level=[0, 1, 2]).sum() if appt_parts else pd.Series(dtype="int64")
+    out = slots.assign(appointments=appts.reindex(slots.index, fill_value=0).astype("int64"))
+    out["utilization"] = (out["booked_slots"] / out["slots"]).round(3)
+    return out.reset_index()
+
+def _no_shows(parts):
+    if not parts:
+        return pd.DataFrame(columns=["doctor", "location", "appointments", "no_show_candidates", "candidate_share",
+                                     "oldest_candidate", "latest_candidate"])
+    out = pd.concat(parts).groupby(["doctor", "location"], sort=True).agg(
+        appointments=("appointments", "sum"), no_show_candidates=("no_show_candidates", "sum"),
+        oldest_candidate=("oldest_candidate", "min"), latest_candidate=("latest_candidate", "max"),
+    )
+    out.insert(2, "candidate_share", (out["no_show_candidates"] / out["appointments"]).round(3))
+    return out.reset_index().fillna("")
+
+def export_bookings_report(start=None, end=None, fmt="xlsx", as_of=None, out_dir=None, chunk_rows=CHUNK_ROWS):
+    """
+    Writes every appointment dated in [start, end] plus the utilization (per doctor/day) and
+    no-show candidate (per doctor) summaries. Returns the .xlsx path, or the folder for csv/parquet.
+    """
+    out_dir = Path(out_dir or data_io.BASE / "outbox")
+    out_dir.mkdir(parents=True, exist_ok=True)
+    as_of = as_of or date.today().isoformat()
+    name = f"bookings_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    if fmt == "xlsx":
+        sink = _ExcelSink(out_dir / f"{name}.xlsx")
+    elif fmt in ("csv", "parquet"):
+        sink = _FolderSink(out_dir / name, fmt)
+    else:
+        raise ValueError(f"unknown report format {fmt!r}")
+
+    day_parts, appt_parts, no_show_parts = [], [], []
+
+    def tally(chunks):
+        for chunk in chunks:
+            booked = chunk["slot_status"].eq("booked").rename("booked_slots")
+            g = booked.groupby([chunk[k] for k in DAY_KEYS], observed=True, sort=False)
+            day_parts.append(pd.DataFrame({"slots": g.size(), "booked_slots": g.sum()}))
+            yield chunk
+
+    for appts in iter_appointments(tally(iter_schedule(start, end, chunk_rows)), as_of):
+        appt_parts.append(appts.groupby(DAY_KEYS, sort=False).size())
+        cand = appts["no_show_candidate"]
+        dates = appts["date"].where(cand)
+        no_show_parts.append(pd.DataFrame({
+            "doctor": appts["doctor"], "location": appts["location"], "appointments": 1,
+            "no_show_candidates": cand.astype("int64"), "oldest_candidate": dates, "latest_candidate": dates,
+        }).groupby(["doctor", "location"], sort=False).agg(
+            appointments=("appointments", "sum"), no_show_candidates=("no_show_candidates", "sum"),
+            oldest_candidate=("oldest_candidate", "min"), latest_candidate=("latest_candidate", "max"),
+        ).reset_index())
+        sink.write("appointments", appts)
+    if day_parts:
+        sink.write("utilization", _utilization(day_parts, appt_parts))
+    sink.write("no_show_candidates", _no_shows(no_show_parts))
+    return sink.close()
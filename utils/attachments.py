@@ -0,0 +1,130 @@
+"""
+Cache of ready-to-attach MIME parts.
+
+A part is read, base64-encoded, serialized and hashed once per (path, mtime, size); later emails
+attach the same part object and splice its wire bytes in as-is (FormMessage), so sending the intake
+form to many patients neither re-reads, re-encodes nor re-generates it. Entries are evicted
+least-recently-used once the cached bytes exceed max_bytes.
+"""
+import hashlib
+import secrets
+import threading
+from collections import OrderedDict
+from email import encoders
+from email.generator import BytesGenerator
+from email.mime.base import MIMEBase
+from email.mime.multipart import MIMEMultipart
+from email.policy import compat32
+from io import BytesIO
+from pathlib import Path
+
+CRLF = compat32.clone(linesep="\r\n")  # SMTP line endings
+
+def _flatten(msg):
+    buf = BytesIO()
+    BytesGenerator(buf, mangle_from_=False, policy=CRLF).flatten(msg)
+    return buf.getvalue()
+
+class Attachment:
+    __slots__ = ("name", "part", "wire", "sha256", "size")
+
+    def __init__(self, name, part, sha256, size):
+        self.name, self.part, self.sha256, self.size = name, part, sha256, size
+        self.wire = _flatten(part)
+
+    def nbytes(self):
+        return len(self.wire) + len(self.part.get_payload())
+
+    def describe(self):
+        return f"{self.name} ({self.size} bytes, sha256:{self.sha256[:16]})"
+
+def encode_attachment(path):
+    """Reads and base64-encodes one file into an Attachment (no caching)."""
+    path = Path(path)
+    data = path.read_bytes()
+    part = MIMEBase("application", "octet-stream")
+    part.set_payload(data)
+    encoders.encode_base64(part)
+    part.add_header("Content-Disposition", f'attachment; filename="{path.name}"')
+    return Attachment(path.name, part, hashlib.sha256(data).hexdigest(), len(data))
+
+class AttachmentCache:
+
+    def __init__(self, max_bytes=32 * 2**20):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()   # (path, mtime_ns, size) -> Attachment
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._dirs = {}                 # dir -> (mtime_ns, [paths])
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, path):
+        """Attachment for path, or None when the file does not exist."""
+        path = Path(path)
+        try:
+            st = path.stat()
+        except OSError:
+            return None
+        key = (str(path), st.st_mtime_ns, st.st_size)
+        with self._lock:
+            att = self._entries.get(key)
+            if att is not None:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return att
+        att = encode_attachment(path)
+        with self._lock:
+            self.stats["misses"] += 1
+            # drop the stale entry of an edited file along with any LRU overflow
+            for old in [k for k in self._entries if k[0] == key[0]]:
+                self._evict(old)
+            self._entries[key] = att
+            self._bytes += att.nbytes()
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                self._evict(next(iter(self._entries)))
+                self.stats["evictions"] += 1
+        return att
+
+    def _evict(self, key):
+        att = self._entries.pop(key)
+        self._bytes -= att.nbytes()
+
+    def listdir(self, directory):
+        """Files in directory, re-globbed only when the directory's mtime changes."""
+        directory = Path(directory)
+        try:
+            mtime = directory.stat().st_mtime_ns
+        except OSError:
+            return []
+        cached = self._dirs.get(str(directory))
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, sorted(p for p in directory.glob("*") if p.is_file()))
+            self._dirs[str(directory)] = cached
+        return cached[1]
+
+    def info(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, **self.stats}
+
+class FormMessage(MIMEMultipart):
+    """
+    multipart/mixed email whose cached attachments are sent from their pre-serialized bytes.
+    The boundary is fixed up front (a run of '=' cannot occur inside base64), which also spares
+    the generator its scan of the whole text for a collision-free boundary.
+    """
+
+    def __init__(self):
+        super().__init__(boundary="=" * 15 + secrets.token_hex(10) + "==")
+        self._wire = {}  # id(part) -> wire bytes
+
+    def attach_cached(self, att):
+        self.attach(att.part)
+        self._wire[id(att.part)] = att.wire
+
+    def wire_bytes(self):
+        """Same bytes as as_bytes(policy=CRLF), without re-generating cached parts."""
+        nl = b"\r\n"
+        dash = b"--" + self.get_boundary().encode("ascii")
+        parts = [self._wire.get(id(p)) or _flatten(p) for p in self.get_payload()]
+        headers = b"".join(CRLF.fold_binary(k, v) for k, v in self.items())
+        return b"".join((headers, nl, dash, nl, (nl + dash + nl).join(parts), nl, dash, b"--", nl))
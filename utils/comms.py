@@ -1,75 +1,126 @@
 
 from pathlib import Path
-from datetime import datetime
-import smtplib
+import threading
 from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.mime.base import MIMEBase
-from email import encoders
 import os
 
+from utils.attachments import Attachment, AttachmentCache, FormMessage, encode_attachment
+from utils.dispatch import Dispatcher, SMTPPool
+from utils.outbox import Outbox
+from utils.telemetry import TELEMETRY, instrument
+
 BASE = Path(__file__).resolve().parents[1]
 
 SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.gmail.com")
 SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
 SMTP_USER = os.getenv("SMTP_USER")
 SMTP_PASS = os.getenv("SMTP_PASS")
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "1") != "0"
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "2"))
+# Real delivery needs credentials; SMTP_NOAUTH=1 allows an open relay such as a local test server
+SMTP_ENABLED = bool(SMTP_USER and SMTP_PASS) or os.getenv("SMTP_NOAUTH") == "1"
+
+FORMS_DIR = BASE / "data" / "forms"
+ATTACHMENTS = AttachmentCache(int(os.getenv("ATTACHMENT_CACHE_MB", "32")) * 2**20)
+
+_outbox = None
+_outbox_lock = threading.Lock()
+
+def get_outbox():
+    """Process-wide outbox log for BASE/outbox (a new one, after flushing the old, if BASE moved)."""
+    global _outbox
+    with _outbox_lock:
+        if _outbox is None or _outbox.dir != BASE / "outbox":
+            if _outbox is not None:
+                _outbox.close()
+            _outbox = Outbox(BASE / "outbox")
+        return _outbox
+
+def _log_message(kind, to, subject, body, attachments=None, dedup_key=None):
+    """(outbox id, duplicate): duplicate is True when dedup_key was already logged."""
+    # attachments by name + content hash; the payload itself lives in the attachment cache / on disk
+    return get_outbox().log(kind, to, subject, body, [a.describe() for a in attachments or ()], key=dedup_key)
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+def get_dispatcher():
+    """Process-wide background sender sharing a pool of logged-in SMTP sessions."""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            pool = SMTPPool(SMTP_SERVER, SMTP_PORT, SMTP_USER, SMTP_PASS, size=SMTP_POOL_SIZE,
+                            starttls=SMTP_STARTTLS)
+            _dispatcher = Dispatcher(pool, workers=SMTP_POOL_SIZE)
+        return _dispatcher
 
-def _log_message(kind, to, subject, body, attachments=None):
-    outbox = BASE / "outbox"
-    outbox.mkdir(exist_ok=True, parents=True)
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-    fname = outbox / f"{kind}_{ts}.txt"
-    with open(fname, "w", encoding="utf-8") as f:
-        f.write(f"To: {to}\nSubject: {subject}\n\n{body}\n")
-        if attachments:
-            f.write(f"\nAttachments: {', '.join(str(a) for a in attachments)}\n")
-    return str(fname)
-
-def send_email(to, subject, body, attachments=None):
-    log_path =  _log_message("email", to, subject, body, attachments)
-
-    if not SMTP_USER or not SMTP_PASS:
+def resolve_attachments(attachments, cache=ATTACHMENTS):
+    """Paths -> Attachment objects (shared pre-encoded parts when cache is set); missing files are skipped."""
+    out = []
+    for a in attachments or ():
+        if not isinstance(a, Attachment):
+            if cache is not None:
+                a = cache.get(a)
+            elif Path(a).exists():
+                a = encode_attachment(a)
+            else:
+                a = None
+        if a is not None:
+            out.append(a)
+    return out
+
+def build_email(to, subject, body, attachments=None, cache=ATTACHMENTS):
+    msg = FormMessage()
+    msg["From"] = SMTP_USER or "scheduler@localhost"
+    msg["To"] = to
+    msg["Subject"] = subject
+    msg.attach(MIMEText(body, "plain"))
+
+    for att in resolve_attachments(attachments, cache):
+        msg.attach_cached(att)  # parts are never mutated after encoding, so messages share them
+    return msg
+
+def send_email(to, subject, body, attachments=None, dedup_key=None):
+    """
+    Logs to the outbox and queues the email for background delivery; returns its outbox message id
+    immediately. A dedup_key that was already sent returns the earlier id without sending again.
+    """
+    attachments = resolve_attachments(attachments)
+    msg_id, duplicate = _log_message("email", to, subject, body, attachments, dedup_key)
+    if duplicate:
+        TELEMETRY.count("emails_deduplicated")
+        return msg_id
+
+    if not SMTP_ENABLED:
+        TELEMETRY.count("emails_logged_only")
         print("⚠️ SMTP not configured, only logging to outbox.")
-        return log_path
+        return msg_id
 
     try:
-        msg = MIMEMultipart()
-        msg["Form"] = SMTP_USER
-        msg["To"] = to
-        msg["Subject"] = subject
-        msg.attach(MIMEText(body, "plain"))
-
-        if attachments:
-            for file_path in attachments:
-                file_path = Path(file_path)
-                if file_path.exists():
-                    with open(file_path, "rb") as f:
-                        part = MIMEBase("application", "octet-stream")
-                        part.set_payload(f.read())
-                    encoders.encode_base64(part)
-                    part.add_header("Content-Disposition",
-                                    f'attachment; filename="{file_path}"',)
-                    msg.attach(part)
-
-        with smtplib.SMTP(TP_SERVER, SMTP_PORT) as server:
-            server.starttls()
-            server.login(SMTP_USER, SMTP_PASS)
-            server.send_message(msg)
-
-        print(f"✅ Email sent to {to}")
-
+        get_dispatcher().submit(build_email(to, subject, body, attachments), msg_id=msg_id)
+        TELEMETRY.count("emails_queued")
     except Exception as e:
-        print(f"❌ Email sending failed: {e}")
+        TELEMETRY.count("email_queue_errors")
+        print(f"❌ Email queueing failed: {e}")
+
+    return msg_id
 
-    return log_path
+def delivery_status(msg_id=None):
+    """Delivery state of a message queued by send_email (keyed by its outbox message id)."""
+    if _dispatcher is None:
+        return {}
+    return _dispatcher.status(msg_id)
 
-def send_sms(to, body):
-    return _log_message("sms", to, "SMS", body, attachments=None)
+def send_sms(to, body, dedup_key=None):
+    msg_id, duplicate = _log_message("sms", to, "SMS", body, attachments=None, dedup_key=dedup_key)
+    TELEMETRY.count("sms_deduplicated" if duplicate else "sms_logged")
+    return msg_id
 
 def send_forms(to_email):
-    forms_dir = BASE / "data" / "forms"
-    forms = list(forms_dir.glob("*"))
+    forms = ATTACHMENTS.listdir(FORMS_DIR)
     if not forms:
-        return _log_message("email", to_email, "Patient Intake Forms", "No forms attached (placeholder).")
-    return _log_message("email", to_email, "Patient Intake Forms", "Please fill the attached forms.", attachments=forms)
+        return send_email(to_email, "Patient Intake Forms", "No forms attached (placeholder).")
+    return send_email(to_email, "Patient Intake Forms", "Please fill the attached forms.", attachments=forms)
+
+# send_email's span covers its helpers, each only a few us
+instrument(__name__, skip=("get_outbox", "get_dispatcher", "resolve_attachments", "build_email", "delivery_status"))
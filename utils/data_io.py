@@ -1,18 +1,73 @@
-
 import os
+import json
+import threading
 from pathlib import Path
 from datetime import datetime
 import csv
 
+from utils.locks import file_lock
+from utils.telemetry import instrument
+
 try:
     import pandas as pd
 except Exception:
     pd = None
 
 BASE = Path(__file__).resolve().parents[1]
+DATA = BASE / "data"
+
+# Snapshot backend: "csv" (doctor_schedules.csv) or "columnar" (doctor_schedules.bin, packed int codes;
+# create it once with scripts/convert_schedule.py). Excel is export-only either way.
+# "sqlite" keeps the schedule, bookings and patients in scheduling.db (utils/sqlite_store.py; import
+# the files once with scripts/import_sqlite.py): bookings are committed there instead of the journal.
+SCHEDULE_BACKEND = os.getenv("SCHEDULE_BACKEND", "csv")
+DB_NAME = "scheduling.db"
+
+DOCTORS_NAME = "doctors.csv"  # doctor -> specialty for the slot search's specialty filter
+
+# Bookings/cancellations are appended here and folded into the snapshot on compaction
+JOURNAL_NAME = "booking_journal.jsonl"
+BOOKING_LOCK_NAME = "booking.lock"  # inter-process lock around booking commits, appends and compaction
+COMPACT_EVERY = 500  # journal events before append_event compacts automatically
+
+_journal_lock = threading.Lock()
+_journal_events = None  # cached line count of the journal, None until first use
+
+def _paths():
+    return DATA / "doctor_schedules.csv", DATA / "doctor_schedules.xlsx", DATA / JOURNAL_NAME
+
+def _snapshot_path():
+    if SCHEDULE_BACKEND == "columnar":
+        return DATA / "doctor_schedules.bin"
+    if SCHEDULE_BACKEND == "sqlite":
+        return DATA / DB_NAME
+    return _paths()[0]
+
+def _db():
+    from utils import sqlite_store
+    return sqlite_store, sqlite_store.connect(DATA / DB_NAME)
+
+def patient_sources():
+    """Files whose changes invalidate a cached load_patients()."""
+    if SCHEDULE_BACKEND == "sqlite":
+        return [DATA / DB_NAME]  # checkpointed by save_patients
+    return [DATA / "patients.csv"]
+
+def schedule_sources():
+    """Files whose changes invalidate a cached load_schedule()."""
+    return [_snapshot_path(), _paths()[2]]
+
+def fsync_replace(tmp, path):
+    """Atomically moves a fully written temp file over path (survives a crash mid-write)."""
+    with open(tmp, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
 
 def load_patients():
-    path = BASE / "data" / "patients.csv"
+    if SCHEDULE_BACKEND == "sqlite":
+        store, conn = _db()
+        return store.read_patients(conn)
+    path = DATA / "patients.csv"
     if pd is None:
         # minimal csv reader
         import csv
@@ -22,45 +77,226 @@ def load_patients():
     else:
         return pd.read_csv(path)
 
+def load_doctors():
+    """doctor_id, doctor, specialty, location dicts from doctors.csv (every backend); [] without it."""
+    path = DATA / DOCTORS_NAME
+    if not path.exists():
+        return []
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
 def save_patients(df_or_list):
-    path = BASE / "data" / "patients.csv"
+    path = DATA / "patients.csv"
     if pd is None:
         # not implemented; project expects pandas for write
         raise RuntimeError("Pandas required to write patients.csv")
+    if SCHEDULE_BACKEND == "sqlite":
+        store, conn = _db()
+        store.write_patients(conn, df_or_list)
+        return
     df_or_list.to_csv(path, index=False)
 
-def load_schedule():
-    # Prefer Excel if available
-    xlsx = BASE / "data" / "doctor_schedules.xlsx"
-    csvp = BASE / "data" / "doctor_schedules.csv"
+def read_journal():
+    """Journal events in order. A torn line left by a crash mid-append is skipped."""
+    return read_journal_from(0)[0]
+
+def read_journal_from(offset):
+    """(events appended at or after byte `offset`, offset just past the last complete line)."""
+    if SCHEDULE_BACKEND == "sqlite":
+        store, conn = _db()
+        return store.events_since(conn, offset)  # offset is the last event id
+    journal = _paths()[2]
+    events = []
+    if not journal.exists():
+        return events, 0
+    with open(journal, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break  # still being written; pick it up next time
+            offset += len(line)
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                continue
+    return events, offset
+
+def journal_size():
+    if SCHEDULE_BACKEND == "sqlite":
+        store, conn = _db()
+        return store.last_event_id(conn)
+    journal = _paths()[2]
+    return journal.stat().st_size if journal.exists() else 0
+
+def _replay(df, events):
+    """Applies book/cancel events to a snapshot (DataFrame or list of dicts) in journal order."""
+    if not events:
+        return df
+    if pd is None:
+        for ev in events:
+            for r in df:
+                if (r["doctor"], r["location"], r["date"]) != (ev["doctor"], ev["location"], ev["date"]):
+                    continue
+                if ev["op"] == "book" and not (r["end_time"] <= ev["start_time"] or r["start_time"] >= ev["end_time"]):
+                    r["slot_status"], r["appointment_id"] = "booked", ev["appointment_id"]
+                elif ev["op"] == "cancel" and r["appointment_id"] == ev["appointment_id"]:
+                    r["slot_status"], r["appointment_id"] = "available", ""
+        return df
+    from utils.slot_index import to_minutes
+    starts = df["start_time"].map(to_minutes).to_numpy()
+    ends = df["end_time"].map(to_minutes).to_numpy()
+    status = df["slot_status"].to_numpy(dtype=object, copy=True)
+    appt = df["appointment_id"].to_numpy(dtype=object, copy=True)
+    days = df.groupby(["doctor", "location", "date"], sort=False, observed=True).indices
+    for ev in events:
+        pos = days.get((ev["doctor"], ev["location"], ev["date"]))
+        if pos is None:
+            continue
+        if ev["op"] == "book":
+            hit = pos[(ends[pos] > to_minutes(ev["start_time"])) & (starts[pos] < to_minutes(ev["end_time"]))]
+            status[hit], appt[hit] = "booked", ev["appointment_id"]
+        elif ev["op"] == "cancel":
+            hit = pos[appt[pos] == ev["appointment_id"]]
+            status[hit], appt[hit] = "available", ""
+    df["slot_status"] = status
+    df["appointment_id"] = appt
+    return df
+
+def _read_csv_snapshot(path):
     if pd is None:
         # Fallback to csv
         import csv
-        with open(csvp, newline="", encoding="utf-8") as f:
+        with open(path, newline="", encoding="utf-8") as f:
             return [r for r in csv.DictReader(f)]
+    return pd.read_csv(path)
+
+def _read_columnar_snapshot(path):
+    from utils.schedule_store import read_store
+    return read_store(path)
+
+def load_schedule():
+    """Base snapshot from the configured backend with the booking journal applied on top."""
+    if SCHEDULE_BACKEND == "sqlite":
+        store, conn = _db()
+        return store.read_schedule(conn)  # bookings are already in the tables
+    if SCHEDULE_BACKEND == "columnar":
+        df = _read_columnar_snapshot(_snapshot_path())
     else:
-        if xlsx.exists():
-            return pd.read_excel(xlsx, sheet_name="schedules")
-        return pd.read_csv(csvp)
+        df = _read_csv_snapshot(_snapshot_path())
+    return _replay(df, read_journal())
 
-def save_schedule(df):
-    xlsx = BASE / "data" / "doctor_schedules.xlsx"
-    csvp = BASE / "data" / "doctor_schedules.csv"
+def append_event(event):
+    """
+    Durably appends one book/cancel event to the journal (compacting every COMPACT_EVERY events).
+    Returns False when the sqlite store refused a booking (slot taken or window not scheduled).
+    """
+    global _journal_events
+    journal = _paths()[2]
+    event.setdefault("ts", datetime.now().isoformat(timespec="seconds"))
+    if SCHEDULE_BACKEND == "sqlite":
+        store, conn = _db()
+        with _journal_lock:
+            status = store.apply_event(conn, event)
+            due = store.last_event_id(conn) >= COMPACT_EVERY
+        if due:
+            compact_journal()
+        return status in ("booked", "cancelled")
+    line = json.dumps(event, separators=(",", ":")) + "\n"
+    with file_lock(DATA / BOOKING_LOCK_NAME), _journal_lock:
+        if _journal_events is None:
+            _journal_events = len(read_journal())
+        if journal.exists() and journal.stat().st_size:
+            with open(journal, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    line = "\n" + line  # terminate a torn write so this event stays parseable
+        with open(journal, "a", encoding="utf-8") as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        _journal_events += 1
+        due = _journal_events >= COMPACT_EVERY
+    if due:
+        compact_journal()
+    return True
+
+def record_booking(doctor, location, date_str, start_time, end_time, appointment_id):
+    """Durably appends a booking; O(1) instead of rewriting the whole schedule. False if the store refused it."""
+    return append_event({
+        "op": "book",
+        "doctor": doctor, "location": location, "date": date_str,
+        "start_time": start_time, "end_time": end_time, "appointment_id": appointment_id,
+    })
+
+def record_cancellation(doctor, location, date_str, appointment_id):
+    return append_event({
+        "op": "cancel",
+        "doctor": doctor, "location": location, "date": date_str, "appointment_id": appointment_id,
+    })
+
+def _write_snapshot(df):
+    path = _snapshot_path()
+    if SCHEDULE_BACKEND == "sqlite":
+        store, conn = _db()
+        store.write_schedule(conn, df)  # one transaction; also clears the events
+        return
+    if SCHEDULE_BACKEND == "columnar":
+        from utils.schedule_store import write_store
+        write_store(df, path)  # atomic on its own
+        return
+    tmp = path.with_name(path.name + ".tmp")
     if pd is None:
-        # write csv only
         import csv
-        with open(csvp, "w", newline="", encoding="utf-8") as f:
+        with open(tmp, "w", newline="", encoding="utf-8") as f:
             writer = csv.DictWriter(f, fieldnames=list(df[0].keys()))
             writer.writeheader()
             writer.writerows(df)
     else:
-        # write both for convenience
-        df.to_csv(csvp, index=False)
-        try:
-            with pd.ExcelWriter(xlsx) as writer:
-                df.to_excel(writer, sheet_name="schedules", index=False)
-        except Exception:
-            pass
+        df.to_csv(tmp, index=False)
+    fsync_replace(tmp, path)
+
+def _reset_journal():
+    global _journal_events
+    if SCHEDULE_BACKEND == "sqlite":
+        store, conn = _db()
+        store.clear_events(conn)
+        return
+    journal = _paths()[2]
+    tmp = journal.with_name(journal.name + ".tmp")
+    open(tmp, "w").close()
+    fsync_replace(tmp, journal)
+    _journal_events = 0
+
+def compact_journal():
+    """
+    Folds the journal into the base snapshot. Replaying after a crash between the two steps is idempotent.
+    Holds the booking lock, so no other process can append an event between the load and the reset.
+    """
+    with file_lock(DATA / BOOKING_LOCK_NAME), _journal_lock:
+        if SCHEDULE_BACKEND != "sqlite":  # sqlite bookings are in the tables already
+            _write_snapshot(load_schedule())
+        _reset_journal()
+
+def save_schedule(df):
+    """Writes df as the new base snapshot (atomic) and clears the journal. Excel is exported separately."""
+    with file_lock(DATA / BOOKING_LOCK_NAME), _journal_lock:
+        _write_snapshot(df)
+        _reset_journal()
+
+def export_schedule_excel(force=False):
+    """Regenerates doctor_schedules.xlsx only when the snapshot or journal is newer."""
+    _, xlsx, journal = _paths()
+    wal = _snapshot_path().with_name(_snapshot_path().name + "-wal")  # sqlite commits land here first
+    newest = max(p.stat().st_mtime for p in (_snapshot_path(), journal, wal) if p.exists())
+    if not force and xlsx.exists() and xlsx.stat().st_mtime >= newest:
+        return str(xlsx)
+    if pd is None:
+        raise RuntimeError("Pandas required to write doctor_schedules.xlsx")
+    tmp = xlsx.with_name("doctor_schedules.tmp.xlsx")
+    with pd.ExcelWriter(tmp) as writer:
+        load_schedule().to_excel(writer, sheet_name="schedules", index=False)
+    fsync_replace(tmp, xlsx)
+    return str(xlsx)
 
 def export_admin_report(appointments_df, reminders_df):
     """Export multi-sheet Excel report into /outbox for admin review."""
@@ -83,3 +319,6 @@ def export_admin_report(appointments_df, reminders_df):
             appointments_df.to_csv(out_dir / f"appointments_{ts}.csv", index=False)
             reminders_df.to_csv(out_dir / f"reminders_{ts}.csv", index=False)
     return str(xlsx_path)
+
+# microsecond-scale (cache checks; append_event is covered by record_*): a span would cost too much of it
+instrument(__name__, skip=("patient_sources", "schedule_sources", "read_journal_from", "journal_size", "append_event"))
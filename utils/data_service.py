@@ -0,0 +1,200 @@
+"""
+Process-wide data layer shared by every Streamlit session (and any other caller in the process).
+
+Patients and the schedule are loaded once and kept until their source files change
+(mtime/size signature, checked with a stat per access). Bookings go through a SlotLedger,
+so they update the shared frame and availability index in place and every session sees
+them on its next rerun without re-reading the CSVs. Bookings appended to the journal by
+other processes are applied incrementally; a snapshot rewrite (compaction) forces a reload.
+"""
+import threading
+import time
+
+import pandas as pd
+
+from utils import data_io
+from utils.locks import file_lock
+from utils.patient_index import PatientIndex
+from utils.scheduling import SlotLedger, build_index
+
+def _signature(paths):
+    sig = []
+    for p in paths:
+        try:
+            st = p.stat()
+            sig.append((str(p), st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            sig.append((str(p), None, None))
+    return tuple(sig)
+
+class DataService:
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._patients = None
+        self._patients_sig = None
+        self._patient_index = PatientIndex()
+        self._specialties = None
+        self._specialties_sig = None
+        self._schedule = None
+        self._index = None
+        self._ledger = None
+        self._snapshot_sig = None
+        self._journal_offset = 0
+        self._generation = 0   # bumped whenever the shared schedule changes
+        self.stats = {"hits": 0, "misses": 0, "reload_ms": 0.0, "last_reload_ms": 0.0,
+                      "journal_events_applied": 0, "bookings": 0, "conflicts": 0}
+
+    def _miss(self, started):
+        ms = (time.perf_counter() - started) * 1000
+        self.stats["misses"] += 1
+        self.stats["reload_ms"] += ms
+        self.stats["last_reload_ms"] = ms
+
+    def patients(self):
+        with self._lock:
+            sig = _signature(data_io.patient_sources())
+            if self._patients is not None and sig == self._patients_sig:
+                self.stats["hits"] += 1
+                return self._patients
+            t0 = time.perf_counter()
+            patients = data_io.load_patients()
+            self._patients = pd.DataFrame(patients) if isinstance(patients, list) else patients
+            self._patient_index.update(self._patients)  # re-keys only changed rows
+            self._patients_sig = sig
+            self._miss(t0)
+            return self._patients
+
+    def patient_index(self):
+        """PatientIndex over the current patients.csv."""
+        with self._lock:
+            self.patients()
+            return self._patient_index
+
+    def specialties(self):
+        """doctor -> specialty from doctors.csv, for search_slots(specialty=...)."""
+        with self._lock:
+            sig = _signature([data_io.DATA / data_io.DOCTORS_NAME])
+            if self._specialties is None or sig != self._specialties_sig:
+                self._specialties = {d["doctor"]: d["specialty"] for d in data_io.load_doctors()}
+                self._specialties_sig = sig
+            return self._specialties
+
+    def _reload_schedule(self, locked=False):
+        if not locked:
+            # load snapshot + journal and record the offset atomically w.r.t. other writers
+            with file_lock(data_io.DATA / data_io.BOOKING_LOCK_NAME):
+                return self._reload_schedule(locked=True)
+        t0 = time.perf_counter()
+        snapshot_sig = _signature(data_io.schedule_sources()[:1])
+        offset = data_io.journal_size()
+        schedule = data_io.load_schedule()
+        self._schedule = pd.DataFrame(schedule) if isinstance(schedule, list) else schedule
+        self._index = build_index(self._schedule)
+        if self._ledger is None:
+            self._ledger = SlotLedger(
+                self._schedule, self._index, lock=self._lock,
+                lock_path=data_io.DATA / data_io.BOOKING_LOCK_NAME,
+                persist=self._persist, refresh=self._catch_up,
+            )
+        else:
+            self._ledger.reset(self._schedule, self._index)
+        self._snapshot_sig, self._journal_offset = snapshot_sig, offset
+        self._generation += 1
+        self._miss(t0)
+
+    def _catch_up(self, ledger=None):
+        """
+        Brings the shared schedule up to date with the files. True if nothing had changed.
+        `ledger` is passed when called from inside a commit, i.e. with the file lock already held.
+        """
+        with self._lock:
+            locked = ledger is not None
+            if self._schedule is None:
+                self._reload_schedule(locked)
+                return False
+            if (_signature(data_io.schedule_sources()[:1]) != self._snapshot_sig
+                    or data_io.journal_size() < self._journal_offset):
+                self._reload_schedule(locked)  # snapshot rewritten (compaction / save_schedule)
+                return False
+            events, self._journal_offset = data_io.read_journal_from(self._journal_offset)
+            for ev in events:
+                self._ledger.apply(ev)
+            if events:
+                self._generation += 1
+            self.stats["journal_events_applied"] += len(events)
+            return not events
+
+    def _persist(self, event):
+        # runs inside the ledger's locks, so nobody else can append between the write and the stat
+        ok = data_io.append_event(event)
+        self._snapshot_sig = _signature(data_io.schedule_sources()[:1])
+        self._journal_offset = data_io.journal_size()
+        if ok:
+            self._generation += 1
+        return ok
+
+    def schedule(self):
+        """(schedule DataFrame, AvailabilityIndex) — shared objects, do not mutate outside book()."""
+        with self._lock:
+            if self._catch_up():
+                self.stats["hits"] += 1
+            return self._schedule, self._index
+
+    def appointment(self, appointment_id):
+        """doctor/location/date/start_time/end_time of a booked appointment, or None; read under the lock."""
+        with self._lock:
+            df, _ = self.schedule()
+            rows = df[df["appointment_id"] == appointment_id]
+            if not len(rows):
+                return None
+            first, last = rows.iloc[0], rows.iloc[-1]
+            return {"doctor": first["doctor"], "location": first["location"], "date": first["date"],
+                    "start_time": first["start_time"], "end_time": last["end_time"]}
+
+    def booked(self, appointment_ids):
+        """The subset of appointment_ids that still hold slots in the shared schedule."""
+        with self._lock:
+            df, _ = self.schedule()
+            return set(df.loc[df["appointment_id"].isin(set(appointment_ids)), "appointment_id"])
+
+    def schedule_generation(self):
+        """Counter that changes whenever the shared schedule does (reload, booking, cancellation)."""
+        with self._lock:
+            self.schedule()
+            return self._generation
+
+    def ledger(self):
+        with self._lock:
+            self.schedule()
+            return self._ledger
+
+    def book(self, doctor, location, date_str, start_time, end_time, appointment_id):
+        """Reserves the window if it is still free. Returns False when another booking got there first."""
+        status = self.ledger().book(doctor, location, date_str, start_time, end_time, appointment_id)
+        with self._lock:
+            self.stats["bookings" if status == "booked" else "conflicts"] += 1
+        return status == "booked"
+
+    def cancel(self, doctor, location, date_str, appointment_id):
+        self.ledger().cancel(doctor, location, date_str, appointment_id)
+
+    def invalidate(self):
+        with self._lock:
+            self._patients = self._schedule = self._index = None
+
+    def metrics(self):
+        with self._lock:
+            total = self.stats["hits"] + self.stats["misses"]
+            return {**self.stats, "hit_rate": self.stats["hits"] / total if total else 0.0}
+
+_service = None
+_service_lock = threading.Lock()
+
+def get_service():
+    """The process-wide DataService (created on first use)."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = DataService()
+        return _service
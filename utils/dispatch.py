@@ -0,0 +1,175 @@
+"""
+Background outbound-email dispatch: a queue drained by worker threads that share a small
+pool of logged-in SMTP sessions, with retry/backoff and per-message delivery status.
+"""
+import itertools
+import queue
+import smtplib
+import threading
+import time
+
+def _send(server, message):
+    if hasattr(message, "wire_bytes"):  # attachments.FormMessage: already serialized parts
+        server.sendmail(message["From"], [message["To"]], message.wire_bytes())
+    else:
+        server.send_message(message)
+
+class SMTPPool:
+    """Reusable SMTP sessions: connect + STARTTLS + login once, then send many messages."""
+
+    def __init__(self, host, port, user=None, password=None, size=2, starttls=True, timeout=30, max_idle=60):
+        self.host, self.port = host, port
+        self.user, self.password = user, password
+        self.starttls = starttls
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self.stats = {"connects": 0, "reuses": 0, "discards": 0}
+
+    def _connect(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        server.ehlo()
+        if self.starttls and server.has_extn("starttls"):
+            server.starttls()
+            server.ehlo()
+        if self.user and self.password:
+            server.login(self.user, self.password)
+        self.stats["connects"] += 1
+        return server
+
+    def acquire(self):
+        self._slots.acquire()
+        while True:
+            try:
+                server, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if time.monotonic() - last_used < self.max_idle:
+                self.stats["reuses"] += 1
+                return server
+            self._close(server)  # servers drop idle sessions; don't gamble on a stale one
+        try:
+            return self._connect()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, server, broken=False):
+        if broken:
+            self.stats["discards"] += 1
+            self._close(server)
+        else:
+            self._idle.put((server, time.monotonic()))
+        self._slots.release()
+
+    def _close(self, server):
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+    def close(self):
+        while True:
+            try:
+                server, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._close(server)
+
+class Dispatcher:
+    """
+    submit() enqueues a ready email.message.Message and returns at once; worker threads
+    send it over the pool. Failures are retried with exponential backoff, and status(id)
+    reports queued / sending / retrying / sent / failed for each message.
+    """
+
+    def __init__(self, pool, workers=2, max_retries=3, backoff=0.5, keep_status=10_000):
+        self.pool = pool
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.keep_status = keep_status
+        self._queue = queue.Queue()
+        self._status = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._idle = threading.Condition(self._lock)
+        self._stopping = False
+        self._threads = [threading.Thread(target=self._run, name=f"smtp-dispatch-{i}", daemon=True)
+                         for i in range(workers)]
+        for t in self._threads:
+            t.start()
+
+    def _set(self, msg_id, **fields):
+        with self._lock:
+            self._status.setdefault(msg_id, {}).update(fields)
+            if len(self._status) > self.keep_status:
+                # forget the oldest finished messages
+                for old in list(self._status)[: len(self._status) - self.keep_status]:
+                    if self._status[old]["state"] in ("sent", "failed"):
+                        del self._status[old]
+
+    def submit(self, message, msg_id=None):
+        msg_id = msg_id or f"m{next(self._ids)}"
+        self._set(msg_id, state="queued", attempts=0, error=None, to=message["To"])
+        with self._lock:
+            self._pending += 1
+        self._queue.put((msg_id, message, 0))
+        return msg_id
+
+    def status(self, msg_id=None):
+        with self._lock:
+            if msg_id is None:
+                return {k: dict(v) for k, v in self._status.items()}
+            return dict(self._status.get(msg_id, {}))
+
+    def _done(self):
+        with self._lock:
+            self._pending -= 1
+            if not self._pending:
+                self._idle.notify_all()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            msg_id, message, attempt = item
+            self._set(msg_id, state="sending", attempts=attempt + 1)
+            server = None
+            try:
+                server = self.pool.acquire()
+                _send(server, message)
+            except Exception as e:
+                if server is not None:
+                    self.pool.release(server, broken=True)
+                if attempt + 1 > self.max_retries:
+                    self._set(msg_id, state="failed", error=str(e))
+                    self._done()
+                else:
+                    self._set(msg_id, state="retrying", error=str(e))
+                    delay = self.backoff * (2 ** attempt)
+                    timer = threading.Timer(delay, self._queue.put, args=((msg_id, message, attempt + 1),))
+                    timer.daemon = True
+                    timer.start()
+                continue
+            self.pool.release(server)
+            self._set(msg_id, state="sent", error=None, sent_at=time.time())
+            self._done()
+
+    def flush(self, timeout=None):
+        """Blocks until every submitted message is sent or has failed. False on timeout."""
+        with self._idle:
+            return self._idle.wait_for(lambda: not self._pending, timeout)
+
+    def stop(self, timeout=5):
+        self.flush(timeout)
+        for _ in self._threads:
+            self._queue.put(None)
+        for t in self._threads:
+            t.join(timeout)
+        self.pool.close()
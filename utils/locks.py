@@ -0,0 +1,54 @@
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+_held = threading.local()  # lock paths this thread holds -> nesting depth
+
+@contextmanager
+def file_lock(path):
+    """
+    Exclusive inter-process lock on `path` (created if missing). Blocks until acquired.
+    Re-entrant within a thread, so e.g. a compaction triggered inside a booking commit
+    does not deadlock on the lock the commit already holds.
+    """
+    path = Path(path)
+    held = getattr(_held, "paths", None)
+    if held is None:
+        held = _held.paths = {}
+    key = os.path.abspath(path)
+    if held.get(key):
+        held[key] += 1
+        try:
+            yield
+        finally:
+            held[key] -= 1
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue  # LK_LOCK gives up after ~10s; keep waiting
+        held[key] = 1
+        try:
+            yield
+        finally:
+            held[key] = 0
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
@@ -0,0 +1,278 @@
+"""
+Append-only outbox log: every email/SMS as one JSON line in rotating segments
+(outbox/messages-000001.jsonl, -000002, ... a new one past SEGMENT_BYTES).
+
+log() assigns the message id and queues the record; a background flusher writes everything
+queued since its last pass with one write + fsync (group commit), so a reminder run for
+thousands of patients costs a handful of fsyncs instead of a file per message. flush() blocks
+until everything logged so far is durable (also run at exit).
+
+Ids are zero-padded decimal strings, unique across processes sharing the directory and
+increasing in log() order within a process: each process leases blocks of LEASE ids from
+outbox/next_id under the outbox lock. Across processes they are not in file order (a process
+can write ids from its lease after another process wrote higher ones).
+
+A keyed record is decided under the outbox lock: log() first reads what other processes appended
+since its last look, and a key already in the log (within the last DEDUP_WINDOW keys) returns the
+earlier id and duplicate=True. A fresh keyed record is written out before the lock is released
+(together with anything queued ahead of it) so the next process sees it; the flusher still does
+the fsync, so keyed records are group-committed like the rest.
+"""
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+
+from utils.locks import file_lock
+
+SEGMENT_BYTES = 16 * 2**20
+FLUSH_INTERVAL = 0.01   # seconds the flusher waits for more records before committing a batch
+MAX_BATCH = 4096
+LEASE = 4096
+DEDUP_WINDOW = 100_000
+ID_WIDTH = 12
+LOCK_NAME = "outbox.lock"
+
+def segments(directory):
+    """Segment files in write order."""
+    return sorted(Path(directory).glob("messages-*.jsonl"))
+
+def _records(path):
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break  # torn tail of a crashed write
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+def _read_from(path, offset):
+    """(records at or after byte `offset`, offset just past the last complete line)."""
+    records = []
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break  # still being written, or torn; picked up (or skipped) next time
+            offset += len(line)
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records, offset
+
+def _fsync(path):
+    with open(path, "rb") as f:
+        os.fsync(f.fileno())
+
+def iter_messages(directory, since_id=None, until_id=None, kind=None, to=None, since=None, until=None, text=None):
+    """
+    Logged messages in write order, optionally filtered by id range (inclusive), kind, recipient,
+    ISO timestamp range (inclusive prefix match, so "2025-09-05" works) and a substring of subject/body.
+    """
+    for path in segments(directory):
+        for r in _records(path):
+            if since_id is not None and r["id"] < since_id or until_id is not None and r["id"] > until_id:
+                continue
+            if kind is not None and r["kind"] != kind or to is not None and r["to"] != to:
+                continue
+            if since is not None and r["ts"] < since or until is not None and r["ts"][:len(until)] > until:
+                continue
+            if text is not None and text not in r["subject"] and text not in r["body"]:
+                continue
+            yield r
+
+def get_message(directory, msg_id):
+    return next(iter_messages(directory, since_id=msg_id, until_id=msg_id), None)
+
+class Outbox:
+
+    def __init__(self, directory, segment_bytes=SEGMENT_BYTES, flush_interval=FLUSH_INTERVAL):
+        self.dir = Path(directory)
+        self.segment_bytes = segment_bytes
+        self.flush_interval = flush_interval
+        self._cond = threading.Condition()
+        self._queue = []
+        self._logged = 0          # records queued so far
+        self._durable = 0         # records written + fsynced so far
+        self._unsynced = 0        # records log() wrote out that still need the flusher's fsync
+        self._dirty = set()       # segments those went to
+        self._next = self._end = 0  # current id lease [next, end)
+        self._keys = None         # dedup key -> id, most recent last; loaded on first keyed log
+        self._pos = (None, 0)     # (segment name, offset) the keys have been read up to
+        self._stopping = False
+        self._waiting = 0         # flush() callers: commit now instead of lingering
+        self._thread = None
+        self.stats = {"messages": 0, "batches": 0, "duplicates": 0, "write_errors": 0}
+
+    # -- ids and dedup -----------------------------------------------------------------------
+
+    def _lease(self):
+        self.dir.mkdir(parents=True, exist_ok=True)
+        path = self.dir / "next_id"
+        with file_lock(self.dir / LOCK_NAME):
+            try:
+                start = int(path.read_text())
+            except (FileNotFoundError, ValueError):
+                start = max((int(r["id"]) for p in segments(self.dir)[-1:] for r in _records(p)), default=0) + 1
+            tmp = path.with_name("next_id.tmp")
+            tmp.write_text(str(start + LEASE))
+            os.replace(tmp, path)
+        self._next, self._end = start, start + LEASE
+
+    def _remember(self, key, msg_id):
+        self._keys[key] = msg_id
+        if len(self._keys) > DEDUP_WINDOW:
+            self._keys.popitem(last=False)
+
+    def _catch_up(self):
+        """Reads the keys appended since the last look (by any process). Outbox lock held."""
+        if self._keys is None:
+            keys, pos = OrderedDict(), (None, 0)
+            for path in reversed(segments(self.dir)):
+                records, end = _read_from(path, 0)
+                if pos[0] is None:
+                    pos = path.name, end
+                for r in reversed(records):
+                    if r.get("key"):
+                        keys.setdefault(r["key"], r["id"])
+                if len(keys) >= DEDUP_WINDOW:
+                    break
+            self._keys, self._pos = OrderedDict(reversed(keys.items())), pos
+            return
+        seg, offset = self._pos
+        for path in segments(self.dir):
+            if seg is not None and path.name < seg:
+                continue
+            records, end = _read_from(path, offset if path.name == seg else 0)
+            for r in records:
+                if r.get("key"):
+                    self._remember(r["key"], r["id"])
+            seg, offset = path.name, end
+        self._pos = seg, offset
+
+    # -- logging -----------------------------------------------------------------------------
+
+    def log(self, kind, to, subject, body, attachments=None, key=None):
+        """Queues one message; (id, False), or (earlier id, True) for an already logged key."""
+        with self._cond:
+            if key is None:
+                record = self._record(kind, to, subject, body, attachments)
+                self._queue.append(record)
+            else:
+                self.dir.mkdir(parents=True, exist_ok=True)
+                with file_lock(self.dir / LOCK_NAME):
+                    self._catch_up()
+                    if key in self._keys:
+                        self.stats["duplicates"] += 1
+                        return self._keys[key], True
+                    record = self._record(kind, to, subject, body, attachments, key)
+                    self._remember(key, record["id"])
+                    batch, self._queue = self._queue + [record], []
+                    try:
+                        self._dirty.add(self._write(batch, sync=False))  # visible to the next process now
+                        self._unsynced += len(batch)
+                    except OSError:
+                        self._queue = batch  # the flusher retries; until then only this process knows the key
+            self._logged += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="outbox-flusher", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+            if len(self._queue) <= 1 or len(self._queue) >= MAX_BATCH:
+                self._cond.notify_all()  # wake the flusher; in between it is lingering anyway
+            return record["id"], False
+
+    def _record(self, kind, to, subject, body, attachments, key=None):
+        if self._next >= self._end:
+            self._lease()
+        record = {"id": f"{self._next:0{ID_WIDTH}d}", "ts": datetime.now().isoformat(timespec="microseconds"),
+                  "kind": kind, "to": to, "subject": subject, "body": body}
+        self._next += 1
+        if attachments:
+            record["attachments"] = list(attachments)
+        if key is not None:
+            record["key"] = key
+        return record
+
+    def flush(self, timeout=None):
+        """Blocks until every record logged so far is on disk. False on timeout."""
+        with self._cond:
+            target = self._logged
+            self._waiting += 1
+            self._cond.notify_all()
+            try:
+                return self._cond.wait_for(lambda: self._durable >= target, timeout)
+            finally:
+                self._waiting -= 1
+
+    def close(self, timeout=10):
+        self.flush(timeout)
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        with self._cond:
+            self._thread, self._stopping = None, False  # a later log() starts a new flusher
+
+    # -- flusher -----------------------------------------------------------------------------
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._queue or self._unsynced or self._stopping)
+                if not self._queue and not self._unsynced:
+                    return
+                # group commit: give concurrent senders a moment to join this batch
+                self._cond.wait_for(lambda: len(self._queue) >= MAX_BATCH or self._stopping or self._waiting,
+                                   self.flush_interval)
+                batch, self._queue = self._queue[:MAX_BATCH], self._queue[MAX_BATCH:]
+                unsynced, dirty, self._unsynced, self._dirty = self._unsynced, self._dirty, 0, set()
+            try:
+                synced = {self._write(batch)} if batch else set()
+                for path in dirty - synced:
+                    _fsync(path)
+            except OSError as e:
+                self.stats["write_errors"] += 1
+                print(f"❌ Outbox write failed, retrying: {e}", file=sys.stderr)
+                with self._cond:
+                    self._queue[:0] = batch
+                    self._unsynced += unsynced
+                    self._dirty |= dirty
+                time.sleep(1)
+                continue
+            with self._cond:
+                self._durable += len(batch) + unsynced
+                self.stats["messages"] += len(batch) + unsynced
+                self.stats["batches"] += 1
+                self._cond.notify_all()
+
+    def _write(self, batch, sync=True):
+        """Appends batch to the current segment (fsynced unless sync=False); returns the segment."""
+        data = "".join(json.dumps(r, ensure_ascii=False, separators=(",", ":")) + "\n" for r in batch).encode()
+        self.dir.mkdir(parents=True, exist_ok=True)
+        with file_lock(self.dir / LOCK_NAME):
+            existing = segments(self.dir)
+            path = existing[-1] if existing else self.dir / "messages-000001.jsonl"
+            size = path.stat().st_size if path.exists() else 0
+            if size and size + len(data) > self.segment_bytes:
+                path = self.dir / f"messages-{int(path.stem.split('-')[1]) + 1:06d}.jsonl"
+                size = 0
+            with open(path, "ab") as f:
+                if size:
+                    with open(path, "rb") as r:
+                        r.seek(-1, os.SEEK_END)
+                        if r.read(1) != b"\n":
+                            data = b"\n" + data  # terminate a torn write so this batch stays parseable
+                f.write(data)
+                f.flush()
+                if sync:
+                    os.fsync(f.fileno())
+        return path
@@ -0,0 +1,137 @@
+"""
+Hashed patient lookup on normalized (first name, last name, DOB) keys.
+
+Tiers: exact normalized key (dict hit) -> phonetic (Soundex of both names + DOB) ->
+fuzzy (same DOB, difflib similarity on the full name). The phonetic table is built on
+first use. update(df) re-normalizes only rows whose contents changed.
+"""
+import difflib
+import re
+import unicodedata
+
+import pandas as pd
+
+FUZZY_CUTOFF = 0.85
+
+def normalize_name(name):
+    """Case-folded, diacritic- and whitespace/punctuation-stripped name: ' José-Luis ' -> 'joseluis'."""
+    text = unicodedata.normalize("NFKD", str(name or "")).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[^0-9a-z]", "", text.casefold())
+
+def _normalize_series(s):
+    # vectorized twin of normalize_name
+    return (s.fillna("").astype(str).str.normalize("NFKD")
+            .str.encode("ascii", "ignore").str.decode("ascii")
+            .str.casefold().str.replace(r"[^0-9a-z]", "", regex=True))
+
+_SOUNDEX = {c: str(d) for d, letters in enumerate(
+    ("aehiouwy", "bfpv", "cgjkqsxz", "dt", "l", "mn", "r")) for c in letters}
+
+def soundex(name):
+    """Classic 4-character Soundex of an already normalized name ('' for empty)."""
+    name = "".join(c for c in name if c.isalpha())
+    if not name:
+        return ""
+    out, last = [name[0].upper()], _SOUNDEX.get(name[0], "")
+    for c in name[1:]:
+        code = _SOUNDEX.get(c, "")
+        if code and code != "0" and code != last:
+            out.append(code)
+        if c not in "hw":
+            last = code
+    return ("".join(out) + "000")[:4]
+
+class PatientIndex:
+
+    def __init__(self, df=None):
+        self.df = None
+        self.exact = {}      # (first, last, dob) -> [row positions]
+        self.by_dob = {}     # dob -> [row positions]
+        self._phonetic = None
+        self._keys = None    # normalized key per row position
+        self._row_hash = None
+        self._columns = {}
+        if df is not None:
+            self.update(df)
+
+    def _tables(self, key):
+        yield self.exact, key
+        yield self.by_dob, key[2]
+        if self._phonetic is not None:
+            yield self._phonetic, (soundex(key[0]), soundex(key[1]), key[2])
+
+    def _add(self, pos, key):
+        for table, k in self._tables(key):
+            table.setdefault(k, []).append(pos)
+
+    def _drop(self, pos, key):
+        for table, k in self._tables(key):
+            rows = table.get(k)
+            if rows and pos in rows:
+                rows.remove(pos)
+                if not rows:
+                    del table[k]
+
+    def update(self, df):
+        """Indexes df; when a previous frame was indexed, only re-keys rows whose contents changed."""
+        df = df.reset_index(drop=True)
+        row_hash = pd.util.hash_pandas_object(df[["first_name", "last_name", "dob"]], index=False).to_numpy()
+        if self._row_hash is None:
+            changed = range(len(df))
+            old_n = 0
+            self._keys = []
+        else:
+            old_n = len(self._row_hash)
+            n = min(old_n, len(df))
+            changed = [i for i in (row_hash[:n] != self._row_hash[:n]).nonzero()[0]] + list(range(n, len(df)))
+            for pos in range(len(df), old_n):  # rows removed from the end
+                self._drop(pos, self._keys[pos])
+            self._keys = self._keys[:len(df)]
+        if len(changed):
+            sub = df.iloc[list(changed)]
+            keys = list(zip(_normalize_series(sub["first_name"]), _normalize_series(sub["last_name"]),
+                            sub["dob"].fillna("").astype(str)))
+            self._keys.extend([None] * (len(df) - len(self._keys)))
+            for pos, key in zip(changed, keys):
+                if pos < old_n and self._keys[pos] is not None:
+                    self._drop(pos, self._keys[pos])
+                self._keys[pos] = key
+                self._add(pos, key)
+        self.df = df
+        self._columns = {c: df[c].to_numpy(dtype=object) for c in df.columns}
+        self._row_hash = row_hash
+        return len(changed)
+
+    def _phonetic_table(self):
+        if self._phonetic is None:
+            table = {}
+            for pos, (fn, ln, dob) in enumerate(self._keys):
+                table.setdefault((soundex(fn), soundex(ln), dob), []).append(pos)
+            self._phonetic = table
+        return self._phonetic
+
+    def _record(self, pos):
+        # plain column arrays: building a row Series per lookup costs more than the hash hit
+        return {c: col[pos] for c, col in self._columns.items()}
+
+    def lookup(self, first_name, last_name, dob, fuzzy=True):
+        """(record dict or None, tier) with tier in 'exact', 'phonetic', 'fuzzy' or None."""
+        fn, ln, dob = normalize_name(first_name), normalize_name(last_name), str(dob)
+        rows = self.exact.get((fn, ln, dob))
+        if rows:
+            return self._record(rows[0]), "exact"
+        if not fuzzy:
+            return None, None
+        rows = self._phonetic_table().get((soundex(fn), soundex(ln), dob))
+        if rows:
+            return self._record(rows[0]), "phonetic"
+        target = fn + " " + ln
+        best, best_pos = FUZZY_CUTOFF, None
+        for pos in self.by_dob.get(dob, ()):
+            k = self._keys[pos]
+            score = difflib.SequenceMatcher(None, target, k[0] + " " + k[1]).ratio()
+            if score >= best:
+                best, best_pos = score, pos
+        if best_pos is not None:
+            return self._record(best_pos), "fuzzy"
+        return None, None
@@ -0,0 +1,342 @@
+"""
+Durable reminder engine.
+
+Pending reminders live in a min-heap ordered by due time; the worker thread sleeps until the
+earliest one is due (or a new earlier one arrives), then pops and dispatches everything due in
+that tick as one batch. Every add/cancel/sent is appended to data/reminders.jsonl, which is
+replayed on start so reminders survive a restart; the log is compacted down to the pending set
+once it grows well past it. Cancelled reminders are dropped lazily when they reach the heap top.
+
+Several processes may share one log. Appends and compactions happen under <log>.lock after
+reading whatever the others appended since (a compaction by another process replaces the file,
+which triggers a full re-read). A batch is claimed in the log before it is dispatched and marked
+sent after, so only one process sends it; a claim not marked sent within CLAIM_SECONDS (its process
+died or stalled) expires and the batch is dispatched again. send_reminders keys every message by
+reminder id, and the outbox checks keys against what every process sharing it has logged, so the
+repeat sends nothing for reminders that already went out (scripts/bench_reminders.py checks this
+with two processes). A custom dispatch needs its own idempotence.
+"""
+import heapq
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from utils import data_io
+from utils.locks import file_lock
+
+LOG_NAME = "reminders.jsonl"
+RETRY_SECONDS = 60  # delay before re-trying a batch whose dispatch raised
+CLAIM_SECONDS = 300  # a claimed batch not marked sent by then (its process died) is dispatched again
+POLL_SECONDS = 60    # how often an idle worker picks up what other processes logged
+
+# T-72h plain, T-48h / T-24h with the confirmation questions (as in the app's reminder spec)
+OFFSETS = [(timedelta(hours=72), False), (timedelta(hours=48), True), (timedelta(hours=24), True)]
+ACTIONS = " Reply with (1) Filled forms? (2) Confirm visit? If cancel, share reason."
+
+class Reminder:
+    __slots__ = ("id", "appointment_id", "due", "channel", "to", "phone", "subject", "message")
+
+    def __init__(self, id, appointment_id, due, channel, to, phone, subject, message):
+        self.id, self.appointment_id, self.due = id, appointment_id, due
+        # a handful of distinct templates across millions of reminders: share the strings
+        self.channel, self.to, self.phone = sys.intern(channel), to, phone
+        self.subject, self.message = subject, sys.intern(message)
+
+    def to_event(self):
+        return {"op": "add", **{k: getattr(self, k) for k in self.__slots__}}
+
+    def as_row(self):
+        return {
+            "appointment_id": self.appointment_id,
+            "send_at": datetime.fromtimestamp(self.due).isoformat(timespec="minutes"),
+            "channel": self.channel,
+            "message": self.message,
+        }
+
+class ReminderScheduler:
+
+    def __init__(self, log_path=None, dispatch=None, clock=time.time):
+        self.log_path = log_path or data_io.DATA / LOG_NAME
+        self.dispatch = dispatch      # callable(list[Reminder]) for each due batch
+        self.clock = clock
+        self.pending = {}             # id -> Reminder
+        self.by_appointment = {}      # appointment_id -> set of ids
+        self._heap = []               # (due, seq, id); may hold cancelled ids
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self.claimed = {}             # id -> (until, owner) of batches being dispatched
+        self._owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._lock_path = self.log_path.with_name(self.log_path.name + ".lock")
+        self._log_lines = 0
+        self._offset = 0              # bytes of the log applied so far
+        self._ino = None
+        self._thread = None
+        self._stopping = False
+        self.stats = {"dispatched": 0, "ticks": 0, "last_tick_ms": 0.0}
+        with self._cond, self._locked():
+            pass
+
+    # -- persistence -------------------------------------------------------------------------
+
+    @contextmanager
+    def _locked(self):
+        """Inter-process log lock, with the events other processes appended applied first."""
+        with file_lock(self._lock_path):
+            self._catch_up()
+            yield
+
+    def _catch_up(self):
+        try:
+            st = os.stat(self.log_path)
+        except FileNotFoundError:
+            st = None
+        if st is None or st.st_ino != self._ino or st.st_size < self._offset:
+            self._reset()  # first read, or another process compacted (replaced) the log
+            if st is None:
+                return
+            self._ino = st.st_ino
+        if st.st_size == self._offset:
+            return
+        full = self._offset == 0
+        with open(self.log_path, "rb") as f:
+            f.seek(self._offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # torn tail of a crashed write; _write terminates it
+                self._offset += len(line)
+                self._log_lines += 1
+                try:
+                    ev = json.loads(line)
+                except ValueError:
+                    continue
+                self._apply(ev, push=not full)
+        if full:
+            # one O(n) heapify instead of n pushes
+            self._heap = [(r.due, next(self._seq), r.id) for r in self.pending.values()]
+            heapq.heapify(self._heap)
+
+    def _reset(self):
+        self.pending, self.by_appointment, self.claimed, self._heap = {}, {}, {}, []
+        self._offset = self._log_lines = 0
+        self._ino = None
+
+    def _apply(self, ev, push):
+        op = ev.pop("op")
+        if op == "add":
+            self._insert(Reminder(**ev), push=push)
+        elif op == "cancel":
+            self._forget(self.by_appointment.get(ev["appointment_id"], ()))
+        elif op == "sent":
+            self._forget(ev["ids"])
+        elif op == "claim":
+            for rid in ev["ids"]:
+                if rid in self.pending:
+                    self.claimed[rid] = (ev["until"], ev["owner"])
+
+    def _write(self, events):
+        """Appends events; call under _locked()."""
+        if not events:
+            return
+        data = "".join(json.dumps(ev, separators=(",", ":")) + "\n" for ev in events).encode()
+        self.log_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.log_path, "ab") as f:
+            if f.tell() > self._offset:
+                data = b"\n" + data  # terminate a torn tail so our first event stays parseable
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+            self._offset = f.tell()
+            self._ino = os.fstat(f.fileno()).st_ino
+        self._log_lines += len(events)
+        if self._log_lines > 2 * len(self.pending) + 1000:
+            self._compact()
+
+    def compact(self):
+        """Rewrites the log as just the pending reminders (temp file + atomic rename)."""
+        with self._cond, self._locked():
+            self._compact()
+
+    def _compact(self):
+        tmp = self.log_path.with_name(self.log_path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for r in self.pending.values():
+                f.write(json.dumps(r.to_event(), separators=(",", ":")) + "\n")
+            claims = {}
+            for rid, claim in self.claimed.items():
+                claims.setdefault(claim, []).append(rid)
+            for (until, owner), ids in claims.items():
+                f.write(json.dumps({"op": "claim", "ids": ids, "until": until, "owner": owner}) + "\n")
+        data_io.fsync_replace(tmp, self.log_path)
+        st = os.stat(self.log_path)
+        self._ino, self._offset = st.st_ino, st.st_size
+        self._log_lines = len(self.pending) + len(claims)
+
+    # -- in-memory state ---------------------------------------------------------------------
+
+    def _insert(self, r, push=True):
+        self.pending[r.id] = r
+        self.by_appointment.setdefault(r.appointment_id, set()).add(r.id)
+        if push:
+            heapq.heappush(self._heap, (r.due, next(self._seq), r.id))
+
+    def _forget(self, ids):
+        for rid in list(ids):
+            r = self.pending.pop(rid, None)
+            if r is not None:
+                self.claimed.pop(rid, None)
+                ids_for_appt = self.by_appointment.get(r.appointment_id)
+                if ids_for_appt is not None:
+                    ids_for_appt.discard(rid)
+                    if not ids_for_appt:
+                        del self.by_appointment[r.appointment_id]
+
+    # -- API ---------------------------------------------------------------------------------
+
+    def add(self, reminders):
+        with self._cond, self._locked():
+            wake = bool(reminders) and (not self._heap or min(r.due for r in reminders) < self._heap[0][0])
+            for r in reminders:
+                self._insert(r)
+            self._write([r.to_event() for r in reminders])
+            if wake:
+                self._cond.notify()
+        return reminders
+
+    def schedule_for_appointment(self, appt, email, phone=None):
+        """Creates the T-72h / T-48h / T-24h reminders for an appointment dict from the app."""
+        start = datetime.strptime(appt["date"] + " " + appt["start_time"], "%Y-%m-%d %H:%M")
+        reminders = []
+        for off, with_actions in OFFSETS:
+            msg = "Reminder: Upcoming visit." + (ACTIONS if with_actions else "")
+            reminders.append(Reminder(
+                uuid.uuid4().hex[:16], appt["appointment_id"], (start - off).timestamp(), "email+sms",
+                email, phone, f"Reminder — {appt['appointment_id']}", msg,
+            ))
+        return self.add(reminders)
+
+    def cancel_appointment(self, appointment_id):
+        """Drops every pending reminder of a released booking. Returns how many were pending."""
+        with self._cond, self._locked():
+            ids = self.by_appointment.get(appointment_id, set())
+            n = len(ids)
+            self._forget(ids)
+            self._write([{"op": "cancel", "appointment_id": appointment_id}])
+            return n
+
+    def for_appointment(self, appointment_id):
+        with self._cond:
+            rs = [self.pending[i] for i in self.by_appointment.get(appointment_id, ())]
+        return sorted(rs, key=lambda r: r.due)
+
+    def next_due(self):
+        with self._cond:
+            self._drop_stale_top()
+            return self._heap[0][0] if self._heap else None
+
+    def _drop_stale_top(self):
+        while self._heap and self._heap[0][2] not in self.pending:
+            heapq.heappop(self._heap)
+
+    def tick(self, now=None):
+        """
+        Pops every reminder due at `now`, claims them in the log, dispatches them as one batch and
+        logs them as sent. Reminders another live process has claimed are skipped until the claim expires.
+        """
+        t0 = time.perf_counter()
+        now = self.clock() if now is None else now
+        with self._cond:
+            batch = []
+            if self._heap and self._heap[0][0] <= now:
+                with self._locked():
+                    while self._heap and self._heap[0][0] <= now:
+                        _, _, rid = heapq.heappop(self._heap)
+                        r = self.pending.get(rid)
+                        if r is None:
+                            continue
+                        until, owner = self.claimed.get(rid, (0, None))
+                        if until > now and owner != self._owner:
+                            heapq.heappush(self._heap, (until, next(self._seq), rid))
+                            continue
+                        batch.append(r)
+                    if batch:
+                        until = now + CLAIM_SECONDS
+                        for r in batch:
+                            self.claimed[r.id] = (until, self._owner)
+                        self._write([{"op": "claim", "ids": [r.id for r in batch], "until": until,
+                                      "owner": self._owner}])
+        if batch:
+            if self.dispatch is not None:
+                try:
+                    self.dispatch(batch)
+                except Exception:
+                    with self._cond:  # put the batch back and retry in a minute
+                        for r in batch:
+                            heapq.heappush(self._heap, (now + RETRY_SECONDS, next(self._seq), r.id))
+                    raise
+            with self._cond, self._locked():
+                self._forget([r.id for r in batch])
+                self._write([{"op": "sent", "ids": [r.id for r in batch]}])
+        self.stats["ticks"] += 1
+        self.stats["dispatched"] += len(batch)
+        self.stats["last_tick_ms"] = (time.perf_counter() - t0) * 1000
+        return batch
+
+    # -- worker ------------------------------------------------------------------------------
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopping:
+                    self._drop_stale_top()
+                    delay = self._heap[0][0] - self.clock() if self._heap else None
+                    if delay is not None and delay <= 0:
+                        break
+                    # woken early by add() / stop(); on timeout pick up other processes' reminders
+                    if not self._cond.wait(POLL_SECONDS if delay is None else min(delay, POLL_SECONDS)):
+                        with self._locked():
+                            pass
+                if self._stopping:
+                    return
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"❌ Reminder dispatch failed: {e}")
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="reminders", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(5)
+
+def send_reminders(batch):
+    """Default dispatch: email (and SMS when a phone is known) through utils.comms."""
+    from utils.comms import send_email, send_sms
+    for r in batch:
+        # keyed by reminder id: a batch re-dispatched after a crash is not sent twice
+        send_email(to=r.to or "test@example.com", subject=r.subject, body=r.message, dedup_key=f"reminder-{r.id}-email")
+        if r.phone and "sms" in r.channel:
+            send_sms(r.phone, r.message, dedup_key=f"reminder-{r.id}-sms")
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def get_reminder_scheduler():
+    """Process-wide scheduler, recovered from the log and started on first use."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = ReminderScheduler(dispatch=send_reminders).start()
+        return _scheduler
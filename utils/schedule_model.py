@@ -0,0 +1,283 @@
+"""
+Compact in-memory schedule: 64-bit words instead of one row of strings per 15-minute slot.
+
+Each (doctor, location) is a Provider holding two array('Q') columns indexed by day since its
+first day: the scheduled slots and the free slots of that day. Bit i is the 15-minute slot
+starting at DAY_START + 15*i, so one word covers 06:00-22:00. Appointment ids live in a small
+per-provider side table keyed by (day << 6 | slot) holding one entry per appointment, at its
+first slot; the booked slots that follow without an entry belong to the same appointment.
+Names, dates and times exist once per provider / distinct value instead of once per row.
+
+from_frame / to_frame convert to and from the schedule DataFrame (15-minute rows; any status
+other than "available" is kept as booked), and availability_index() builds the usual
+AvailabilityIndex straight from the words.
+"""
+import sys
+from array import array
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from utils.schedule_store import EPOCH, _day_numbers, _minutes
+from utils.slot_index import SLOT_MINUTES, AvailabilityIndex, from_minutes, run_starts, to_minutes
+
+DAY_START = 6 * 60
+SLOTS_PER_DAY = 64
+COLUMNS = ["doctor_id", "doctor", "location", "date", "start_time", "end_time", "slot_status", "appointment_id"]
+
+def _day_number(date_str):
+    return (pd.Timestamp(date_str).date() - EPOCH).days
+
+def _date_str(day):
+    return (EPOCH + timedelta(days=int(day))).isoformat()
+
+def _slot_bits(start_time, end_time):
+    first = (to_minutes(start_time) - DAY_START) // SLOT_MINUTES
+    last = -(-(to_minutes(end_time) - DAY_START) // SLOT_MINUTES)
+    if first < 0 or last > SLOTS_PER_DAY:
+        raise ValueError(f"{start_time}-{end_time} is outside the modelled day")
+    return ((1 << max(last - first, 0)) - 1) << first
+
+class Provider:
+    __slots__ = ("doctor_id", "doctor", "location", "first_day", "scheduled", "free", "appointments")
+
+    def __init__(self, doctor_id, doctor, location, first_day):
+        self.doctor_id, self.doctor, self.location = doctor_id, doctor, location
+        self.first_day = first_day
+        self.scheduled = array("Q")
+        self.free = array("Q")
+        self.appointments = {}  # day offset << 6 | first slot of a booked run -> appointment id
+
+    def _offset(self, day, grow=False):
+        off = day - self.first_day
+        if off < 0:
+            if not grow:
+                return None
+            pad = array("Q", bytes(8 * -off))
+            self.scheduled = pad + self.scheduled
+            self.free = pad + self.free
+            self.appointments = {k + (-off << 6): v for k, v in self.appointments.items()}
+            self.first_day, off = day, 0
+        if off >= len(self.scheduled):
+            if not grow:
+                return None
+            pad = array("Q", bytes(8 * (off + 1 - len(self.scheduled))))
+            self.scheduled.extend(pad)
+            self.free.extend(pad)
+        return off
+
+    def booked(self, off):
+        return self.scheduled[off] & ~self.free[off]
+
+    def appointment_at(self, off, slot):
+        """Id of a booked slot: the entry at the start of its run ('' when free or unknown)."""
+        booked = self.booked(off)
+        while slot >= 0 and booked >> slot & 1:
+            appointment_id = self.appointments.get(off << 6 | slot)
+            if appointment_id is not None:
+                return appointment_id
+            slot -= 1
+        return ""
+
+    def nbytes(self):
+        return (sys.getsizeof(self) + self.scheduled.buffer_info()[1] * 8 + self.free.buffer_info()[1] * 8
+                + sys.getsizeof(self.appointments)
+                + sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in self.appointments.items()))
+
+class ScheduleModel:
+
+    def __init__(self):
+        self.providers = []
+        self._by_key = {}   # (doctor, location) -> Provider
+
+    def provider(self, doctor, location, doctor_id="", day=None):
+        p = self._by_key.get((doctor, location))
+        if p is None and day is not None:
+            p = Provider(doctor_id, sys.intern(doctor), sys.intern(location), day)
+            self._by_key[(p.doctor, p.location)] = p
+            self.providers.append(p)
+        return p
+
+    # -- DataFrame adapters ------------------------------------------------------------------
+
+    @classmethod
+    def from_frame(cls, df):
+        return cls().add_frame(df)
+
+    def add_frame(self, df):
+        """Merges schedule rows (the DataFrame layout of doctor_schedules.csv) into the model."""
+        if not len(df):
+            return self
+        doc_codes, doctors = pd.factorize(df["doctor"])
+        loc_codes, locations = pd.factorize(df["location"])
+        pair = doc_codes.astype("int64") * len(locations) + loc_codes
+        prov_codes, pairs = pd.factorize(pair)
+        days = _day_numbers(df["date"]).astype("int64")
+        slots = (_minutes(df["start_time"]).astype("int64") - DAY_START) // SLOT_MINUTES
+        if slots.min() < 0 or slots.max() >= SLOTS_PER_DAY:
+            raise ValueError("schedule has slots outside the modelled day (06:00-22:00)")
+        bits = np.left_shift(np.uint64(1), slots.astype("uint64"))
+        free = (df["slot_status"] == "available").to_numpy()
+        doc_ids = df["doctor_id"].to_numpy(dtype=object) if "doctor_id" in df else None
+
+        order = np.lexsort((days, prov_codes))
+        bounds = np.flatnonzero(np.diff(prov_codes[order])) + 1
+        by_code = [None] * len(pairs)
+        for rows in np.split(order, bounds):
+            code = int(pairs[prov_codes[rows[0]]])
+            doctor, location = str(doctors[code // len(locations)]), str(locations[code % len(locations)])
+            d = days[rows]
+            p = self.provider(doctor, location, str(doc_ids[rows[0]]) if doc_ids is not None else "", int(d[0]))
+            by_code[prov_codes[rows[0]]] = p
+            p._offset(int(d[0]), grow=True)
+            p._offset(int(d[-1]), grow=True)
+            offs = d - p.first_day
+            if p.appointments:  # days added again: their old side-table entries go
+                for off in np.unique(offs).tolist():
+                    for slot in range(SLOTS_PER_DAY):
+                        p.appointments.pop(off << 6 | slot, None)
+            sched = np.frombuffer(p.scheduled, dtype=np.uint64)
+            fr = np.frombuffer(p.free, dtype=np.uint64)
+            np.bitwise_or.at(sched, offs, bits[rows])
+            np.bitwise_and.at(fr, offs, ~bits[rows])  # a re-added slot takes its new status
+            np.bitwise_or.at(fr, offs[free[rows]], bits[rows][free[rows]])
+
+        # side table: one entry where each booked run (same provider, day and id) starts
+        booked = np.flatnonzero(~free)
+        booked = booked[np.lexsort((slots[booked], days[booked], prov_codes[booked]))]
+        ids = df["appointment_id"].to_numpy(dtype=object)[booked]
+        ids = np.where(pd.isna(ids), "", ids).astype(str).astype(object)
+        prov_b, day_b, slot_b = prov_codes[booked], days[booked], slots[booked]
+        starts = np.ones(len(booked), dtype=bool)
+        starts[1:] = ((prov_b[1:] != prov_b[:-1]) | (day_b[1:] != day_b[:-1])
+                      | (slot_b[1:] != slot_b[:-1] + 1) | (ids[1:] != ids[:-1]))
+        for code, day, slot, appointment_id in zip(prov_b[starts].tolist(), day_b[starts].tolist(),
+                                                   slot_b[starts].tolist(), ids[starts].tolist()):
+            p = by_code[code]
+            p.appointments[(day - p.first_day) << 6 | slot] = appointment_id
+        return self
+
+    def to_frame(self):
+        """One 15-minute row per scheduled slot, ordered by provider, date and time."""
+        if not self.providers:
+            return pd.DataFrame(columns=COLUMNS)
+        words = np.concatenate([np.frombuffer(p.scheduled, dtype=np.uint64) for p in self.providers])
+        free_words = np.concatenate([np.frombuffer(p.free, dtype=np.uint64) for p in self.providers])
+        lengths = np.array([len(p.scheduled) for p in self.providers])
+        prov_of_day = np.repeat(np.arange(len(self.providers)), lengths)
+        day_of_word = np.concatenate([np.arange(len(p.scheduled)) + p.first_day for p in self.providers])
+
+        # little-endian bytes so bit i of a word is column i
+        sched_bits = np.unpackbits(words.astype("<u8", copy=False).view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+        free_bits = np.unpackbits(free_words.astype("<u8", copy=False).view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+        word_idx, slot = np.nonzero(sched_bits)
+        prov = prov_of_day[word_idx]
+        day = day_of_word[word_idx]
+
+        uniq_days, day_codes = np.unique(day, return_inverse=True)
+        times = np.array([from_minutes(DAY_START + i * SLOT_MINUTES) for i in range(SLOTS_PER_DAY + 1)], dtype=object)
+        # expand the side table: each booked row takes the id of the entry that starts its run
+        booked = free_bits[word_idx, slot] == 0
+        entry = np.full(len(slot), None, dtype=object)
+        row_start = np.concatenate(([0], np.cumsum(np.bincount(prov, minlength=len(self.providers)))))
+        for k, p in enumerate(self.providers):
+            if p.appointments:
+                rows = np.flatnonzero(booked[row_start[k]:row_start[k + 1]]) + row_start[k]
+                keys = (day[rows] - p.first_day) << 6 | slot[rows]
+                entry[rows] = [p.appointments.get(key) for key in keys.tolist()]
+        has_entry = pd.notna(entry)
+        contiguous = np.zeros(len(slot), dtype=bool)
+        contiguous[1:] = (word_idx[1:] == word_idx[:-1]) & (slot[1:] == slot[:-1] + 1) & booked[:-1]
+        run_start = booked & (has_entry | ~contiguous)
+        run = np.cumsum(run_start) - 1
+        start_ids = np.where(has_entry[run_start], entry[run_start], "")
+        appt = np.where(booked, start_ids[np.maximum(run, 0)] if len(start_ids) else "", "").astype(object)
+        return pd.DataFrame({
+            "doctor_id": np.array([p.doctor_id for p in self.providers], dtype=object)[prov],
+            "doctor": np.array([p.doctor for p in self.providers], dtype=object)[prov],
+            "location": np.array([p.location for p in self.providers], dtype=object)[prov],
+            "date": np.array([_date_str(d) for d in uniq_days], dtype=object)[day_codes],
+            "start_time": times[slot],
+            "end_time": times[slot + 1],
+            "slot_status": np.where(free_bits[word_idx, slot] == 1, "available", "booked").astype(object),
+            "appointment_id": appt,
+        }, columns=COLUMNS)
+
+    def availability_index(self):
+        """AvailabilityIndex (bits from midnight) built from the words, no row scan."""
+        idx = AvailabilityIndex()
+        shift = DAY_START // SLOT_MINUTES
+        for p in self.providers:
+            for off, (s, f) in enumerate(zip(p.scheduled, p.free)):
+                if s:
+                    key = (p.doctor, p.location, _date_str(p.first_day + off))
+                    idx.slots[key] = s << shift
+                    if f:
+                        idx.free[key] = f << shift
+        idx.rebuild_capacity()
+        return idx
+
+    # -- queries and updates -----------------------------------------------------------------
+
+    def _day(self, doctor, location, date_str):
+        p = self._by_key.get((doctor, location))
+        off = p._offset(_day_number(date_str)) if p is not None else None
+        return p, off
+
+    def free_mask(self, doctor, location, date_str):
+        """The day's free bits (bit 0 = DAY_START)."""
+        p, off = self._day(doctor, location, date_str)
+        return p.free[off] if off is not None else 0
+
+    def is_free(self, doctor, location, date_str, start_time, end_time):
+        bits = _slot_bits(start_time, end_time)
+        return bool(bits) and self.free_mask(doctor, location, date_str) & bits == bits
+
+    def book(self, doctor, location, date_str, start_time, end_time, appointment_id):
+        """Marks the window booked when all of it is free; False otherwise."""
+        p, off = self._day(doctor, location, date_str)
+        bits = _slot_bits(start_time, end_time)
+        if off is None or not bits or p.free[off] & bits != bits:
+            return False
+        p.free[off] &= ~bits
+        first, end = (bits & -bits).bit_length() - 1, bits.bit_length()
+        for slot in range(first + 1, end):  # stale entries inside the window
+            p.appointments.pop(off << 6 | slot, None)
+        p.appointments[off << 6 | first] = str(appointment_id)
+        return True
+
+    def release(self, doctor, location, date_str, appointment_id):
+        """Frees every slot of the appointment on that day. Returns how many were released."""
+        p, off = self._day(doctor, location, date_str)
+        if off is None:
+            return 0
+        released = 0
+        for first in range(SLOTS_PER_DAY):
+            if p.appointments.get(off << 6 | first) != appointment_id:
+                continue
+            del p.appointments[off << 6 | first]
+            booked, slot = p.booked(off), first
+            while slot < SLOTS_PER_DAY and booked >> slot & 1 and (slot == first or (off << 6 | slot) not in p.appointments):
+                p.free[off] |= 1 << slot
+                released += 1
+                slot += 1
+        return released
+
+    def windows(self, doctor, location, date_str, minutes_needed=30, limit=10):
+        """Same contract as AvailabilityIndex.windows."""
+        block_size = minutes_needed // SLOT_MINUTES
+        runs = run_starts(self.free_mask(doctor, location, date_str), block_size)
+        out = []
+        while runs and (limit is None or len(out) < limit):
+            low = runs & -runs
+            s = DAY_START + (low.bit_length() - 1) * SLOT_MINUTES
+            out.append((from_minutes(s), from_minutes(s + block_size * SLOT_MINUTES)))
+            runs ^= low
+        return out
+
+    def nbytes(self):
+        """Approximate footprint: provider objects, word arrays, side tables and the shared strings."""
+        strings = {id(s): s for p in self.providers for s in (p.doctor_id, p.doctor, p.location)}
+        return (sys.getsizeof(self.providers) + sys.getsizeof(self._by_key) + sum(p.nbytes() for p in self.providers)
+                + sum(sys.getsizeof(s) for s in strings.values()))
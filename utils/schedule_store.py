@@ -0,0 +1,156 @@
+"""
+Columnar binary schedule snapshot: one file of packed int codes, read with a single np.fromfile.
+
+Layout: 8-byte magic, uint64 header length, JSON header (category tables, row count,
+padded to 64 bytes), then one packed record per 15-minute slot:
+doctor/location codes (int16), day number since 1970-01-01 (int32), start/end minute of
+day (int16), status (int8) and appointment code (int32, -1 = none).
+"""
+import json
+import os
+import struct
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+MAGIC = b"SCHEDv1\0"
+RECORD = np.dtype([
+    ("doctor", "<i2"), ("location", "<i2"), ("day", "<i4"),
+    ("start", "<i2"), ("end", "<i2"), ("status", "i1"), ("appt", "<i4"),
+])
+STATUSES = ["available", "booked"]
+EPOCH = date(1970, 1, 1)
+
+def _day_numbers(dates):
+    codes, uniq = pd.factorize(dates)  # parse each distinct date once
+    days = [(date.fromisoformat(str(d)[:10]) - EPOCH).days for d in uniq]
+    return np.asarray(days, dtype="int32")[codes]
+
+def _minutes(times):
+    codes, uniq = pd.factorize(times)
+    mins = [int(h) * 60 + int(m) for h, m in (str(t).split(":")[:2] for t in uniq)]
+    return np.asarray(mins, dtype="int16")[codes]
+
+def write_store(df, path):
+    """Encodes a schedule DataFrame into the binary format (temp file + atomic rename)."""
+    doc_codes, doctors = pd.factorize(df["doctor"])
+    loc_codes, locations = pd.factorize(df["location"])
+    appt = df["appointment_id"].where(df["appointment_id"].notna() & (df["appointment_id"].astype(str) != ""))
+    appt_codes, appts = pd.factorize(appt)  # NaN -> -1
+    doc_ids = df.groupby(doc_codes, sort=True)["doctor_id"].first().tolist() if "doctor_id" in df else []
+    rec = np.empty(len(df), dtype=RECORD)
+    rec["doctor"] = doc_codes
+    rec["location"] = loc_codes
+    rec["day"] = _day_numbers(df["date"])
+    rec["start"] = _minutes(df["start_time"])
+    rec["end"] = _minutes(df["end_time"])
+    rec["status"] = (df["slot_status"] == "booked").to_numpy("int8")
+    rec["appt"] = appt_codes
+    write_records(path, {
+        "rows": len(df), "doctors": list(map(str, doctors)), "doctor_ids": doc_ids,
+        "locations": list(map(str, locations)), "appointments": list(map(str, appts)),
+    }, rec)
+
+def write_records(path, header, rec):
+    """
+    Writes already-encoded RECORD rows (one array or an iterable of chunks totalling header["rows"])
+    with their category tables (temp file + atomic rename).
+    """
+    path = Path(path)
+    header = json.dumps(header).encode()
+    pad = -(len(MAGIC) + 8 + len(header)) % 64
+    header += b" " * pad
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(MAGIC + struct.pack("<Q", len(header)) + header)
+        for part in [rec] if isinstance(rec, np.ndarray) else rec:
+            f.write(part.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def _read_header(f, path):
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError(f"{path} is not a schedule store")
+    (n,) = struct.unpack("<Q", f.read(8))
+    return json.loads(f.read(n)), len(MAGIC) + 8 + n
+
+def open_store(path):
+    """(header, records): the packed records in one read, nothing decoded yet."""
+    with open(path, "rb") as f:
+        header, _ = _read_header(f, path)
+        return header, np.fromfile(f, dtype=RECORD, count=header["rows"])
+
+def _categorical(codes, values):
+    # small-range ints (days, minutes): dense lookup table instead of a sort-based unique
+    if not len(codes):
+        return pd.Categorical([])
+    lo = int(codes.min())
+    shifted = codes.astype("int32") - lo
+    present = np.flatnonzero(np.bincount(shifted))
+    lookup = np.full(int(shifted.max()) + 1, -1, dtype="int32")
+    lookup[present] = np.arange(len(present), dtype="int32")
+    return pd.Categorical.from_codes(lookup[shifted], [values(int(u) + lo) for u in present])
+
+def _tables(header):
+    doc_ids = header.get("doctor_ids") or [""] * len(header["doctors"])
+    appts = np.array(header["appointments"] + [np.nan], dtype=object)  # code -1 -> NaN
+    return pd.Categorical(doc_ids), appts
+
+def _decode(header, rec, tables=None):
+    doc_ids, appts = tables or _tables(header)
+    return pd.DataFrame({
+        "doctor_id": doc_ids[rec["doctor"]],
+        "doctor": pd.Categorical.from_codes(rec["doctor"], header["doctors"]),
+        "location": pd.Categorical.from_codes(rec["location"], header["locations"]),
+        "date": _categorical(rec["day"], lambda d: (EPOCH + timedelta(days=int(d))).isoformat()),
+        "start_time": _categorical(rec["start"], lambda m: f"{m // 60:02d}:{m % 60:02d}"),
+        "end_time": _categorical(rec["end"], lambda m: f"{m // 60:02d}:{m % 60:02d}"),
+        "slot_status": pd.Categorical.from_codes(rec["status"], STATUSES),
+        "appointment_id": appts[rec["appt"]],
+    })
+
+def read_store(path):
+    """
+    Decodes the store into the usual schedule DataFrame (string columns as categoricals).
+    The whole frame is materialized; iter_store keeps peak memory to one chunk.
+    """
+    return _decode(*open_store(path))
+
+def iter_store(path, chunk_rows=500_000, start=None, end=None):
+    """
+    Decodes the store chunk_rows records at a time, optionally only dates in [start, end]
+    (ISO strings). Records are read rather than mapped, so only one chunk is ever resident.
+    """
+    lo = (date.fromisoformat(start) - EPOCH).days if start else None
+    hi = (date.fromisoformat(end) - EPOCH).days if end else None
+    with open(path, "rb") as f:
+        header, _ = _read_header(f, path)
+        tables = _tables(header)
+        while True:
+            part = np.fromfile(f, dtype=RECORD, count=chunk_rows)
+            if not len(part):
+                return
+            if lo is not None or hi is not None:
+                days = part["day"]
+                keep = np.ones(len(part), dtype=bool)
+                if lo is not None:
+                    keep &= days >= lo
+                if hi is not None:
+                    keep &= days <= hi
+                part = part[keep]
+                if not len(part):
+                    continue
+            yield _decode(header, part, tables)
+
+def convert(src, dest):
+    """One-shot conversion of an existing doctor_schedules.csv / .xlsx into the binary store."""
+    src = Path(src)
+    if src.suffix == ".xlsx":
+        df = pd.read_excel(src, sheet_name="schedules", dtype=str)
+    else:
+        df = pd.read_csv(src, dtype=str)
+    write_store(df, dest)
+    return len(df)
@@ -1,14 +1,29 @@
 
+import threading
+import weakref
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 
+import numpy as np
+
+from utils.locks import file_lock
+from utils.slot_index import AvailabilityIndex, to_minutes
+from utils.telemetry import instrument
+
 def _parse_dt(datestr, timestr):
     return datetime.strptime(datestr + " " + timestr, "%Y-%m-%d %H:%M")
 
-def find_contiguous_slots(df_sched, doctor, location, date_str, minutes_needed=30):
+def build_index(df_sched):
+    """Builds the availability index once; pass it to find/reserve to skip frame scans."""
+    return AvailabilityIndex.from_schedule(df_sched)
+
+def find_contiguous_slots(df_sched, doctor, location, date_str, minutes_needed=30, index=None):
     """
     Returns a list of candidate (start_time, end_time) windows that can accommodate minutes_needed
-    using 15-minute base slots.
+    using 15-minute base slots. With an AvailabilityIndex the answer comes from the day's bitmap.
     """
+    if index is not None:
+        return index.windows(doctor, location, date_str, minutes_needed, limit=10)
     block_size = minutes_needed // 15
     day = df_sched[(df_sched["doctor"]==doctor) & (df_sched["location"]==location) & (df_sched["date"]==date_str)]
     day = day[day["slot_status"]=="available"].sort_values(["start_time"])
@@ -27,18 +42,205 @@ def find_contiguous_slots(df_sched, doctor, location, date_str, minutes_needed=3
             candidates.append((s, e))
     return candidates[:10]  # top 10 options
 
-def reserve_slots(df_sched, doctor, location, date_str, start_time, end_time, appointment_id):
+def _minutes(series):
+    """'HH:MM' column -> int minute-of-day array."""
+    return series.map(to_minutes).to_numpy(dtype="int32")
+
+_row_maps = {}  # id(frame) -> (rows, day positions, start minutes, end minutes); dropped with the frame
+
+def _day_rows(df_sched):
+    """
+    ((doctor, location, date) -> row positions, start minutes, end minutes) for a schedule frame,
+    built once per frame: bookings only rewrite the status columns, so a lookup stays valid until
+    rows are added or removed.
+    """
+    key = id(df_sched)
+    cached = _row_maps.get(key)
+    if cached is not None and cached[0] == len(df_sched):
+        return cached[1:]
+    days = df_sched.groupby(["doctor", "location", "date"], sort=False, observed=True).indices
+    if cached is None:
+        weakref.finalize(df_sched, _row_maps.pop, key, None)
+    _row_maps[key] = cached = (len(df_sched), days, _minutes(df_sched["start_time"]), _minutes(df_sched["end_time"]))
+    return cached[1:]
+
+def _text_columns(df_sched):
+    # Status/appointment columns are rewritten in place on every booking: keep them object dtype.
+    # (CSVs with an all-empty appointment_id load as float NaN; arrow strings copy on each write.)
+    for col in ("slot_status", "appointment_id"):
+        if df_sched[col].dtype != object:
+            df_sched[col] = df_sched[col].astype(object)
+
+def _set_booked(df_sched, positions, appointment_ids):
+    _text_columns(df_sched)
+    cols = [df_sched.columns.get_loc("slot_status"), df_sched.columns.get_loc("appointment_id")]
+    df_sched.iloc[positions, cols[0]] = "booked"
+    df_sched.iloc[positions, cols[1]] = appointment_ids
+
+def reserve_slots(df_sched, doctor, location, date_str, start_time, end_time, appointment_id, index=None):
     """Marks the relevant 15-minute slots as 'booked' and attaches appointment_id."""
-    # mark all rows from start_time to end_time as booked
-    mask = (
-        (df_sched["doctor"]==doctor) &
-        (df_sched["location"]==location) &
-        (df_sched["date"]==date_str)
-    )
-    # iterate and mark within time window
-    for idx, row in df_sched[mask].iterrows():
-        # row's slot is [start_time, row["end_time"]) piecewise
-        if not (row["end_time"] <= start_time or row["start_time"] >= end_time):
-            df_sched.at[idx, "slot_status"] = "booked"
-            df_sched.at[idx, "appointment_id"] = appointment_id
+    days, starts, ends = _day_rows(df_sched)
+    day = days.get((doctor, location, date_str))
+    if day is not None:
+        # a row's slot [start, end) overlaps the window unless it ends before it or starts after it
+        hit = day[(ends[day] > to_minutes(start_time)) & (starts[day] < to_minutes(end_time))]
+        if len(hit):
+            _set_booked(df_sched, hit, appointment_id)
+    if index is not None:
+        index.mark_booked(doctor, location, date_str, start_time, end_time)
+    return df_sched
+
+def reserve_many(df_sched, bookings, index=None):
+    """
+    Books a batch of appointments in one pass over the schedule.
+    bookings: iterable of dicts with doctor, location, date, start_time, end_time, appointment_id.
+    Returns one result dict per booking with status 'booked', 'conflict' (a slot is already
+    taken, possibly by an earlier booking in the same batch) or 'unavailable' (the window is
+    not fully covered by scheduled slots). Nothing is written for non-booked entries.
+    """
+    days, starts, ends = _day_rows(df_sched)
+    free = (df_sched["slot_status"] == "available").to_numpy(copy=True)
+    rows, ids, results = [], [], []
+    for b in bookings:
+        s, e = to_minutes(b["start_time"]), to_minutes(b["end_time"])
+        pos = days.get((b["doctor"], b["location"], b["date"]))
+        status = "unavailable"
+        if pos is not None:
+            pos = pos[(ends[pos] > s) & (starts[pos] < e)]
+            covered = int((ends[pos].clip(max=e) - starts[pos].clip(min=s)).sum()) if len(pos) else 0
+            if covered < e - s:
+                status = "unavailable"
+            elif not free[pos].all():
+                status = "conflict"
+            else:
+                status = "booked"
+                free[pos] = False
+                rows.append(pos)
+                ids.extend([b["appointment_id"]] * len(pos))
+                if index is not None:
+                    index.mark_booked(b["doctor"], b["location"], b["date"], b["start_time"], b["end_time"])
+        results.append({"appointment_id": b["appointment_id"], "status": status})
+    if rows:
+        _set_booked(df_sched, np.concatenate(rows), ids)
+    return results
+
+def release_slots(df_sched, appointment_id, index=None, doctor=None, location=None, date_str=None):
+    """
+    Returns every slot held by appointment_id to 'available' (cancellation), only on that
+    doctor/location/date when given.
+    """
+    if None not in (doctor, location, date_str):
+        day = _day_rows(df_sched)[0].get((doctor, location, date_str), np.empty(0, dtype=np.intp))
+        hit = day[df_sched["appointment_id"].to_numpy()[day] == appointment_id]
+    else:
+        mask = df_sched["appointment_id"] == appointment_id
+        for col, value in (("doctor", doctor), ("location", location), ("date", date_str)):
+            if value is not None:
+                mask &= df_sched[col] == value
+        hit = np.flatnonzero(mask.to_numpy())
+    if len(hit):
+        _text_columns(df_sched)
+        cols = [df_sched.columns.get_loc("slot_status"), df_sched.columns.get_loc("appointment_id")]
+        if index is not None:
+            rows = df_sched.iloc[hit]
+            for doctor, location, date_str, st, et in zip(rows["doctor"], rows["location"], rows["date"],
+                                                          rows["start_time"], rows["end_time"]):
+                index.mark_available(doctor, location, date_str, st, et)
+        df_sched.iloc[hit, cols[0]] = "available"
+        df_sched.iloc[hit, cols[1]] = ""
     return df_sched
+
+class SlotLedger:
+    """
+    Optimistic, transactional booking over a schedule frame and its AvailabilityIndex.
+
+    Every (doctor, date) day carries a version stamp that is bumped by each commit touching it.
+    A caller reads the stamp, validates the window, then commits with that stamp; the commit is
+    a compare-and-set that returns 'stale' if the day changed in between (book() retries).
+    Commits are serialized by an in-process lock (shareable with the owner via `lock`) and, when
+    lock_path is given, an inter-process file lock. `refresh(ledger)` runs inside the locks first so another process's bookings can
+    be applied (ledger.apply) before validating; `persist(event)` makes the commit durable (returning False
+    when the store itself rejects the booking).
+    """
+
+    def __init__(self, df_sched, index, lock_path=None, persist=None, refresh=None, lock=None):
+        self.df = df_sched
+        self.index = index
+        self.lock_path = lock_path
+        self.persist = persist
+        self.refresh = refresh
+        self.versions = {}
+        self._lock = lock or threading.RLock()
+
+    def reset(self, df_sched, index):
+        """Swaps in a freshly loaded schedule; every stamp is bumped so in-flight commits go stale."""
+        self.df, self.index = df_sched, index
+        self.versions = {k: v + 1 for k, v in self.versions.items()}
+
+    def version(self, doctor, date_str):
+        return self.versions.get((doctor, date_str), 0)
+
+    @contextmanager
+    def _critical(self):
+        with self._lock:
+            if self.lock_path is None:
+                yield
+            else:
+                with file_lock(self.lock_path):
+                    yield
+
+    def apply(self, event):
+        """Applies an already-committed book/cancel event (e.g. from another process's journal)."""
+        if event["op"] == "book":
+            reserve_slots(self.df, event["doctor"], event["location"], event["date"],
+                          event["start_time"], event["end_time"], event["appointment_id"], index=self.index)
+        elif event["op"] == "cancel":
+            release_slots(self.df, event["appointment_id"], index=self.index,
+                          doctor=event["doctor"], location=event["location"], date_str=event["date"])
+        key = (event["doctor"], event["date"])
+        self.versions[key] = self.versions.get(key, 0) + 1
+
+    def commit(self, doctor, location, date_str, start_time, end_time, appointment_id, expected_version):
+        """Compare-and-set booking. Returns (status, version); status is 'booked', 'stale' or 'conflict'."""
+        key = (doctor, date_str)
+        with self._critical():
+            if self.refresh is not None:
+                self.refresh(self)
+            current = self.versions.get(key, 0)
+            if current != expected_version:
+                return "stale", current
+            if not self.index.is_free(doctor, location, date_str, start_time, end_time):
+                return "conflict", current
+            event = {"op": "book", "doctor": doctor, "location": location, "date": date_str,
+                     "start_time": start_time, "end_time": end_time, "appointment_id": appointment_id}
+            if self.persist is not None and self.persist(event) is False:
+                return "conflict", current  # the store's own guard refused it
+            self.apply(event)
+            return "booked", self.versions[key]
+
+    def book(self, doctor, location, date_str, start_time, end_time, appointment_id, retries=5):
+        """Read-validate-commit loop. Returns 'booked' or 'conflict'."""
+        for _ in range(retries + 1):
+            if self.refresh is not None:
+                with self._critical():
+                    self.refresh(self)
+            seen = self.version(doctor, date_str)
+            if not self.index.is_free(doctor, location, date_str, start_time, end_time):
+                return "conflict"
+            status, _ = self.commit(doctor, location, date_str, start_time, end_time, appointment_id, seen)
+            if status != "stale":
+                return status
+        return "conflict"
+
+    def cancel(self, doctor, location, date_str, appointment_id):
+        with self._critical():
+            if self.refresh is not None:
+                self.refresh(self)
+            event = {"op": "cancel", "doctor": doctor, "location": location, "date": date_str,
+                     "appointment_id": appointment_id}
+            if self.persist is not None:
+                self.persist(event)
+            self.apply(event)
+
+# SlotLedger.version is one dict lookup; book()'s span covers it
+instrument(__name__, skip=("SlotLedger.version",))
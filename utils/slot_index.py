@@ -0,0 +1,160 @@
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from functools import lru_cache
+
+SLOT_MINUTES = 15
+
+@lru_cache(maxsize=4096)
+def to_minutes(hhmm):
+    """'HH:MM' -> minutes since midnight."""
+    h, m = str(hhmm).split(":")[:2]
+    return int(h) * 60 + int(m)
+
+def from_minutes(minutes):
+    """minutes since midnight -> 'HH:MM'."""
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+def _span_mask(start_min, end_min):
+    """Bitmask covering every 15-minute slot that overlaps [start_min, end_min)."""
+    first = start_min // SLOT_MINUTES
+    last = -(-end_min // SLOT_MINUTES)  # ceil
+    if last <= first:
+        return 0
+    return ((1 << (last - first)) - 1) << first
+
+def _iter_rows(df_sched):
+    cols = ("doctor", "location", "date", "start_time", "end_time", "slot_status")
+    if isinstance(df_sched, list):
+        return (tuple(r[c] for c in cols) for r in df_sched)
+    return zip(*(df_sched[c].tolist() for c in cols))
+
+def run_starts(mask, block_size):
+    """Bitmask of slot positions where `block_size` consecutive free slots begin."""
+    if block_size <= 0:
+        return 0
+    runs = mask
+    for j in range(1, block_size):
+        runs &= mask >> j
+        if not runs:
+            break
+    return runs
+
+def longest_run(mask):
+    """Length (in slots) of the longest run of set bits."""
+    n = 0
+    while mask:
+        mask &= mask >> 1
+        n += 1
+    return n
+
+class AvailabilityIndex:
+    """
+    Free-slot bitmaps keyed by (doctor, location, date).
+    Bit i of a day's mask is set when the 15-minute slot starting at i*15 minutes
+    past midnight is available, so a contiguous-window query is a few shifts and
+    ANDs over one integer instead of a scan of the schedule frame.
+
+    capacity is the materialized per-day rollup (scheduled slots, free slots, longest free run),
+    rebuilt for a day whenever mark_booked / mark_available change its bitmap, so capacity
+    questions and "can this day fit the window at all" are dict lookups.
+    """
+
+    def __init__(self):
+        self.free = defaultdict(int)     # (doctor, location, date) -> free bitmask
+        self.slots = defaultdict(int)    # (doctor, location, date) -> all scheduled slots
+        self.capacity = {}               # (doctor, location, date) -> (scheduled, free, longest free run) in slots
+        self._days = None
+
+    @classmethod
+    def from_schedule(cls, df_sched):
+        idx = cls()
+        for doctor, location, date_str, st, et, status in _iter_rows(df_sched):
+            bits = _span_mask(to_minutes(st), to_minutes(et))
+            key = (doctor, location, date_str)
+            idx.slots[key] |= bits
+            if status == "available":
+                idx.free[key] |= bits
+        idx.rebuild_capacity()
+        return idx
+
+    def rebuild_capacity(self):
+        """Recomputes the whole rollup (after filling slots/free directly)."""
+        for key in self.slots:
+            self._rollup(key)
+
+    def _rollup(self, key):
+        free = self.free.get(key, 0)
+        self.capacity[key] = (self.slots[key].bit_count(), free.bit_count(), longest_run(free))
+
+    def days_by_provider(self):
+        """(doctor, location) -> sorted dates that have scheduled slots. Built once: bookings never add days."""
+        if self._days is None:
+            days = defaultdict(list)
+            for doctor, location, date_str in self.slots:
+                days[(doctor, location)].append(date_str)
+            for v in days.values():
+                v.sort()
+            self._days = dict(days)
+        return self._days
+
+    def free_mask(self, doctor, location, date_str):
+        return self.free.get((doctor, location, date_str), 0)
+
+    def is_free(self, doctor, location, date_str, start_time, end_time):
+        """True when every 15-minute slot of the window is scheduled and available."""
+        bits = _span_mask(to_minutes(start_time), to_minutes(end_time))
+        return bool(bits) and self.free_mask(doctor, location, date_str) & bits == bits
+
+    def mark_booked(self, doctor, location, date_str, start_time, end_time):
+        key = (doctor, location, date_str)
+        if key in self.free:
+            self.free[key] &= ~_span_mask(to_minutes(start_time), to_minutes(end_time))
+            self._rollup(key)
+
+    def mark_available(self, doctor, location, date_str, start_time, end_time):
+        key = (doctor, location, date_str)
+        bits = _span_mask(to_minutes(start_time), to_minutes(end_time)) & self.slots.get(key, 0)
+        if bits:
+            self.free[key] |= bits
+            self._rollup(key)
+
+    def windows(self, doctor, location, date_str, minutes_needed=30, limit=10):
+        """Same contract as scheduling.find_contiguous_slots, answered from the bitmap."""
+        block_size = minutes_needed // SLOT_MINUTES
+        runs = run_starts(self.free_mask(doctor, location, date_str), block_size)
+        out = []
+        while runs and (limit is None or len(out) < limit):
+            low = runs & -runs
+            i = low.bit_length() - 1
+            s = i * SLOT_MINUTES
+            out.append((from_minutes(s), from_minutes(s + block_size * SLOT_MINUTES)))
+            runs ^= low
+        return out
+
+    def fits(self, doctor, location, date_str, minutes_needed):
+        """O(1): whether the day has any free run of minutes_needed (rollup lookup, no bitmap work)."""
+        cap = self.capacity.get((doctor, location, date_str))
+        return cap is not None and cap[2] * SLOT_MINUTES >= minutes_needed
+
+    def day_capacity(self, doctor, location, date_str):
+        """Scheduled, free and longest free-run minutes of one day, plus utilization."""
+        scheduled, free, longest = self.capacity.get((doctor, location, date_str), (0, 0, 0))
+        return {
+            "doctor": doctor, "location": location, "date": date_str,
+            "scheduled_minutes": scheduled * SLOT_MINUTES, "free_minutes": free * SLOT_MINUTES,
+            "longest_free_minutes": longest * SLOT_MINUTES,
+            "utilization": round(1 - free / scheduled, 3) if scheduled else 0.0,
+        }
+
+    def capacity_rows(self, start_date=None, end_date=None, doctors=None, locations=None):
+        """day_capacity for every scheduled day in [start_date, end_date] (ISO, inclusive), by doctor/location/date."""
+        doctors = set(doctors) if doctors is not None else None
+        locations = set(locations) if locations is not None else None
+        rows = []
+        for (doctor, location), days in sorted(self.days_by_provider().items()):
+            if (doctors is not None and doctor not in doctors) or (locations is not None and location not in locations):
+                continue
+            lo = bisect_left(days, start_date) if start_date else 0
+            hi = bisect_right(days, end_date) if end_date else len(days)
+            rows.extend(self.day_capacity(doctor, location, d) for d in days[lo:hi])
+        return rows
@@ -0,0 +1,108 @@
+"""
+Ranked slot search across a date range and any number of doctors / locations.
+
+Each (doctor, location) stream yields its free windows day by day in time order straight from
+the AvailabilityIndex bitmaps (days whose longest free run is too short are skipped from the
+capacity rollup), and heapq.merge walks all streams in global time order. A window's
+score is its start (minutes after start_date's midnight) plus penalties for a non-preferred doctor
+or location and for how booked the doctor's day already is. Penalties are never negative, so the
+walk stops once the next window starts after the n-th best score found so far.
+"""
+import heapq
+from bisect import bisect_left, bisect_right
+from datetime import date
+from functools import lru_cache
+
+from utils.slot_index import SLOT_MINUTES, from_minutes, run_starts, to_minutes
+from utils.telemetry import instrument
+
+DAY_MINUTES = 24 * 60
+PREFERENCE_PENALTY = DAY_MINUTES   # another doctor/location ranks like the preferred one a day later
+LOAD_PENALTY = 8 * 60              # a nearly full day ranks up to 8 hours behind an empty one
+
+@lru_cache(maxsize=4096)
+def _ordinal(date_str):
+    return date.fromisoformat(date_str).toordinal()
+
+def _band(earliest, latest):
+    """Bitmask of slots inside [earliest, latest) (HH:MM or None)."""
+    first = to_minutes(earliest) // SLOT_MINUTES if earliest else 0
+    last = to_minutes(latest) // SLOT_MINUTES if latest else DAY_MINUTES // SLOT_MINUTES
+    return ((1 << max(last - first, 0)) - 1) << first
+
+def _stream(index, doctor, location, days, block, band, origin):
+    capacity = index.capacity
+    for date_str in days:
+        key = (doctor, location, date_str)
+        scheduled, free_slots, longest = capacity.get(key, (0, 0, 0))
+        if longest < block:
+            continue  # no free run long enough anywhere in the day: skipped without touching its bitmap
+        runs = run_starts(index.free.get(key, 0) & band, block)
+        if not runs:
+            continue
+        load = 1 - free_slots / scheduled
+        base = (_ordinal(date_str) - origin) * DAY_MINUTES
+        while runs:
+            low = runs & -runs
+            i = low.bit_length() - 1
+            yield base + i * SLOT_MINUTES, doctor, location, date_str, i, load
+            runs ^= low
+
+def search_slots(index, start_date, end_date=None, minutes_needed=30, n=10, doctors=None, locations=None,
+                 specialty=None, specialties=None, prefer_doctor=None, prefer_location=None,
+                 earliest=None, latest=None):
+    """
+    Best n windows of minutes_needed between start_date and end_date (inclusive ISO dates) across
+    every doctor/location, unless narrowed by doctors, locations or specialty (with specialties
+    mapping doctor -> specialty). earliest/latest ('HH:MM') bound the time of day. Returns dicts
+    sorted by score, earliest first among equal scores.
+    """
+    end_date = end_date or start_date
+    block = max(minutes_needed // SLOT_MINUTES, 1)
+    band = _band(earliest, latest)
+    origin = _ordinal(start_date)
+    doctors = set(doctors) if doctors is not None else None
+    locations = set(locations) if locations is not None else None
+
+    streams = []
+    for (doctor, location), days in index.days_by_provider().items():
+        if doctors is not None and doctor not in doctors:
+            continue
+        if locations is not None and location not in locations:
+            continue
+        if specialty is not None and (specialties or {}).get(doctor) != specialty:
+            continue
+        days = days[bisect_left(days, start_date):bisect_right(days, end_date)]
+        if days:
+            streams.append(_stream(index, doctor, location, days, block, band, origin))
+
+    best = []  # max-heap of the n best so far: (-score, -t, seq, window)
+    for seq, (t, doctor, location, date_str, i, load) in enumerate(heapq.merge(*streams)):
+        if len(best) == n and t >= -best[0][0]:
+            break  # every later window scores at least its start time
+        score = t + LOAD_PENALTY * load
+        if prefer_doctor and doctor != prefer_doctor:
+            score += PREFERENCE_PENALTY
+        if prefer_location and location != prefer_location:
+            score += PREFERENCE_PENALTY
+        item = (-score, -t, -seq, (doctor, location, date_str, i, load, score))
+        if len(best) < n:
+            heapq.heappush(best, item)
+        elif item > best[0]:
+            heapq.heapreplace(best, item)
+
+    out = []
+    for *_, (doctor, location, date_str, i, load, score) in sorted(best, reverse=True):
+        s = i * SLOT_MINUTES
+        out.append({
+            "doctor": doctor,
+            "location": location,
+            "date": date_str,
+            "start_time": from_minutes(s),
+            "end_time": from_minutes(s + block * SLOT_MINUTES),
+            "score": round(score, 1),
+            "load": round(load, 2),
+        })
+    return out
+
+instrument(__name__)
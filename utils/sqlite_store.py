@@ -0,0 +1,333 @@
+"""
+SQLite schedule and patient store (SCHEDULE_BACKEND=sqlite, one file: data/scheduling.db).
+
+Tables: doctors (doctor_id -> name), slots (one row per slot, primary key
+(doctor_id, date, start_minute)), bookings (one row per booked slot, same primary key plus an
+index on appointment_id), patients (the patients.csv columns plus normalized name keys,
+indexed with dob) and events (book/cancel notifications by increasing id; the journal's role,
+so other processes can catch up).
+
+A booking is a single INSERT ... SELECT of the window's slots into bookings: the primary key
+rejects the whole statement when any slot is already taken, and a window not fully covered by
+slots selects nothing, so a partial booking is never written.
+
+The database runs in WAL mode (readers never block the writer) with synchronous=FULL, i.e. a
+commit is on disk like a journal append. Automatic checkpoints are off: bulk writes and
+compaction checkpoint explicitly, so the main file changes exactly when the journal-based
+backends would rewrite their snapshot.
+"""
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from utils.patient_index import _normalize_series, normalize_name
+from utils.schedule_store import _minutes
+from utils.slot_index import to_minutes
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS doctors (
+    doctor_id TEXT PRIMARY KEY,
+    doctor TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS doctors_name ON doctors (doctor);
+CREATE TABLE IF NOT EXISTS slots (
+    doctor_id TEXT NOT NULL,
+    date TEXT NOT NULL,
+    start_minute INTEGER NOT NULL,
+    end_minute INTEGER NOT NULL,
+    location TEXT NOT NULL,
+    PRIMARY KEY (doctor_id, date, start_minute)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS bookings (
+    doctor_id TEXT NOT NULL,
+    date TEXT NOT NULL,
+    start_minute INTEGER NOT NULL,
+    appointment_id TEXT NOT NULL,
+    PRIMARY KEY (doctor_id, date, start_minute)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS bookings_appointment ON bookings (appointment_id);
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    event TEXT NOT NULL
+);
+"""
+COLUMNS = ["doctor_id", "doctor", "location", "date", "start_time", "end_time", "slot_status", "appointment_id"]
+NAME_KEYS = ["first_key", "last_key"]
+PATIENT_COLUMNS = ["patient_id", "first_name", "last_name", "dob", "email", "phone", "preferred_doctor", "location",
+                   "insurance_carrier", "insurance_member_id", "insurance_group_id", "last_visit_date", "is_returning"]
+TIMES = np.array([f"{m // 60:02d}:{m % 60:02d}" for m in range(24 * 60 + 1)], dtype=object)
+
+_SELECT = """
+SELECT s.doctor_id, d.doctor, s.location, s.date, s.start_minute, s.end_minute, b.appointment_id
+FROM slots s JOIN doctors d ON d.doctor_id = s.doctor_id
+LEFT JOIN bookings b ON b.doctor_id = s.doctor_id AND b.date = s.date AND b.start_minute = s.start_minute
+"""
+_DAY = """
+SELECT s.start_minute, s.end_minute, b.appointment_id IS NOT NULL
+FROM doctors d JOIN slots s ON s.doctor_id = d.doctor_id
+LEFT JOIN bookings b ON b.doctor_id = s.doctor_id AND b.date = s.date AND b.start_minute = s.start_minute
+WHERE d.doctor = ? AND s.location = ? AND s.date = ?
+ORDER BY s.start_minute
+"""
+# every slot overlapping [start, end), and only if together they cover the whole window
+_BOOK = """
+INSERT INTO bookings (doctor_id, date, start_minute, appointment_id)
+SELECT s.doctor_id, s.date, s.start_minute, :appointment_id
+FROM doctors d JOIN slots s ON s.doctor_id = d.doctor_id
+WHERE d.doctor = :doctor AND s.location = :location AND s.date = :date
+  AND s.start_minute < :end AND s.end_minute > :start
+  AND (SELECT sum(min(c.end_minute, :end) - max(c.start_minute, :start)) FROM slots c
+       WHERE c.doctor_id = d.doctor_id AND c.date = :date AND c.location = :location
+         AND c.start_minute < :end AND c.end_minute > :start) = :end - :start
+"""
+# the appointment's slots on that doctor/location/date only
+_CANCEL = """
+DELETE FROM bookings
+WHERE appointment_id = :appointment_id AND date = :date
+  AND doctor_id IN (SELECT doctor_id FROM doctors WHERE doctor = :doctor)
+  AND start_minute IN (SELECT s.start_minute FROM slots s
+                       WHERE s.doctor_id = bookings.doctor_id AND s.date = :date AND s.location = :location)
+"""
+
+_local = threading.local()
+
+def connect(path):
+    """This thread's connection to the database at path (created with the schema on first use)."""
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    key = str(path)
+    conn = conns.get(key)
+    if conn is None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(key, isolation_level=None, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=FULL")
+        conn.execute("PRAGMA wal_autocheckpoint=0")
+        conn.executescript(SCHEMA)
+        conns[key] = conn
+    return conn
+
+def close(path):
+    conn = getattr(_local, "conns", {}).pop(str(path), None)
+    if conn is not None:
+        conn.close()
+
+@contextmanager
+def _transaction(conn):
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+def checkpoint(conn):
+    """Copies the WAL into the main file and truncates it."""
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+def _clear_events(conn):
+    conn.execute("DELETE FROM events")
+    conn.execute("DELETE FROM sqlite_sequence WHERE name = 'events'")  # ids restart: readers see a reset
+
+# -- schedule ------------------------------------------------------------------------------
+
+def write_schedule(conn, df):
+    """Replaces the whole schedule (slots and bookings) with df and clears the events."""
+    doc_codes, _ = pd.factorize(df["doctor_id"])
+    doctors = df.groupby(doc_codes, sort=True)[["doctor_id", "doctor"]].first()
+    dates = df["date"].astype(str).str[:10]
+    starts = _minutes(df["start_time"]).tolist()
+    ends = _minutes(df["end_time"]).tolist()
+    ids = df["doctor_id"].astype(str).tolist()
+    booked = np.flatnonzero((df["slot_status"] == "booked").to_numpy())
+    appts = df["appointment_id"].fillna("").astype(str).to_numpy()[booked].tolist()
+    dates_l = dates.tolist()
+    with _transaction(conn):
+        for table in ("bookings", "slots", "doctors"):
+            conn.execute(f"DELETE FROM {table}")
+        _clear_events(conn)
+        conn.executemany("INSERT INTO doctors VALUES (?, ?)", doctors.astype(str).itertuples(index=False, name=None))
+        conn.executemany("INSERT INTO slots VALUES (?, ?, ?, ?, ?)",
+                         zip(ids, dates_l, starts, ends, df["location"].astype(str).tolist()))
+        conn.executemany("INSERT INTO bookings VALUES (?, ?, ?, ?)",
+                         ((ids[i], dates_l[i], starts[i], a) for i, a in zip(booked.tolist(), appts)))
+    checkpoint(conn)
+
+def _frame(rows):
+    raw = pd.DataFrame.from_records(rows, columns=["doctor_id", "doctor", "location", "date", "start", "end", "appt"])
+    appt = raw["appt"].to_numpy(dtype=object)
+    booked = pd.notna(appt)
+    return pd.DataFrame({
+        "doctor_id": raw["doctor_id"], "doctor": raw["doctor"], "location": raw["location"], "date": raw["date"],
+        "start_time": TIMES[raw["start"].to_numpy()], "end_time": TIMES[raw["end"].to_numpy()],
+        "slot_status": np.where(booked, "booked", "available").astype(object),
+        "appointment_id": np.where(booked, appt, ""),
+    })
+
+def _where(start, end):
+    clauses, params = [], []
+    if start:
+        clauses.append("s.date >= ?")
+        params.append(start)
+    if end:
+        clauses.append("s.date <= ?")
+        params.append(end)
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+def read_schedule(conn, start=None, end=None):
+    """The usual schedule DataFrame (dates in [start, end] when given), bookings joined in."""
+    where, params = _where(start, end)
+    return _frame(conn.execute(_SELECT + where + " ORDER BY s.doctor_id, s.date, s.start_minute", params).fetchall())
+
+def iter_schedule(path, chunk_rows=500_000, start=None, end=None):
+    """read_schedule chunk_rows rows at a time, on a connection of its own."""
+    conn = sqlite3.connect(str(path))
+    try:
+        where, params = _where(start, end)
+        cur = conn.execute(_SELECT + where + " ORDER BY s.doctor_id, s.date, s.start_minute", params)
+        while True:
+            rows = cur.fetchmany(chunk_rows)
+            if not rows:
+                return
+            yield _frame(rows)
+    finally:
+        conn.close()
+
+def day_slots(conn, doctor, location, date_str):
+    """(start_minute, end_minute, booked) for one doctor/location/day in time order: a primary-key range read."""
+    return conn.execute(_DAY, (doctor, location, date_str)).fetchall()
+
+def find_windows(conn, doctor, location, date_str, minutes_needed=30, limit=10):
+    """Same answer as scheduling.find_contiguous_slots, read from the one day's rows only."""
+    block = max(1, minutes_needed // 15)
+    free = [(s, e) for s, e, booked in day_slots(conn, doctor, location, date_str) if not booked]
+    out = []
+    for i in range(len(free) - block + 1):
+        if all(free[i + j + 1][0] == free[i + j][1] for j in range(block - 1)):
+            out.append((TIMES[free[i][0]], TIMES[free[i + block - 1][1]]))
+            if len(out) == limit:
+                break
+    return out
+
+def apply_event(conn, event):
+    """
+    Commits one book/cancel event together with its events row. Returns 'booked', 'conflict'
+    (a slot in the window is already booked), 'unavailable' (slots do not cover the window) or
+    'cancelled'. Nothing is written unless the event took effect.
+    """
+    with _transaction(conn):
+        if event["op"] == "book":
+            try:
+                n = conn.execute(_BOOK, {
+                    "appointment_id": event["appointment_id"], "doctor": event["doctor"],
+                    "location": event["location"], "date": event["date"],
+                    "start": to_minutes(event["start_time"]), "end": to_minutes(event["end_time"]),
+                }).rowcount
+            except sqlite3.IntegrityError:
+                return "conflict"  # the failed statement is undone as a whole; nothing else was written
+            if not n:
+                return "unavailable"
+            status = "booked"
+        elif event["op"] == "cancel":
+            conn.execute(_CANCEL, {"appointment_id": event["appointment_id"], "doctor": event["doctor"],
+                                   "location": event["location"], "date": event["date"]})
+            status = "cancelled"
+        else:
+            raise ValueError(f"unknown event {event['op']!r}")
+        conn.execute("INSERT INTO events (event) VALUES (?)", (json.dumps(event, separators=(",", ":")),))
+        return status
+
+def events_since(conn, after=0):
+    """(events with id > after in order, last id seen)."""
+    rows = conn.execute("SELECT id, event FROM events WHERE id > ? ORDER BY id", (after,)).fetchall()
+    return [json.loads(e) for _, e in rows], (rows[-1][0] if rows else after)
+
+def last_event_id(conn):
+    return conn.execute("SELECT coalesce(max(id), 0) FROM events").fetchone()[0]
+
+def clear_events(conn):
+    """Drops the event history (ids restart at 1, so readers holding an id reload) and checkpoints."""
+    with _transaction(conn):
+        _clear_events(conn)
+    checkpoint(conn)
+
+# -- patients ------------------------------------------------------------------------------
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+def _sql_type(dtype):
+    if pd.api.types.is_integer_dtype(dtype):
+        return "INTEGER"
+    if pd.api.types.is_float_dtype(dtype):
+        return "REAL"
+    return "TEXT"
+
+def write_patients(conn, df):
+    """Replaces the patients table with df (column types follow its dtypes) and checkpoints."""
+    cols = [str(c) for c in df.columns]
+    values = df.astype(object).where(df.notna(), None)
+    values[NAME_KEYS[0]] = _normalize_series(df["first_name"])
+    values[NAME_KEYS[1]] = _normalize_series(df["last_name"])
+    defs = ", ".join(f"{_quote(c)} {_sql_type(df[c].dtype)}" for c in cols)
+    with _transaction(conn):
+        conn.execute("DROP TABLE IF EXISTS patients")
+        conn.execute(f"CREATE TABLE patients ({defs}, first_key TEXT, last_key TEXT)")
+        conn.execute("CREATE INDEX patients_name_dob ON patients (last_key, first_key, dob)")
+        conn.executemany(f"INSERT INTO patients VALUES ({', '.join('?' * (len(cols) + 2))})",
+                         values.itertuples(index=False, name=None))
+    checkpoint(conn)
+
+def _patient_columns(conn):
+    cols = [r[1] for r in conn.execute("PRAGMA table_info(patients)")]
+    return [c for c in cols if c not in NAME_KEYS]
+
+def read_patients(conn):
+    """patients.csv as a DataFrame (no rows, the usual columns, when nothing has been imported)."""
+    cols = _patient_columns(conn)
+    if not cols:
+        return pd.DataFrame(columns=PATIENT_COLUMNS, dtype=object)
+    return pd.read_sql_query(f"SELECT {', '.join(map(_quote, cols))} FROM patients ORDER BY rowid", conn)
+
+def find_patients(conn, first_name, last_name, dob):
+    """Patients matching the normalized names and DOB, via the (last, first, dob) index."""
+    cols = _patient_columns(conn)
+    if not cols:
+        return []
+    rows = conn.execute(
+        f"SELECT {', '.join(map(_quote, cols))} FROM patients WHERE last_key = ? AND first_key = ? AND dob = ?",
+        (normalize_name(last_name), normalize_name(first_name), str(dob)),
+    ).fetchall()
+    return [dict(zip(cols, r)) for r in rows]
+
+# -- import --------------------------------------------------------------------------------
+
+def _read_table(path, **kwargs):
+    path = Path(path)
+    if path.suffix == ".xlsx":
+        return pd.read_excel(path, **kwargs)
+    return pd.read_csv(path, **kwargs)
+
+def import_files(dest, schedule_src=None, patients_src=None):
+    """Loads doctor_schedules.csv/.xlsx and patients.csv/.xlsx into the database at dest. Returns row counts."""
+    conn = connect(dest)
+    counts = {}
+    if schedule_src is not None:
+        df = _read_table(schedule_src, dtype=str)
+        write_schedule(conn, df)
+        counts["slots"] = len(df)
+        counts["booked"] = int((df["slot_status"] == "booked").sum())
+    if patients_src is not None:
+        df = _read_table(patients_src)
+        if "dob" in df and pd.api.types.is_datetime64_any_dtype(df["dob"]):
+            df["dob"] = df["dob"].dt.strftime("%Y-%m-%d")
+        write_patients(conn, df)
+        counts["patients"] = len(df)
+    return counts
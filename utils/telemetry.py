@@ -0,0 +1,229 @@
+"""
+Lightweight timing spans and counters for the hot paths.
+
+instrument(__name__, skip=...) at the bottom of a module wraps every public function (and public
+method of a class) defined there in a span named "<module>.<function>". A wrapped call costs
+~0.3-0.5 us, so microsecond-scale helpers are left out through skip (and _private helpers always
+are): their time still shows up in the public callers' spans. A span adds its duration to a per-name
+stat (call count, total, last 1024 durations for rolling p50/p95) and, when the calling thread is
+inside a Run (one Streamlit rerun), to that run's breakdown. Spans are inclusive: a function's
+time includes the instrumented functions it calls. Stats are updated without a lock; a rare lost
+update under thread contention is tolerated.
+
+TELEMETRY=0 in the environment leaves every function unwrapped (zero overhead). A Run can also
+capture a cProfile of the whole rerun into outbox/.
+"""
+import cProfile
+import functools
+import inspect
+import io
+import os
+import pstats
+import sys
+import threading
+from collections import deque
+from threading import get_ident
+from datetime import datetime
+from pathlib import Path
+from time import perf_counter
+
+ENABLED = os.getenv("TELEMETRY", "1") != "0"
+WINDOW = 1024   # durations kept per span for the rolling percentiles
+RUNS_KEPT = 20
+
+class Stat:
+    __slots__ = ("calls", "total", "recent")
+
+    def __init__(self):
+        self.calls, self.total, self.recent = 0, 0.0, deque(maxlen=WINDOW)
+
+class Run:
+    """One rerun: the numbered sections in order plus every span recorded by its thread."""
+
+    def __init__(self, name, profile=False):
+        self.name = name
+        self.started = datetime.now().isoformat(timespec="seconds")
+        self.sections = []    # [name, seconds]
+        self.spans = {}       # span name -> [calls, seconds]
+        self.seconds = 0.0
+        self.profile_path = None
+        self._t0 = self._mark = perf_counter()
+        self._section = None
+        self._profiler = cProfile.Profile() if profile else None
+
+    def section(self, name):
+        """Ends the current section (if any) and starts `name`."""
+        now = perf_counter()
+        if self._section is not None:
+            self.sections.append([self._section, now - self._mark])
+        self._section, self._mark = name, now
+
+    def breakdown(self):
+        return {
+            "run": self.name, "started": self.started, "ms": round(self.seconds * 1000, 2),
+            "sections": [{"section": s, "ms": round(t * 1000, 2)} for s, t in self.sections],
+            "spans": sorted(({"span": k, "calls": c, "ms": round(t * 1000, 3)} for k, (c, t) in self.spans.items()),
+                            key=lambda r: -r["ms"]),
+            "profile": self.profile_path,
+        }
+
+class Telemetry:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._active = {}    # thread id -> Run in progress
+        self.stats = {}      # span name -> Stat
+        self.counters = {}
+        self.runs = deque(maxlen=RUNS_KEPT)
+
+    def stat(self, name):
+        with self._lock:
+            st = self.stats.get(name)
+            if st is None:
+                st = self.stats[name] = Stat()
+            return st
+
+    def record(self, name, st, seconds):
+        st.calls += 1
+        st.total += seconds
+        st.recent.append(seconds)
+        if self._active:
+            run = self._active.get(get_ident())
+            if run is not None:
+                acc = run.spans.get(name)
+                if acc is None:
+                    run.spans[name] = [1, seconds]
+                else:
+                    acc[0] += 1
+                    acc[1] += seconds
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def span(self, name):
+        return _Span(self, name, self.stat(name))
+
+    def wrap(self, fn, name):
+        st = self.stat(name)
+        active = self._active
+
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            t0 = perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                # record() inlined: this runs on every call of every instrumented function
+                dt = perf_counter() - t0
+                st.calls += 1
+                st.total += dt
+                st.recent.append(dt)
+                if active:
+                    run = active.get(get_ident())
+                    if run is not None:
+                        acc = run.spans.get(name)
+                        if acc is None:
+                            run.spans[name] = [1, dt]
+                        else:
+                            acc[0] += 1
+                            acc[1] += dt
+        timed.__telemetry__ = True
+        return timed
+
+    # -- runs --------------------------------------------------------------------------------
+
+    def begin_run(self, name="rerun", profile=False):
+        run = Run(name, profile)
+        self._active[get_ident()] = run
+        if run._profiler is not None:
+            run._profiler.enable()
+        return run
+
+    def end_run(self, run, profile_dir=None):
+        run.section(None)
+        run.seconds = perf_counter() - run._t0
+        if run._profiler is not None:
+            run._profiler.disable()
+            run.profile_path = _dump_profile(run._profiler, Path(profile_dir or Path(__file__).resolve().parents[1] / "outbox"))
+        if self._active.get(get_ident()) is run:
+            del self._active[get_ident()]
+        with self._lock:
+            self.runs.append(run)
+        return run
+
+    # -- reporting ---------------------------------------------------------------------------
+
+    def summary(self):
+        """Rolling per-span stats, slowest total first (times in ms)."""
+        with self._lock:
+            items = [(k, st.calls, st.total, list(st.recent)) for k, st in list(self.stats.items()) if st.calls]
+        rows = []
+        for k, calls, total, recent in items:
+            recent.sort()
+            pick = lambda q: recent[min(len(recent) - 1, int(len(recent) * q))] * 1000
+            rows.append({"span": k, "calls": calls, "total_ms": round(total * 1000, 2),
+                         "mean_ms": round(total / calls * 1000, 3), "p50_ms": round(pick(0.5), 3),
+                         "p95_ms": round(pick(0.95), 3)})
+        return sorted(rows, key=lambda r: -r["total_ms"])
+
+    def last_runs(self, n=5):
+        with self._lock:
+            return [r.breakdown() for r in list(self.runs)[-n:]][::-1]
+
+    def reset(self):
+        with self._lock:
+            for st in self.stats.values():
+                st.calls, st.total = 0, 0.0
+                st.recent.clear()
+            self.counters.clear()
+            self.runs.clear()
+
+class _Span:
+    __slots__ = ("t", "name", "st", "t0")
+
+    def __init__(self, t, name, st):
+        self.t, self.name, self.st = t, name, st
+
+    def __enter__(self):
+        self.t0 = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.t.record(self.name, self.st, perf_counter() - self.t0)
+
+def _dump_profile(profiler, out_dir):
+    out_dir.mkdir(parents=True, exist_ok=True)
+    path = out_dir / f"profile_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.prof"
+    profiler.dump_stats(path)
+    text = io.StringIO()
+    pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(40)
+    path.with_suffix(".txt").write_text(text.getvalue(), encoding="utf-8")
+    return str(path)
+
+TELEMETRY = Telemetry()
+
+def _plain(obj):
+    # generators / context managers would only time their creation
+    return inspect.isfunction(obj) and not getattr(obj, "__telemetry__", False) and not (
+        inspect.isgeneratorfunction(inspect.unwrap(obj)) or hasattr(obj, "__wrapped__"))
+
+def instrument(module_name, telemetry=TELEMETRY, skip=()):
+    """
+    Wraps the public functions and methods defined in module_name in spans, except the names
+    ("fn" or "Class.method") in skip (no-op when TELEMETRY=0).
+    """
+    if not ENABLED:
+        return
+    module = sys.modules[module_name]
+    short = module_name.rsplit(".", 1)[-1]
+    skip = set(skip)
+    for attr, obj in list(vars(module).items()):
+        if getattr(obj, "__module__", None) != module_name or attr.startswith("_") or attr in skip:
+            continue
+        if _plain(obj):
+            setattr(module, attr, telemetry.wrap(obj, f"{short}.{attr}"))
+        elif inspect.isclass(obj):
+            for name, fn in list(vars(obj).items()):
+                if _plain(fn) and not name.startswith("_") and f"{attr}.{name}" not in skip:
+                    setattr(obj, name, telemetry.wrap(fn, f"{short}.{attr}.{name}"))